@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后端API本地压测脚本
+对 /api/status 与 /api/start 发起请求，统计 p50/p99 延迟，用于比较不同服务模式。
+--mix 按权重混合状态轮询、健康检查、开始与停止请求并发压测；--typing-impact 在打字任务进行时施加负载，
+与无负载时的同一任务比较按键间隔误差和达到的速度。
+后端可以是已在运行的服务（external），也可以由脚本以记录输出端在本进程内（inprocess）或子进程中（subprocess）启动
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "src" / "backend"
+BACKEND_READY_TIMEOUT = 20.0
+
+START_PAYLOAD = {
+    'text': 'load test payload',
+    'speed': 50,
+    'countdown': 0,
+    'jitter': 0,
+    'sendEnter': False,
+    'autoSwitch': False,
+    'ideMode': False
+}
+# 混合负载中的请求类型：(方法, 路径, 请求体)
+MIX_OPERATIONS = {
+    'status': ('GET', '/api/status', None),
+    'health': ('GET', '/api/health', None),
+    'start': ('POST', '/api/start', START_PAYLOAD),
+    'stop': ('POST', '/api/stop', None),
+}
+DEFAULT_MIX = 'status=85,health=5,start=5,stop=5'
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], wall_time: float) -> Dict[str, float]:
+    """汇总延迟样本（毫秒）"""
+    return {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / wall_time if wall_time > 0 else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000 if samples else 0.0
+    }
+
+
+def timed_request(connection: http.client.HTTPConnection, method: str, path: str,
+                  body: dict = None) -> Tuple[float, int]:
+    """在持久连接上发送一次请求，返回 (耗时, 状态码)"""
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    start = time.perf_counter()
+    connection.request(method, path, body=payload, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return time.perf_counter() - start, response.status
+
+
+def get_json(host: str, port: int, path: str, method: str = 'GET', body: dict = None) -> dict:
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        connection.request(method, path, body=payload, headers=headers)
+        raw = connection.getresponse().read()
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            raise RuntimeError(f'{method} {path}: {raw[:300]!r}')
+    finally:
+        connection.close()
+
+
+def run_status_load(host: str, port: int, concurrency: int, requests_per_worker: int) -> Dict[str, float]:
+    """并发轮询 /api/status，每个工作线程复用一个 keep-alive 连接"""
+    samples: List[float] = []
+    samples_lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        local_samples = []
+        try:
+            for _ in range(requests_per_worker):
+                local_samples.append(timed_request(connection, 'GET', '/api/status')[0])
+        finally:
+            connection.close()
+        with samples_lock:
+            samples.extend(local_samples)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - start)
+
+
+def run_start_load(host: str, port: int, iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    串行执行 /api/start -> /api/stop
+    使用较长的倒计时，任务在真正输入前就被停止，不会向前台窗口发送按键
+    """
+    start_samples: List[float] = []
+    stop_samples: List[float] = []
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    payload = dict(START_PAYLOAD, speed=5, countdown=30)
+    start = time.perf_counter()
+    try:
+        for _ in range(iterations):
+            start_samples.append(timed_request(connection, 'POST', '/api/start', payload)[0])
+            stop_samples.append(timed_request(connection, 'POST', '/api/stop')[0])
+    finally:
+        connection.close()
+    wall_time = time.perf_counter() - start
+    return {
+        'start': summarize(start_samples, wall_time),
+        'stop': summarize(stop_samples, wall_time)
+    }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """解析 'status=85,health=5,start=5,stop=5' 形式的请求权重"""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in MIX_OPERATIONS:
+            raise argparse.ArgumentTypeError(f"未知的请求类型: {name}，可选: {', '.join(MIX_OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("至少一种请求的权重需大于 0")
+    return mix
+
+
+def run_mix_load(host: str, port: int, mix: Dict[str, float], concurrency: int, duration: float,
+                 seed: int = 1) -> Dict[str, object]:
+    """
+    concurrency 个工作线程在 duration 秒内按权重随机发送请求，每个线程复用一个 keep-alive 连接，
+    连接出错时重连并计入 errors。开始任务时后端正忙返回的 400 属于正常响应，按状态码分别统计
+    """
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    status_codes: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        generator = random.Random(seed * 1000 + index)
+        local_samples = {name: [] for name in names}
+        local_codes = {name: {} for name in names}
+        local_errors = 0
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        try:
+            while time.perf_counter() < deadline:
+                name = generator.choices(names, weights)[0]
+                method, path, body = MIX_OPERATIONS[name]
+                try:
+                    elapsed, code = timed_request(connection, method, path, body)
+                except (OSError, http.client.HTTPException):
+                    local_errors += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection(host, port, timeout=10)
+                    continue
+                local_samples[name].append(elapsed)
+                local_codes[name][str(code)] = local_codes[name].get(str(code), 0) + 1
+        finally:
+            connection.close()
+        with lock:
+            for name in names:
+                samples[name].extend(local_samples[name])
+                for code, count in local_codes[name].items():
+                    status_codes[name][code] = status_codes[name].get(code, 0) + count
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+    return {
+        'overall': summarize([sample for name in names for sample in samples[name]], wall_time),
+        'operations': {
+            name: dict(summarize(samples[name], wall_time), status_codes=status_codes[name]) for name in names
+        },
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'mix': mix,
+    }
+
+
+def wait_until_idle(host: str, port: int, timeout: float = 10.0):
+    get_json(host, port, '/api/stop', 'POST')
+    deadline = time.perf_counter() + timeout
+    while get_json(host, port, '/api/status').get('is_typing') and time.perf_counter() < deadline:
+        time.sleep(0.05)
+
+
+def timing_digest(summary: dict) -> Dict[str, float]:
+    """从 /api/metrics/timing 中取出比较所需的字段"""
+    errors = summary['interval_error_ms']
+    return {
+        'events': summary['events'],
+        'scheduled_cps': summary['scheduled_cps'],
+        'achieved_cps': summary['achieved_cps'],
+        'interval_error_mean_abs_ms': errors['mean_abs'],
+        'interval_error_p50_ms': errors['p50'],
+        'interval_error_p99_ms': errors['p99'],
+        'interval_error_max_ms': errors['max'],
+        'lateness_p99_ms': summary['lateness_ms']['p99'],
+    }
+
+
+def measure_typing_impact(host: str, port: int, mix: Dict[str, float], concurrency: int, duration: float,
+                          speed: int, seed: int = 1) -> Dict[str, object]:
+    """
+    先在无负载时运行一个打字任务 duration 秒，再在施加负载时运行同样的任务，比较两次的按键节奏。
+    负载中去掉开始/停止请求，否则会结束被测的任务；后端需使用真实时钟（默认）
+    """
+    load_mix = {name: weight for name, weight in mix.items() if name not in ('start', 'stop')} or {'status': 1.0}
+    payload = dict(START_PAYLOAD, text='a' * int(speed * duration * 2 + 10), speed=speed)
+    runs = {}
+    load = None
+    for label in ('quiet', 'loaded'):
+        wait_until_idle(host, port)
+        response = get_json(host, port, '/api/start', 'POST', payload)
+        if not response.get('success'):
+            raise RuntimeError(f"无法开始打字任务: {response}")
+        if label == 'loaded':
+            load = run_mix_load(host, port, load_mix, concurrency, duration, seed)
+        else:
+            time.sleep(duration)
+        get_json(host, port, '/api/stop', 'POST')
+        wait_until_idle(host, port)
+        runs[label] = timing_digest(get_json(host, port, '/api/metrics/timing'))
+    return {
+        'quiet': runs['quiet'],
+        'loaded': runs['loaded'],
+        'delta': {key: runs['loaded'][key] - runs['quiet'][key] for key in runs['quiet']},
+        'load': load,
+    }
+
+
+def wait_for_ready_file(path: Path, timeout: float, process: Optional[subprocess.Popen] = None) -> int:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if path.exists():
+            return int(path.read_text(encoding='utf-8'))
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"后端进程已退出: {process.returncode}")
+        time.sleep(0.05)
+    raise RuntimeError("等待后端就绪超时")
+
+
+def start_subprocess_backend(server_mode: str, threads: int, directory: Path) -> Tuple[subprocess.Popen, int]:
+    """以记录输出端在子进程中启动后端，监听随机端口"""
+    ready_file = directory / "backend.port"
+    env = dict(os.environ, KEYBOARD_TYPER_SINK='recording')
+    process = subprocess.Popen(
+        [sys.executable, str(BACKEND_DIR / "backend.py"), '--server', server_mode, '--port', '0',
+         '--threads', str(threads), '--ready-file', str(ready_file), '--sink', 'recording',
+         '--history-db', ''],
+        cwd=str(BACKEND_DIR), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        return process, wait_for_ready_file(ready_file, BACKEND_READY_TIMEOUT, process)
+    except Exception:
+        process.kill()
+        raise
+
+
+def start_inprocess_backend(server_mode: str, threads: int, directory: Path) -> int:
+    """
+    以记录输出端在本进程的后台线程中启动后端，监听随机端口。
+    压测线程与打字线程共享 GIL，测得的节奏影响会比独立进程时偏大
+    """
+    os.environ['KEYBOARD_TYPER_SINK'] = 'recording'
+    sys.path.append(str(BACKEND_DIR))
+    import backend
+
+    ready_file = directory / "backend.port"
+    # 服务启动时的输出转到标准错误，保持 --json 的标准输出可解析
+    with contextlib.redirect_stdout(sys.stderr):
+        threading.Thread(target=backend.run_server, args=(server_mode, '127.0.0.1', 0, threads, str(ready_file)),
+                         name='backend-server', daemon=True).start()
+        return wait_for_ready_file(ready_file, BACKEND_READY_TIMEOUT)
+
+
+def print_summary(name: str, stats: Dict[str, float]):
+    print(f"{name}:")
+    print(f"  请求数: {stats['requests']}")
+    print(f"  吞吐量: {stats['throughput_rps']:.1f} 请求/秒")
+    print(f"  p50: {stats['p50_ms']:.2f} ms")
+    print(f"  p99: {stats['p99_ms']:.2f} ms")
+    print(f"  最大: {stats['max_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端API本地压测")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8, help="/api/status 并发连接数")
+    parser.add_argument("--requests", type=int, default=500, help="每个连接的 /api/status 请求数")
+    parser.add_argument("--start-iterations", type=int, default=20, help="/api/start 测试次数")
+    parser.add_argument("--backend", choices=["external", "inprocess", "subprocess"], default="external",
+                        help="external 压测已在运行的后端；inprocess/subprocess 以记录输出端启动后端")
+    parser.add_argument("--server", choices=["waitress", "dev"], default="waitress", help="启动后端时的服务模式")
+    parser.add_argument("--threads", type=int, default=8, help="启动后端时的 waitress 工作线程数")
+    parser.add_argument("--mix", type=parse_mix, nargs="?", const=parse_mix(DEFAULT_MIX), default=None,
+                        help=f"混合负载的请求权重（默认 {DEFAULT_MIX}），指定后代替单独的 status/start 压测")
+    parser.add_argument("--duration", type=float, default=5.0, help="混合负载与节奏影响测量的持续秒数")
+    parser.add_argument("--typing-impact", action="store_true", help="比较有无负载时打字任务的按键节奏")
+    parser.add_argument("--typing-speed", type=int, default=50, help="节奏影响测量中打字任务的速度（字符/秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        host, port = args.host, args.port
+        if args.backend == 'subprocess':
+            host = '127.0.0.1'
+            process, port = start_subprocess_backend(args.server, args.threads, Path(directory))
+        elif args.backend == 'inprocess':
+            host = '127.0.0.1'
+            port = start_inprocess_backend(args.server, args.threads, Path(directory))
+        try:
+            results = {'backend': args.backend, 'server': args.server if args.backend != 'external' else None}
+            if args.mix:
+                results['mix'] = run_mix_load(host, port, args.mix, args.concurrency, args.duration, args.seed)
+            else:
+                results['status'] = run_status_load(host, port, args.concurrency, args.requests)
+                results.update(run_start_load(host, port, args.start_iterations))
+            if args.typing_impact:
+                results['typing_impact'] = measure_typing_impact(host, port, args.mix or parse_mix(DEFAULT_MIX),
+                                                                 args.concurrency, args.duration, args.typing_speed,
+                                                                 args.seed)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print("=" * 60)
+        print(f"后端API压测结果 (http://{host}:{port}, {args.backend})")
+        print("=" * 60)
+        if 'mix' in results:
+            mix = results['mix']
+            print_summary(f"混合负载 ({args.concurrency} 并发, 错误 {mix['errors']})", mix['overall'])
+            for name, stats in mix['operations'].items():
+                print_summary(f"  {MIX_OPERATIONS[name][1]} {stats['status_codes']}", stats)
+        else:
+            print_summary("/api/status", results['status'])
+            print_summary("/api/start", results['start'])
+            print_summary("/api/stop", results['stop'])
+        if 'typing_impact' in results:
+            impact = results['typing_impact']
+            print("打字节奏 (无负载 -> 有负载):")
+            for key in ('achieved_cps', 'interval_error_mean_abs_ms', 'interval_error_p99_ms',
+                        'interval_error_max_ms', 'lateness_p99_ms'):
+                print(f"  {key}: {impact['quiet'][key]:.3f} -> {impact['loaded'][key]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比较引擎准确率与速度基准测试
+在不同类型、大小的语料上按错误率注入带标注的错误，用各差异算法后端运行 TextComparisonEngine，
+按 DifferenceType 统计查准率/查全率，并记录吞吐量（MB/s）与峰值内存，结果写入 JSON 文件
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "tests"))
+
+from corpus_generator import CORPUS_KINDS, CorpusCache, parse_size
+from diff_engines import DIFF_ENGINES
+from fault_injector import FaultInjector, FaultLabels
+from test_framework import DifferenceType, TestDifference, TextComparisonEngine
+
+LINE_TYPES = (DifferenceType.NEWLINE_ERROR, DifferenceType.INDENTATION_ERROR)
+
+
+class LabelIndex:
+    """按差异类型分组的标注区间（期望文本坐标），用于按位置查找附近的真实错误"""
+
+    def __init__(self, labels: FaultLabels):
+        self.starts: Dict[DifferenceType, List[int]] = {diff_type: [] for diff_type in DifferenceType}
+        self.ends: Dict[DifferenceType, List[int]] = {diff_type: [] for diff_type in DifferenceType}
+        for fault in labels:
+            # 多字错误在期望文本中长度为 0，按 1 个字符计算重叠
+            self.starts[fault.type].append(fault.expected_start)
+            self.ends[fault.type].append(max(fault.expected_end, fault.expected_start + 1))
+        self.covered = {diff_type: bytearray(len(starts)) for diff_type, starts in self.starts.items()}
+
+    def match(self, diff_type: DifferenceType, start: int, end: int, tolerance: int) -> bool:
+        """查找与 [start, end) 相距不超过 tolerance 的同类标注，命中的标注记为已召回"""
+        starts = self.starts[diff_type]
+        last = bisect_left(starts, end + tolerance)
+        first = bisect_right(self.ends[diff_type], start - tolerance, 0, last)
+        if first >= last:
+            return False
+        self.covered[diff_type][first:last] = b'\x01' * (last - first)
+        return True
+
+    def recalled(self, diff_type: DifferenceType) -> int:
+        return self.covered[diff_type].count(1)
+
+
+def line_starts(text: str) -> List[int]:
+    """按 splitlines 的分行方式返回每行在文本中的起始位置（与比较引擎逐行检测一致）"""
+    starts = [0]
+    for line in text.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def expected_span(difference: TestDifference, expected: str, labels: FaultLabels,
+                  starts: List[int]) -> Tuple[int, int]:
+    """把检测到的差异换算为期望文本中的区间"""
+    if difference.type in LINE_TYPES:
+        line_start, line_end = starts[difference.line_number - 1], starts[difference.line_number]
+        line = expected[line_start:line_end]
+        if difference.type == DifferenceType.NEWLINE_ERROR:
+            content_length = len(line.rstrip('\r\n'))
+            return line_start + content_length, max(line_end, line_start + content_length + 1)
+        indent_length = len(line) - len(line.lstrip(' \t'))
+        return line_start, line_start + max(indent_length, 1)
+    if difference.type == DifferenceType.EXTRA_CHAR:
+        # 多字的位置在实际文本中
+        position = labels.to_expected(difference.position)
+        return position, position + 1
+    return difference.position, difference.position + max(len(difference.expected), 1)
+
+
+def score(expected: str, labels: FaultLabels, differences: List[TestDifference], tolerance: int) -> Dict[str, dict]:
+    """按差异类型计算查准率与查全率"""
+    index = LabelIndex(labels)
+    starts = line_starts(expected)
+    detected = {diff_type: 0 for diff_type in DifferenceType}
+    correct = {diff_type: 0 for diff_type in DifferenceType}
+    for difference in differences:
+        if difference.line_number == 0 and difference.type == DifferenceType.NEWLINE_ERROR:
+            # 行数不匹配是全文级别的汇总差异，没有对应位置，不参与评分
+            continue
+        start, end = expected_span(difference, expected, labels, starts)
+        detected[difference.type] += 1
+        if index.match(difference.type, start, end, tolerance):
+            correct[difference.type] += 1
+
+    metrics = {}
+    for diff_type in DifferenceType:
+        injected = len(index.starts[diff_type])
+        recalled = index.recalled(diff_type)
+        metrics[diff_type.name] = {
+            'injected': injected,
+            'detected': detected[diff_type],
+            'true_positives': correct[diff_type],
+            'precision': correct[diff_type] / detected[diff_type] if detected[diff_type] else None,
+            'recall': recalled / injected if injected else None
+        }
+    return metrics
+
+
+def measure(engine: TextComparisonEngine, expected: str, actual: str, track_memory: bool):
+    """计时比较一次；track_memory 时另外在 tracemalloc 下重复一次以取得峰值内存（不计入耗时）"""
+    start = time.perf_counter()
+    differences = engine.compare(expected, actual).differences
+    elapsed = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            engine.compare(expected, actual)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return differences, elapsed, peak
+
+
+def run_benchmark(kinds, sizes, error_rates, engines, seed: int, tolerance: int,
+                  track_memory: bool = True, cache: CorpusCache = None) -> List[dict]:
+    cache = cache or CorpusCache()
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            expected = cache.load_text(kind, size, seed)
+            size_mb = len(expected.encode('utf-8')) / 1_000_000
+            for error_rate in error_rates:
+                injected = FaultInjector(seed).inject(expected, char_rate=error_rate, newline_rate=error_rate,
+                                                      indent_rate=error_rate, space_rate=error_rate)
+                for name in engines:
+                    differences, elapsed, peak = measure(TextComparisonEngine(name), expected, injected.text,
+                                                         track_memory)
+                    results.append({
+                        'corpus': kind,
+                        'size': size,
+                        'error_rate': error_rate,
+                        'engine': name,
+                        'faults': len(injected.labels),
+                        'differences': len(differences),
+                        'seconds': elapsed,
+                        'mb_per_second': size_mb / elapsed if elapsed > 0 else 0.0,
+                        'peak_memory_bytes': peak,
+                        'metrics': score(expected, injected.labels, differences, tolerance)
+                    })
+                    print_row(results[-1])
+    return results
+
+
+def _format_ratio(value) -> str:
+    return '-' if value is None else f"{value:.3f}"
+
+
+def print_row(row: dict):
+    peak = '-' if row['peak_memory_bytes'] is None else f"{row['peak_memory_bytes'] / 1_000_000:.1f}"
+    print(f"{row['corpus']:<18}{row['size']:>10}{row['error_rate']:>8.3f} {row['engine']:<13}"
+          f"{row['seconds']:>9.3f}{row['mb_per_second']:>9.2f}{peak:>10}", flush=True)
+    for type_name, metric in row['metrics'].items():
+        if metric['injected'] or metric['detected']:
+            print(f"    {type_name:<20} 注入 {metric['injected']:>8}  检测 {metric['detected']:>8}  "
+                  f"查准率 {_format_ratio(metric['precision']):>6}  查全率 {_format_ratio(metric['recall']):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较引擎准确率与速度基准测试")
+    parser.add_argument("--kinds", nargs="+", choices=list(CORPUS_KINDS), default=list(CORPUS_KINDS))
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[parse_size('16KB'), parse_size('64KB')],
+                        help="语料大小，如 64KB、1MB")
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.001, 0.01],
+                        help="错误率（高错误率下 myers 与 difflib 的耗时近似平方增长）")
+    parser.add_argument("--engines", nargs="+", choices=list(DIFF_ENGINES), default=list(DIFF_ENGINES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tolerance", type=int, default=2, help="检测位置与标注位置允许相差的字符数")
+    parser.add_argument("--no-memory", action="store_true", help="不测量峰值内存（省去 tracemalloc 下的第二次比较）")
+    parser.add_argument("--cache-dir", help="语料缓存目录")
+    parser.add_argument("--output", default="comparison_accuracy.json", help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    print(f"{'语料':<16}{'大小':>10}{'错误率':>8} {'算法':<11}{'耗时(秒)':>9}{'MB/s':>9}{'峰值MB':>8}")
+    results = run_benchmark(args.kinds, args.sizes, args.error_rates, args.engines, args.seed,
+                            args.tolerance, not args.no_memory, CorpusCache(args.cache_dir))
+    report = {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'seed': args.seed,
+            'tolerance': args.tolerance
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+差异算法后端基准测试
+在 1 MB 级别的输入上比较 difflib 参考实现、Myers 与分层实现的耗时与编辑代价
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "tests"))
+
+from diff_engines import DIFF_ENGINES, get_diff_engine, validate_opcodes, edit_cost
+
+
+def make_inputs(size: int, error_rate: float, seed: int):
+    """生成期望文本，并按错误率注入缺字/多字/错字得到实际文本"""
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz    \n你好世界测试'
+    expected = ''.join(rng.choices(alphabet, k=size))
+    actual = []
+    for character in expected:
+        if rng.random() < error_rate:
+            operation = rng.randrange(3)
+            if operation == 0:
+                continue
+            if operation == 1:
+                actual.append('#')
+                actual.append(character)
+            else:
+                actual.append('#')
+        else:
+            actual.append(character)
+    return expected, ''.join(actual)
+
+
+def run_benchmark(size: int, error_rates, engines, seed: int):
+    results = []
+    for error_rate in error_rates:
+        expected, actual = make_inputs(size, error_rate, seed)
+        for name in engines:
+            engine = get_diff_engine(name)
+            start = time.perf_counter()
+            opcodes = engine.get_opcodes(expected, actual)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'engine': name,
+                'size': size,
+                'error_rate': error_rate,
+                'seconds': elapsed,
+                'mb_per_second': (size / 1_000_000) / elapsed if elapsed > 0 else 0.0,
+                'edit_cost': edit_cost(opcodes)['total'],
+                'valid': validate_opcodes(expected, actual, opcodes)
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="差异算法后端基准测试")
+    parser.add_argument("--size", type=int, default=1_000_000, help="输入字符数")
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.0001, 0.001])
+    parser.add_argument("--engines", nargs="+", choices=list(DIFF_ENGINES), default=list(DIFF_ENGINES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.size, args.error_rates, args.engines, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{'算法':<14}{'错误率':>10}{'耗时(秒)':>12}{'MB/s':>10}{'编辑代价':>12}{'有效':>6}")
+    for row in results:
+        print(f"{row['engine']:<14}{row['error_rate']:>10.4f}{row['seconds']:>12.3f}"
+              f"{row['mb_per_second']:>10.2f}{row['edit_cost']:>12}{'是' if row['valid'] else '否':>6}")
+
+
+if __name__ == "__main__":
+    main()
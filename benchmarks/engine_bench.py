@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打字引擎热路径基准测试
+在只计数的记录输出端和虚拟时钟上运行后端真实的打字引擎（不真正等待、不发送按键），
+分别测量文本预处理、字符布局分类、打字计划生成和完整的分发循环（IDE 模式下为逐行循环）每个字符的耗时，
+覆盖不同语料大小（1 KB 到 50 MB）、IDE/普通模式、自动切换输入法开关和英文为主/中英混排的语料。
+另在 tracemalloc 下重复一次测量每个字符的峰值内存与净增内存块数，结果写入 JSON 文件，可与基线比较
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "tests"))
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src" / "backend"))
+
+import backend
+from clocks import VirtualClock
+from corpus_generator import CORPUS_KINDS, CorpusCache, parse_size
+from editor_emulator import ENGINE_MODES, CountingKeySink, engine_harness
+
+DEFAULT_CORPORA = ['deep_indent_code', 'mixed_cjk', 'switch_heavy']
+DEFAULT_SIZES = ['1KB', '64KB', '1MB']
+STAGES = ('preprocess', 'classify', 'plan', 'engine')
+
+
+def run_engine(text: str, ide_mode: bool, auto_switch: bool, speed_cps: int) -> Dict[str, object]:
+    """以最快的方式跑完一次完整任务，返回按键计数与模拟耗时"""
+    with engine_harness(CountingKeySink(), VirtualClock(record_schedule=False)) as (sink, clock):
+        backend.execute_typing(text, speed_cps, 0, 0, False, auto_switch, ide_mode)
+    if backend.status['current_status'] != 'COMPLETED':
+        raise RuntimeError(f"打字引擎未正常完成: {backend.status['current_status']}")
+    return {'events': sum(sink.counts.values()), 'layout_switches': sink.counts['layout'],
+            'simulated_seconds': clock.now()}
+
+
+def classify_all(text: str):
+    classify = backend.classify_character_layout
+    for character in text:
+        classify(character)
+
+
+def stage_function(stage: str, text: str, ide_mode: bool, auto_switch: bool, speed_cps: int) -> Callable:
+    if stage == 'preprocess':
+        return lambda: backend.preprocess_text_content(text, ide_mode)
+    if stage == 'classify':
+        return lambda: classify_all(text)
+    if stage == 'plan':
+        return lambda: backend.build_typing_plan(text, ide_mode)
+    return lambda: run_engine(text, ide_mode, auto_switch, speed_cps)
+
+
+def time_stage(function: Callable, repeat: int):
+    """重复 repeat 次取最短耗时（纳秒），返回 (耗时, 最后一次的返回值)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter_ns()
+        result = function()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure_memory(function: Callable) -> Dict[str, int]:
+    """
+    在 tracemalloc 下运行一次：峰值为运行期间相对开始时新增的最大字节数，
+    净增块数为结束后仍存活的内存块（CPython 没有累计分配次数的计数器，以这两项近似每个字符的分配量）
+    """
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    gc.collect()
+    return {'peak_bytes': peak - baseline, 'net_bytes': current - baseline,
+            'net_blocks': sys.getallocatedblocks() - blocks_before}
+
+
+def applies(stage: str, mode: str, seen: set, corpus: str, size: int) -> bool:
+    """预处理与计划只取决于是否 IDE 模式，布局分类与模式无关，避免重复测量"""
+    ide_mode, _ = ENGINE_MODES[mode]
+    key = {'preprocess': (ide_mode,), 'plan': (ide_mode,), 'classify': ()}.get(stage, (mode,))
+    key = (corpus, size, stage) + key
+    if key in seen:
+        return False
+    seen.add(key)
+    return True
+
+
+def run_benchmark(corpora: List[str], sizes: List[int], modes: List[str], stages: List[str], repeat: int,
+                  speed_cps: int, memory_max_size: int, seed: int, cache: CorpusCache = None) -> List[dict]:
+    cache = cache or CorpusCache()
+    results = []
+    seen = set()
+    for corpus in corpora:
+        for size in sizes:
+            text = cache.load_text(corpus, size, seed)
+            characters = max(1, len(text))
+            cjk_ratio = sum(1 for character in text if ord(character) >= 128) / characters
+            for mode in modes:
+                ide_mode, auto_switch = ENGINE_MODES[mode]
+                for stage in stages:
+                    if not applies(stage, mode, seen, corpus, size):
+                        continue
+                    function = stage_function(stage, text, ide_mode, auto_switch, speed_cps)
+                    elapsed_ns, result = time_stage(function, repeat)
+                    if stage == 'engine':
+                        row_mode = mode
+                    elif stage == 'classify':
+                        row_mode = 'any'
+                    else:
+                        row_mode = 'ide' if ide_mode else 'normal'
+                    row = {
+                        'corpus': corpus,
+                        'size': size,
+                        'characters': len(text),
+                        'cjk_ratio': round(cjk_ratio, 4),
+                        'mode': row_mode,
+                        'stage': stage,
+                        'seconds': elapsed_ns / 1e9,
+                        'ns_per_char': elapsed_ns / characters,
+                    }
+                    if stage == 'engine':
+                        row.update(result)
+                        row['events_per_char'] = result['events'] / characters
+                    if size <= memory_max_size:
+                        memory = measure_memory(function)
+                        row.update({
+                            'peak_bytes_per_char': memory['peak_bytes'] / characters,
+                            'net_bytes_per_char': memory['net_bytes'] / characters,
+                            'net_blocks_per_char': memory['net_blocks'] / characters,
+                        })
+                    results.append(row)
+                    print_row(row)
+    return results
+
+
+def row_key(row: dict):
+    return row['corpus'], row['size'], row['mode'], row['stage']
+
+
+def compare_to_baseline(results: List[dict], baseline: List[dict], max_slowdown: float) -> List[dict]:
+    """返回比基线慢超过 max_slowdown 倍的行"""
+    reference = {row_key(row): row for row in baseline}
+    regressions = []
+    print(f"\n{'语料':<18}{'大小':>10} {'模式':<17}{'阶段':<11}{'基线ns/字':>11}{'当前ns/字':>11}{'倍数':>7}")
+    for row in results:
+        previous = reference.get(row_key(row))
+        if previous is None or not previous['ns_per_char']:
+            continue
+        ratio = row['ns_per_char'] / previous['ns_per_char']
+        marker = ' !' if ratio > max_slowdown else ''
+        print(f"{row['corpus']:<18}{row['size']:>10} {row['mode']:<17}{row['stage']:<11}"
+              f"{previous['ns_per_char']:>11.1f}{row['ns_per_char']:>11.1f}{ratio:>7.2f}{marker}")
+        if ratio > max_slowdown:
+            regressions.append(dict(row, baseline_ns_per_char=previous['ns_per_char'], ratio=ratio))
+    return regressions
+
+
+def _format_optional(value: Optional[float], pattern: str) -> str:
+    return '-' if value is None else format(value, pattern)
+
+
+def print_row(row: dict):
+    print(f"{row['corpus']:<18}{row['size']:>10} {row['mode']:<17}{row['stage']:<11}{row['seconds']:>9.3f}"
+          f"{row['ns_per_char']:>11.1f}{_format_optional(row.get('peak_bytes_per_char'), '.2f'):>10}"
+          f"{_format_optional(row.get('net_blocks_per_char'), '.3f'):>10}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打字引擎热路径基准测试")
+    parser.add_argument("--corpora", nargs="+", choices=list(CORPUS_KINDS), default=DEFAULT_CORPORA,
+                        help="语料类型（deep_indent_code 以英文为主，switch_heavy 中英逐字交替）")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[parse_size(size) for size in DEFAULT_SIZES],
+                        help="语料大小，如 1KB、1MB、50MB")
+    parser.add_argument("--modes", nargs="+", choices=list(ENGINE_MODES), default=list(ENGINE_MODES),
+                        help="输入模式（IDE/普通 × 自动切换输入法开/关）")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最短耗时")
+    parser.add_argument("--speed", type=int, default=1000, help="设定速度（字符/秒，只影响模拟耗时）")
+    parser.add_argument("--memory-max-size", type=parse_size, default=parse_size('1MB'),
+                        help="只对不超过该大小的语料测量内存（tracemalloc 会使运行变慢数倍）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache-dir", help="语料缓存目录")
+    parser.add_argument("--output", default="engine_bench.json", help="结果JSON文件路径")
+    parser.add_argument("--baseline", help="与之比较的基线结果JSON文件")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="比基线慢超过该倍数时以非零状态退出")
+    args = parser.parse_args()
+
+    print(f"{'语料':<16}{'大小':>10} {'模式':<15}{'阶段':<9}{'耗时(秒)':>9}{'ns/字符':>9}{'峰值B/字':>8}{'净增块/字':>7}")
+    results = run_benchmark(args.corpora, args.sizes, args.modes, args.stages, max(1, args.repeat), args.speed,
+                            args.memory_max_size, args.seed, CorpusCache(args.cache_dir))
+    report = {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'speed_cps': args.speed
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_to_baseline(results, baseline, args.max_slowdown)
+        if regressions:
+            print(f"\n{len(regressions)} 项比基线慢超过 {args.max_slowdown} 倍")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动基准测试
+每次在全新的解释器中运行 startup_probe.py，按 launcher.py 的顺序测量各阶段的墙钟耗时：
+解释器启动、导入 system_checker / shortcut_manager / start_app、SystemChecker 的每项检查、
+后端输出就绪行、前端进程启动。npm/node 和后端用替身代替，在没有 Node.js 和 Windows 输入法的 Linux 上也能运行；
+--backend real 时替身只是以记录输出端和随机端口转调真实的 backend.py，测量真实后端的启动耗时。
+各阶段取多次运行的中位数与预算比较，超出预算时以非零状态退出，结果写入 JSON 文件
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARK_DIR.parent / "src" / "backend"
+PROBE_SCRIPT = BENCHMARK_DIR / "startup_probe.py"
+PROBE_TIMEOUT = 120.0
+DEFAULT_BUDGET_SECONDS = 5.0
+MARKER_ENV = 'KEYBOARD_TYPER_STARTUP_MARKER'
+
+# 替身 npm/node：--version 输出版本号，install 创建 node_modules，其余命令（start/run dev）创建标记文件后常驻
+TOOL_STANDIN = '''import os
+import sys
+import time
+from pathlib import Path
+
+tool, arguments = sys.argv[1], sys.argv[2:]
+if '--version' in arguments or '-v' in arguments:
+    print('v20.0.0' if tool == 'node' else '10.0.0')
+    sys.exit(0)
+if arguments[:1] == ['install']:
+    Path('node_modules').mkdir(exist_ok=True)
+    sys.exit(0)
+marker = os.environ.get('{marker_env}')
+if marker:
+    Path(marker).write_text(str(os.getpid()))
+while True:
+    time.sleep(60)
+'''
+
+# 替身后端：立即输出就绪行，然后常驻直到被终止
+BACKEND_STANDIN = '''import time
+
+print("BACKEND_READY port=0", flush=True)
+while True:
+    time.sleep(60)
+'''
+
+# 转调真实后端：以记录输出端监听随机端口，避免与本机已运行的后端冲突；任务历史写入临时目录
+BACKEND_REAL = '''import runpy
+import sys
+
+sys.path.insert(0, {backend_dir!r})
+sys.argv[1:] += ['--port', '0', '--sink', 'recording', '--history-db', {history_db!r}]
+runpy.run_path({backend_script!r}, run_name='__main__')
+'''
+
+
+def write_tool(bin_dir: Path, name: str, script: Path):
+    if os.name == 'nt':
+        (bin_dir / f"{name}.cmd").write_text(f'@"{sys.executable}" "{script}" {name} %*\r\n', encoding='utf-8')
+    else:
+        path = bin_dir / name
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {name} "$@"\n', encoding='utf-8')
+        path.chmod(0o755)
+
+
+def prepare_standins(directory: Path, backend: str) -> Path:
+    """在 directory 下建立替身项目根目录（后端脚本、config/）和替身工具目录，返回工具目录"""
+    root = directory / "root"
+    backend_dir = root / "src" / "backend"
+    backend_dir.mkdir(parents=True)
+    if backend == 'real':
+        source = BACKEND_REAL.format(backend_dir=str(BACKEND_DIR), backend_script=str(BACKEND_DIR / "backend.py"),
+                                     history_db=str(root / "logs" / "job_history.sqlite3"))
+    else:
+        source = BACKEND_STANDIN
+    (backend_dir / "backend.py").write_text(source, encoding='utf-8')
+    config_dir = root / "config"
+    (config_dir / "node_modules").mkdir(parents=True)
+    (config_dir / "package.json").write_text('{"name": "keyboard-typer-standin", "private": true}\n',
+                                             encoding='utf-8')
+
+    bin_dir = directory / "bin"
+    bin_dir.mkdir()
+    script = directory / "tool_standin.py"
+    script.write_text(TOOL_STANDIN.replace('{marker_env}', MARKER_ENV), encoding='utf-8')
+    for name in ('npm', 'node'):
+        write_tool(bin_dir, name, script)
+    return bin_dir
+
+
+def run_probe(directory: Path, bin_dir: Path, server_mode: str, ready_timeout: float, verbose: bool) -> dict:
+    """运行一次探针，返回探针写出的阶段耗时"""
+    result_file = directory / "probe.json"
+    marker = directory / "frontend.started"
+    for path in (result_file, marker):
+        if path.exists():
+            path.unlink()
+    env = dict(os.environ, PATH=str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+    env[MARKER_ENV] = str(marker)
+    output = None if verbose else subprocess.DEVNULL
+    command = [sys.executable, str(PROBE_SCRIPT), '--result', str(result_file), '--root', str(directory / "root"),
+               '--marker', str(marker), '--server', server_mode, '--ready-timeout', str(ready_timeout)]
+    spawned_at = time.time()
+    process = subprocess.run(command + ['--spawned-at', repr(spawned_at)], env=env, stdout=output, stderr=output,
+                             timeout=PROBE_TIMEOUT)
+    if not result_file.exists():
+        raise RuntimeError(f"启动探针异常退出（退出码 {process.returncode}），可加 --verbose 查看输出")
+    with open(result_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_budgets(values: List[str]) -> Dict[str, float]:
+    budgets = {}
+    for value in values:
+        stage, _, seconds = value.partition('=')
+        if not stage or not seconds:
+            raise ValueError(f"预算格式应为 阶段=秒数: {value}")
+        budgets[stage.strip()] = float(seconds)
+    return budgets
+
+
+def summarize(runs: List[dict], budgets: Dict[str, float]) -> List[dict]:
+    """按阶段汇总各次运行的耗时，中位数超出预算的阶段标记 over_budget"""
+    samples: Dict[str, List[float]] = {}
+    for run in runs:
+        for stage in run['stages']:
+            samples.setdefault(stage['stage'], []).append(stage['seconds'])
+    results = []
+    for stage, values in samples.items():
+        row = {
+            'stage': stage,
+            'runs': len(values),
+            'seconds': statistics.median(values),
+            'min_seconds': min(values),
+            'max_seconds': max(values),
+            'first_seconds': values[0],
+            'samples_seconds': values,
+        }
+        if stage in budgets:
+            row['budget_seconds'] = budgets[stage]
+            row['over_budget'] = row['seconds'] > budgets[stage]
+        results.append(row)
+    return results
+
+
+def print_results(results: List[dict]):
+    print(f"\n{'阶段':<30}{'中位数(ms)':>8}{'最小(ms)':>10}{'最大(ms)':>10}{'首次(ms)':>10}{'预算(ms)':>10}")
+    for row in results:
+        budget = f"{row['budget_seconds'] * 1000:.0f}" if 'budget_seconds' in row else '-'
+        marker = '  超出预算!' if row.get('over_budget') else ''
+        print(f"{row['stage']:<32}{row['seconds'] * 1000:>11.1f}{row['min_seconds'] * 1000:>12.1f}"
+              f"{row['max_seconds'] * 1000:>12.1f}{row['first_seconds'] * 1000:>12.1f}{budget:>12}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数（每次都是全新的解释器）")
+    parser.add_argument("--backend", choices=["standin", "real"], default="standin",
+                        help="standin 为立即就绪的替身后端，real 以记录输出端启动真实后端")
+    parser.add_argument("--server", choices=["waitress", "dev"], default="waitress", help="后端HTTP服务模式")
+    parser.add_argument("--ready-timeout", type=float, default=20.0, help="等待后端就绪和前端启动的最长秒数")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="从创建进程到前端启动的总耗时预算（秒，按中位数比较）")
+    parser.add_argument("--stage-budget", action="append", default=[], metavar="阶段=秒数",
+                        help="单个阶段的预算，可重复，如 import:start_app=0.2 或 check:dependencies=1")
+    parser.add_argument("--output", default="startup_bench.json", help="结果JSON文件路径")
+    parser.add_argument("--verbose", action="store_true", help="显示探针、系统检查和启动脚本的输出")
+    args = parser.parse_args()
+
+    try:
+        budgets = parse_budgets(args.stage_budget)
+    except ValueError as error:
+        parser.error(str(error))
+    budgets.setdefault('total', args.budget)
+
+    runs = []
+    errors = []
+    with tempfile.TemporaryDirectory(prefix="keyboard_typer_startup_") as scratch:
+        directory = Path(scratch)
+        bin_dir = prepare_standins(directory, args.backend)
+        for index in range(max(1, args.runs)):
+            run = run_probe(directory, bin_dir, args.server, args.ready_timeout, args.verbose)
+            total = next((stage['seconds'] for stage in run['stages'] if stage['stage'] == 'total'), None)
+            if run['error']:
+                errors.append(run['error'])
+                print(f"第 {index + 1} 次运行失败: {run['error']}", flush=True)
+                break
+            print(f"第 {index + 1} 次运行: 总耗时 {total * 1000:.1f} ms", flush=True)
+            runs.append(run)
+
+    results = summarize(runs, budgets)
+    print_results(results)
+    unknown = sorted(set(budgets) - {row['stage'] for row in results})
+    if unknown and runs:
+        print(f"\n未知的阶段（预算未生效）: {', '.join(unknown)}")
+
+    report = {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': len(runs),
+            'backend': args.backend,
+            'server': args.server,
+            'budgets': budgets,
+            'check_results': runs[-1]['check_results'] if runs else {},
+            'errors': errors,
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存: {args.output}")
+
+    over_budget = [row for row in results if row.get('over_budget')]
+    if errors:
+        print("\n启动失败")
+        return 1
+    if over_budget or unknown:
+        for row in over_budget:
+            print(f"\n{row['stage']} 中位数 {row['seconds']:.3f} 秒，超出预算 {row['budget_seconds']:.3f} 秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动探针，由 startup_bench.py 在全新的解释器中运行
+按 launcher.py 的顺序执行冷启动的各个阶段：导入启动模块、逐项系统检查、启动后端并等待就绪、启动前端，
+把每个阶段的耗时写入 --result 指定的 JSON 文件。
+为了不让基准自身的导入掩盖被测模块的导入耗时，模块顶层只导入 launcher.py 本身也会导入的标准库
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROBE_START = time.time()
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "backend"))
+
+IMPORTS = ('system_checker', 'shortcut_manager', 'start_app')
+# 与 SystemChecker.run_all_checks 的检查项和顺序一致
+CHECKS = ('python_version', 'virtual_environment', 'dependencies', 'nodejs_npm', 'node_modules',
+          'project_structure', 'assets', 'ports', 'permissions')
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name: str, function, *args):
+        start = time.perf_counter()
+        try:
+            result = function(*args)
+        except Exception as error:
+            self.stages.append({'stage': name, 'seconds': time.perf_counter() - start, 'error': str(error)})
+            raise
+        self.stages.append({'stage': name, 'seconds': time.perf_counter() - start})
+        return result
+
+
+def wait_for_file(path: Path, timeout: float, process) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists():
+            return True
+        if process.poll() is not None:
+            return False
+        time.sleep(0.002)
+    return False
+
+
+def stop_process(process):
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except Exception:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动探针（由 startup_bench.py 调用）")
+    parser.add_argument("--result", required=True, help="阶段耗时 JSON 的输出路径")
+    parser.add_argument("--root", required=True, help="放置替身后端与前端配置的项目根目录")
+    parser.add_argument("--spawned-at", type=float, required=True, help="父进程创建本进程时的 time.time()")
+    parser.add_argument("--marker", required=True, help="替身 npm 启动前端后创建的标记文件")
+    parser.add_argument("--server", choices=["waitress", "dev"], default="waitress")
+    parser.add_argument("--ready-timeout", type=float, default=20.0)
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    timer.stages.append({'stage': 'interpreter', 'seconds': PROBE_START - args.spawned_at})
+    modules = {}
+    check_results = {}
+    backend_process = electron_process = None
+    error = None
+    try:
+        for name in IMPORTS:
+            modules[name] = timer.run(f"import:{name}", __import__, name)
+
+        checker = modules['system_checker'].SystemChecker()
+        for name in CHECKS:
+            check_results[name] = timer.run(f"check:{name}", getattr(checker, f"check_{name}"))
+
+        start_app = modules['start_app']
+        root = Path(args.root)
+        backend_process = timer.run('backend_ready', start_app.start_flask_backend, root, args.server,
+                                    args.ready_timeout)
+
+        def spawn_frontend():
+            npm_path = start_app.ensure_npm_available()
+            start_app.install_node_dependencies(npm_path, root)
+            process = start_app.run_electron_app(npm_path, root, dev_mode=False)
+            if not wait_for_file(Path(args.marker), args.ready_timeout, process):
+                stop_process(process)
+                raise RuntimeError("替身 npm 未在超时前启动前端")
+            return process
+
+        electron_process = timer.run('frontend_spawn', spawn_frontend)
+        timer.stages.append({'stage': 'total', 'seconds': time.time() - args.spawned_at})
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        stop_process(electron_process)
+        stop_process(backend_process)
+
+    import json
+    with open(args.result, 'w', encoding='utf-8') as f:
+        json.dump({'stages': timer.stages, 'check_results': check_results, 'error': error}, f, ensure_ascii=False)
+    return 0 if error is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
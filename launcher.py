@@ -67,6 +67,7 @@ def main():
     parser.add_argument("--remove-shortcuts", action="store_true", help="删除快捷方式")
     parser.add_argument("--dev", action="store_true", help="以开发模式启动应用")
     parser.add_argument("--no-check", action="store_true", help="跳过系统检查直接启动")
+    parser.add_argument("--server", choices=["waitress", "dev"], default="waitress", help="后端HTTP服务模式")
     
     args = parser.parse_args()
     
@@ -129,6 +130,7 @@ def main():
     app_args = []
     if args.dev:
         app_args.append("--dev")
+    app_args.extend(["--server", args.server])
     
     # 模拟命令行参数
     original_argv = sys.argv
@@ -1,19 +1,38 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import argparse
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
 import threading
 import time
 import random
-import ctypes
-from ctypes import wintypes
-from pynput.keyboard import Controller, Key
-import win32api
-import win32gui
-import win32con
-import win32process
+from backend_logging import get_log_records, setup_backend_logging
+from text_store import TextStore, compute_text_digest, is_text_digest
+from clocks import create_clock
+from engine_metrics import METRIC_PREFIX, EngineMetrics
+from keystroke_timing import KeystrokeTimeline
+from key_trace import TraceWriter, TracingClock, TracingKeySink
+from job_history import JobHistory, format_timestamp, job_mode
+from profiling import AllocationTracker, MemoryAccountant, SamplingProfiler
+from key_sinks import (
+    KEYEVENTF_EXTENDEDKEY,
+    KEYEVENTF_KEYUP,
+    KEYEVENTF_SCANCODE,
+    create_key_sink,
+    default_sink_name,
+    import_timings,
+)
 
 app = Flask(__name__)
 CORS(app)
 
+# 分级、限流日志，最近记录可通过 /api/logs 查询
+logger = setup_backend_logging()
+
 # 全局状态
 typing_thread = None
 stop_event = threading.Event()
@@ -38,11 +57,50 @@ target_thread_id = None
 input_switch_lock = threading.Lock()
 special_key_delay = 0.30
 
-# 键盘控制器
-keyboard_controller = Controller()
+# 内容寻址文本缓存：重复的大段文本只需上传一次，预处理结果一并缓存
+text_store = TextStore(max_bytes=int(os.environ.get('KEYBOARD_TYPER_TEXT_CACHE_BYTES', 64 * 1024 * 1024)))
+MAX_REQUEST_BODY_BYTES = 256 * 1024 * 1024
+
+# 启动就绪信号，start_app.py 与 main.js 通过该行判断后端已开始监听
+READY_SIGNAL = "BACKEND_READY"
+
+# 按键输出端：pynput/pywin32 在首个打字任务或后台预热时才加载
+key_sink = None
+key_sink_name = os.environ.get('KEYBOARD_TYPER_SINK', default_sink_name())
+key_sink_lock = threading.Lock()
+process_start_time = time.perf_counter()
+
+# 打字引擎的时钟：所有倒计时、按键保持和字符间隔都通过它等待，测试中可替换为虚拟时钟
+clock = create_clock(os.environ.get('KEYBOARD_TYPER_CLOCK', 'real'))
+
+# 当前（或最近一次）打字任务的分阶段耗时统计，每个任务开始时重置，通过 /api/metrics 查询
+engine_metrics = EngineMetrics()
+# 每个字符的计划与实际发送时刻，用于统计节奏精度，通过 /api/metrics/timing 查询
+keystroke_timeline = KeystrokeTimeline()
+# 设置后每个打字任务把所有按键操作和等待写入该目录下的二进制轨迹文件，可用 key_trace.replay_trace 回放
+trace_directory = os.environ.get('KEYBOARD_TYPER_TRACE_DIR') or None
+trace_sequence = 0
+# 每个任务前后的 tracemalloc 快照对比，默认关闭，可通过环境变量或 /api/debug/allocations 开启
+allocation_tracker = AllocationTracker()
+if os.environ.get('KEYBOARD_TYPER_TRACEMALLOC'):
+    allocation_tracker.enable()
+# 按任务阶段记录 Python 堆与 RSS 峰值，结果随 /api/metrics 返回；tracemalloc 会拖慢任务，默认关闭
+memory_accountant = MemoryAccountant()
+if os.environ.get('KEYBOARD_TYPER_MEMORY_PROFILE'):
+    memory_accountant.enable()
+# 每个任务结束后把参数、达到的速度和各阶段耗时追加到本地 SQLite 任务历史，通过 /api/history 汇总；
+# 直接运行后端时默认写入项目根目录的 logs/job_history.sqlite3，作为模块导入时（测试、基准）只在设置环境变量后记录
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    'logs', 'job_history.sqlite3')
+job_history = None
+if os.environ.get('KEYBOARD_TYPER_HISTORY_DB'):
+    job_history = JobHistory(os.environ['KEYBOARD_TYPER_HISTORY_DB'])
+# 同一时间只允许一个采样剖析
+profile_lock = threading.Lock()
+MAX_PROFILE_SECONDS = 60
+MAX_PROFILE_HZ = 1000
 
 # Windows API 常量
-user32 = ctypes.windll.user32
 VK_SHIFT = 0x10
 VK_TAB = 0x09
 VK_SPACE = 0x20
@@ -56,13 +114,131 @@ SCANCODE_HOME = 0x47
 SCANCODE_DELETE = 0x53
 
 
+def get_key_sink():
+    """获取按键输出端，首次调用时加载平台模块"""
+    global key_sink
+    if key_sink is None:
+        with key_sink_lock:
+            if key_sink is None:
+                key_sink = create_key_sink(key_sink_name)
+    return key_sink
+
+
+def set_key_sink(sink):
+    """替换按键输出端（用于测试和基准）"""
+    global key_sink
+    with key_sink_lock:
+        key_sink = sink
+
+
+def set_clock(new_clock):
+    """替换打字引擎的时钟（用于测试和基准）"""
+    global clock
+    clock = new_clock
+
+
+def set_trace_directory(path):
+    """设置按键轨迹目录，None 表示不记录"""
+    global trace_directory
+    trace_directory = str(path) if path else None
+
+
+def set_job_history(path):
+    """设置任务历史库路径，None 表示不记录"""
+    global job_history
+    previous, job_history = job_history, JobHistory(path) if path else None
+    if previous is not None:
+        previous.close()
+
+
+def describe_target_app(sink) -> str:
+    """前台窗口所属程序的名称，无法获取时返回空串"""
+    try:
+        window = sink.get_foreground_window()
+        return sink.get_window_process_name(window) if window else ''
+    except Exception as error:
+        logger.warning("获取目标程序失败: %s", error)
+        return ''
+
+
+def record_job_history(job: dict, text: str):
+    """把结束的任务追加到任务历史库（未给出文本哈希时由 text 计算）；任何失败只记录日志，不影响任务的收尾"""
+    history = job_history
+    if history is None:
+        return
+    try:
+        phases = engine_metrics.snapshot()['phases']
+        job.update(
+            text_hash=job.get('text_hash') or compute_text_digest(text),
+            mode=job_mode(job['ide_mode'], job['auto_switch']),
+            sink=getattr(key_sink, 'name', key_sink_name),
+            switch_count=phases.get('ensure_input_layout', {}).get('count', 0),
+            countdown_seconds=phases.get('countdown', {}).get('total_seconds', 0.0),
+            send_enter_seconds=phases.get('send_enter', {}).get('total_seconds', 0.0),
+            phases={name: stats['total_seconds'] for name, stats in phases.items()},
+        )
+        typing_seconds = job.get('typing_seconds')
+        job['achieved_cps'] = job['typed_characters'] / typing_seconds if typing_seconds else None
+        history.append(job)
+    except Exception as error:
+        logger.warning("写入任务历史失败: %s", error)
+
+
+def start_trace(text_digest: str = None):
+    """打开本次任务的轨迹文件，并把按键输出端与时钟换成记录轨迹的包装，返回恢复所需的信息"""
+    global key_sink, clock
+    global trace_sequence
+    trace_sequence += 1
+    name = f"trace_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{trace_sequence:04d}_{(text_digest or 'inline')[:8]}.ktrace"
+    writer = TraceWriter(os.path.join(trace_directory, name))
+    previous_sink, previous_clock = get_key_sink(), clock
+    start_ns = previous_clock.now_ns()
+    with key_sink_lock:
+        key_sink = TracingKeySink(previous_sink, writer, previous_clock, start_ns)
+    clock = TracingClock(previous_clock, writer, start_ns)
+    return writer, previous_sink, previous_clock
+
+
+def stop_trace(trace):
+    """恢复原来的按键输出端与时钟并关闭轨迹文件"""
+    global clock
+    writer, previous_sink, previous_clock = trace
+    set_key_sink(previous_sink)
+    clock = previous_clock
+    writer.close()
+    engine_metrics.update_job(trace_path=str(writer.path), trace_records=writer.records)
+
+
+def warm_up_key_sink():
+    """服务开始监听后在后台预热按键输出端与输入法句柄"""
+    def warm_up():
+        try:
+            get_key_sink()
+            prepare_input_layout_handles()
+        except Exception as error:
+            logger.error("预热按键输出端失败: %s", error)
+
+    threading.Thread(target=warm_up, name="key-sink-warmup", daemon=True).start()
+
+
+def tap_key(key_name: str):
+    """按下并释放一个按键"""
+    sink = get_key_sink()
+    start = clock.now()
+    sink.press_key(key_name)
+    sink.release_key(key_name)
+    engine_metrics.record('tap_key', clock.now() - start)
+
+
 def send_unicode_character(character: str):
     """发送Unicode字符"""
     try:
-        keyboard_controller.type(character)
+        start = clock.now()
+        get_key_sink().type_character(character)
+        engine_metrics.record('unicode_send', clock.now() - start)
         return True
     except Exception as e:
-        print(f"Unicode 字符输入失败: {e}")
+        logger.warning("Unicode 字符输入失败: %s", e)
         return False
 
 
@@ -71,7 +247,8 @@ def prepare_input_layout_handles():
     global layout_handles, english_layout_hkl, chinese_layout_hkl
     try:
         layout_handles.clear()
-        layouts = win32api.GetKeyboardLayoutList()
+        sink = get_key_sink()
+        layouts = sink.get_keyboard_layout_list()
         if layouts:
             for hkl in layouts:
                 lang_id = hkl & 0xFFFF
@@ -82,15 +259,15 @@ def prepare_input_layout_handles():
                     chinese_layout_hkl = hkl
         if english_layout_hkl is None:
             try:
-                loaded = win32api.LoadKeyboardLayout("00000409", 0)
+                loaded = sink.load_keyboard_layout("00000409")
                 if loaded:
                     english_layout_hkl = loaded
                     layout_handles.setdefault(0x0409, []).append(loaded)
             except Exception as error:
-                print(f"加载英文输入法失败: {error}")
-        print(f"初始化输入法句柄 -> 英文: {hex(english_layout_hkl) if english_layout_hkl else 'None'}")
+                logger.warning("加载英文输入法失败: %s", error)
+        logger.info("初始化输入法句柄 -> 英文: %s", hex(english_layout_hkl) if english_layout_hkl else 'None')
     except Exception as error:
-        print(f"初始化输入法句柄失败: {error}")
+        logger.error("初始化输入法句柄失败: %s", error)
 
 
 def set_target_window_context(window_handle: int):
@@ -99,15 +276,16 @@ def set_target_window_context(window_handle: int):
     try:
         target_window_handle = window_handle
         if window_handle:
-            thread_id, _ = win32process.GetWindowThreadProcessId(window_handle)
+            sink = get_key_sink()
+            thread_id = sink.get_window_thread_id(window_handle)
             target_thread_id = thread_id
-            original_input_method = win32api.GetKeyboardLayout(thread_id)
+            original_input_method = sink.get_keyboard_layout(thread_id)
             current_active_layout = original_input_method
             prepare_input_layout_handles()
         else:
             target_thread_id = None
     except Exception as error:
-        print(f"获取目标窗口线程信息失败: {error}")
+        logger.warning("获取目标窗口线程信息失败: %s", error)
         target_thread_id = None
 
 
@@ -115,28 +293,26 @@ def activate_layout_for_target(layout_handle: int) -> bool:
     """为目标窗口激活输入法"""
     if not layout_handle or not target_thread_id or not target_window_handle:
         return False
-    current_thread_id = win32api.GetCurrentThreadId()
+    sink = get_key_sink()
+    current_thread_id = sink.get_current_thread_id()
     attached = False
     try:
         if current_thread_id != target_thread_id:
-            ctypes.set_last_error(0)
-            attach_result = user32.AttachThreadInput(current_thread_id, target_thread_id, True)
-            if attach_result:
+            if sink.attach_thread_input(current_thread_id, target_thread_id, True):
                 attached = True
-        ctypes.set_last_error(0)
-        user32.ActivateKeyboardLayout(ctypes.c_void_p(layout_handle & 0xFFFFFFFFFFFFFFFF), 0)
-        win32gui.PostMessage(
+        sink.activate_keyboard_layout(layout_handle)
+        sink.post_message(
             target_window_handle,
             WM_INPUTLANGCHANGEREQUEST,
             0,
             layout_handle
         )
-        time.sleep(0.05)
+        clock.sleep(0.05, label='layout_switch')
         return True
     except Exception as error:
-        print(f"激活输入法时发生异常: {error}")
+        logger.warning("激活输入法时发生异常: %s", error)
         if attached:
-            user32.AttachThreadInput(current_thread_id, target_thread_id, False)
+            sink.attach_thread_input(current_thread_id, target_thread_id, False)
     return False
 
 
@@ -155,9 +331,11 @@ def ensure_input_layout(layout_type: str, auto_switch: bool):
         return
     if current_active_layout and (current_active_layout & 0xFFFFFFFF) == (desired & 0xFFFFFFFF):
         return
+    start = clock.now()
     with input_switch_lock:
         activate_layout_for_target(desired)
         current_active_layout = desired
+    engine_metrics.record('ensure_input_layout', clock.now() - start)
 
 
 def classify_character_layout(character: str):
@@ -172,43 +350,53 @@ def classify_character_layout(character: str):
     return "chinese"
 
 
-def send_special_key(vk_code: int, pynput_key: Key, post_delay: float = 0.0, hold_time: float = 0.015) -> bool:
+def send_special_key(vk_code: int, key_name: str, post_delay: float = 0.0, hold_time: float = 0.015) -> bool:
     """发送特殊键"""
+    sink = get_key_sink()
+    start = clock.now()
     try:
-        win32api.keybd_event(vk_code, 0, 0, 0)
+        sink.keybd_event(vk_code, 0, 0)
         if hold_time > 0:
-            time.sleep(hold_time)
-        win32api.keybd_event(vk_code, 0, win32con.KEYEVENTF_KEYUP, 0)
+            clock.sleep(hold_time, label='key_hold')
+        sink.keybd_event(vk_code, 0, KEYEVENTF_KEYUP)
     except Exception:
         try:
-            keyboard_controller.press(pynput_key)
+            sink.press_key(key_name)
             if hold_time > 0:
-                time.sleep(hold_time)
-            keyboard_controller.release(pynput_key)
+                clock.sleep(hold_time, label='key_hold')
+            sink.release_key(key_name)
         except Exception as e:
-            print(f"发送特殊键失败: {e}")
+            logger.warning("发送特殊键失败: %s", e)
             return False
+    engine_metrics.record('special_key', clock.now() - start)
     if post_delay > 0:
-        time.sleep(post_delay)
+        start = clock.now()
+        clock.sleep(post_delay, label='key_settle')
+        engine_metrics.record('key_settle', clock.now() - start)
     return True
 
 
 def send_scan_key(scancode: int, extended: bool = False, post_delay: float = 0.12, hold_time: float = 0.015) -> bool:
     """发送扫描码"""
-    flags_down = win32con.KEYEVENTF_SCANCODE
+    flags_down = KEYEVENTF_SCANCODE
     if extended:
-        flags_down |= win32con.KEYEVENTF_EXTENDEDKEY
-    flags_up = flags_down | win32con.KEYEVENTF_KEYUP
+        flags_down |= KEYEVENTF_EXTENDEDKEY
+    flags_up = flags_down | KEYEVENTF_KEYUP
+    sink = get_key_sink()
+    start = clock.now()
     try:
-        win32api.keybd_event(0, scancode, flags_down, 0)
+        sink.keybd_event(0, scancode, flags_down)
         if hold_time > 0:
-            time.sleep(hold_time)
-        win32api.keybd_event(0, scancode, flags_up, 0)
+            clock.sleep(hold_time, label='key_hold')
+        sink.keybd_event(0, scancode, flags_up)
     except Exception as error:
-        print(f"扫描码发送失败: {error}")
+        logger.warning("扫描码发送失败: %s", error)
         return False
+    engine_metrics.record('scan_key', clock.now() - start)
     if post_delay > 0:
-        time.sleep(post_delay)
+        start = clock.now()
+        clock.sleep(post_delay, label='key_settle')
+        engine_metrics.record('key_settle', clock.now() - start)
     return True
 
 
@@ -216,17 +404,20 @@ def clear_auto_indent(settle_delay: float = 0.04) -> bool:
     """清除自动缩进"""
     success = True
     shift_pressed = False
+    sink = get_key_sink()
     try:
-        win32api.keybd_event(VK_SHIFT, 0, 0, 0)
+        sink.keybd_event(VK_SHIFT, 0, 0)
         shift_pressed = True
-        time.sleep(0.01)
+        clock.sleep(0.01, label='key_hold')
         if not send_scan_key(SCANCODE_HOME, extended=True, post_delay=0.015, hold_time=0.01):
             success = False
     except Exception:
         success = False
+    finally:
+        # Shift 只用于 Shift+Home 选中缩进，删除前必须松开，否则后续的回车/Tab 会变成 Shift+回车/Shift+Tab
         if shift_pressed:
             try:
-                win32api.keybd_event(VK_SHIFT, 0, win32con.KEYEVENTF_KEYUP, 0)
+                sink.keybd_event(VK_SHIFT, 0, KEYEVENTF_KEYUP)
             except Exception:
                 pass
     if not send_scan_key(SCANCODE_DELETE, extended=True, post_delay=settle_delay, hold_time=0.01):
@@ -242,28 +433,73 @@ def preprocess_text_content(text_content: str, ide_mode: bool) -> str:
     return processed_text
 
 
+def build_typing_plan(text_content: str, ide_mode: bool) -> dict:
+    """生成打字计划：预处理后的文本，IDE模式下附带按行拆分结果"""
+    processed_text = preprocess_text_content(text_content, ide_mode)
+    return {
+        'processed_text': processed_text,
+        'lines': processed_text.split('\n') if ide_mode else None
+    }
+
+
 def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: int, 
-                   send_enter: bool, auto_switch: bool, ide_mode: bool):
+                   send_enter: bool, auto_switch: bool, ide_mode: bool, text_digest: str = None):
     """执行打字"""
     global status, original_input_method, target_window_handle, target_thread_id, current_active_layout
     
+    job_start = clock.now()
+    started_at = time.time()
+    typed_characters = 0
+    target_app = None
+    plan_seconds = typing_seconds = None
+    engine_metrics.reset(speed_cps=speed_cps, countdown=countdown, jitter=jitter, ide_mode=bool(ide_mode),
+                         auto_switch=bool(auto_switch), total_characters=len(text_content))
+    keystroke_timeline.reset(scheduled_cps=max(1, speed_cps))
+    allocation_tracker.start_job()
+    memory_accountant.enter_stage('countdown')
+    trace = None
     try:
+        if trace_directory:
+            trace = start_trace(text_digest)
+        # 首个任务时加载平台按键模块（若后台预热尚未完成）
+        sink = get_key_sink()
+
         # 倒计时阶段
         for remaining in range(countdown, 0, -1):
             if stop_event.is_set():
-                return
+                break
             status['current_status'] = f'COUNTDOWN_{remaining}S'
             status['last_event'] = f'PREP_PHASE'
-            time.sleep(1)
+            phase_start = clock.now()
+            interrupted = clock.sleep(1, stop_event, label='countdown')
+            engine_metrics.record('countdown', clock.now() - phase_start)
+            if interrupted:
+                break
 
+        # 倒计时中停止的任务同样记为中止，任务历史和指标中不会留下 COUNTDOWN_nS
         if stop_event.is_set():
+            status['current_status'] = 'ABORTED'
+            status['last_event'] = 'USER_HALT'
             return
 
         status['current_status'] = 'TYPING'
         status['last_event'] = 'INITIATED'
+        if job_history is not None:
+            target_app = describe_target_app(sink)
 
-        # 预处理文本
-        processed_text = preprocess_text_content(text_content, ide_mode)
+        # 预处理文本（同一文本的计划会被缓存复用）
+        memory_accountant.enter_stage('plan')
+        phase_start = clock.now()
+        plan = None
+        if text_digest:
+            plan = text_store.get_plan(text_digest, ('ide', bool(ide_mode)),
+                                       lambda text: build_typing_plan(text, ide_mode))
+        if plan is None:
+            plan = build_typing_plan(text_content, ide_mode)
+        processed_text = plan['processed_text']
+        plan_seconds = clock.now() - phase_start
+        memory_accountant.enter_stage('typing')
+        typing_start = clock.now()
         
         # 计算字符延时 - 直接使用字符/秒
         input_speed = max(1, speed_cps)  # 确保速度至少为1字符/秒
@@ -278,23 +514,28 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
         ide_mode_enabled = ide_mode
         active_layout_type = None
         special_key_delay_val = special_key_delay if ide_mode_enabled else 0.0
+        # 按截止时间安排下一次按键，发送本身的耗时不会累积成节奏漂移；
+        # 切换输入法、特殊键等待使进度落后超过一个间隔时从当前时刻重新计时，不连发补齐
+        next_key_time = clock.now()
 
         if auto_switch_enabled:
-            target_window = win32gui.GetForegroundWindow()
+            target_window = sink.get_foreground_window()
             if target_window:
                 set_target_window_context(target_window)
 
         if ide_mode_enabled:
-            lines = processed_text.split('\n')
+            lines = plan['lines']
             total_lines = len(lines)
-            trailing_newline = processed_text.endswith('\n')
 
             for line_index, line in enumerate(lines):
                 if stop_event.is_set():
                     break
 
                 if line_index > 0:
+                    phase_start = clock.now()
                     clear_auto_indent(settle_delay=0.04)
+                    next_key_time = clock.now()
+                    engine_metrics.record('clear_auto_indent', next_key_time - phase_start)
 
                 for character in line:
                     if stop_event.is_set():
@@ -309,10 +550,10 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
                     if character == "\t":
                         tab_delay = special_key_delay_val / 2 if special_key_delay_val > 0 else 0.0
                         if not send_scan_key(SCANCODE_TAB, post_delay=tab_delay):
-                            send_special_key(VK_TAB, Key.tab, post_delay=tab_delay)
+                            send_special_key(VK_TAB, 'tab', post_delay=tab_delay)
                     elif character == " ":
                         if not send_scan_key(SCANCODE_SPACE, post_delay=0.0, hold_time=0.01):
-                            send_special_key(VK_SPACE, Key.space, post_delay=0.0, hold_time=0.01)
+                            send_special_key(VK_SPACE, 'space', post_delay=0.0, hold_time=0.01)
                     elif ord(character) < 32:
                         continue
                     else:
@@ -320,31 +561,38 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
 
                     typed_characters += 1
                     status['progress'] = typed_characters
+                    keystroke_timeline.record(round(next_key_time * 1e9), clock.now_ns())
 
                     # 计算实际延时（包含随机抖动）
                     actual_delay = character_delay
                     if random_jitter > 0.0:
                         actual_delay += random.uniform(-random_jitter, random_jitter)
                     actual_delay = max(0.001, actual_delay)
-                    time.sleep(actual_delay)
+                    phase_start = clock.now()
+                    next_key_time += actual_delay
+                    if next_key_time < phase_start:
+                        next_key_time = phase_start + actual_delay
+                    interrupted = clock.sleep_until(next_key_time, stop_event, label='inter_key')
+                    engine_metrics.record('inter_key_sleep', clock.now() - phase_start)
+                    if interrupted:
+                        break
 
-                newline_needed = (
-                    (line_index < total_lines - 1) or
-                    (line_index == total_lines - 1 and trailing_newline)
-                )
+                # 以换行结尾的文本拆分后最后一行为空串，行间的回车已经包含了结尾换行
+                newline_needed = line_index < total_lines - 1
 
                 if stop_event.is_set():
                     break
 
                 if newline_needed:
+                    phase_start = clock.now()
                     if auto_switch_enabled:
                         ensure_input_layout("english", auto_switch_enabled)
                         active_layout_type = "english"
-                    time.sleep(0.05)
+                    clock.sleep(0.05, label='line_break')
                     if not send_scan_key(SCANCODE_ESCAPE, post_delay=0.05, hold_time=0.01):
-                        send_special_key(VK_ESCAPE, Key.esc, post_delay=0.05, hold_time=0.01)
+                        send_special_key(VK_ESCAPE, 'esc', post_delay=0.05, hold_time=0.01)
                     if not send_scan_key(SCANCODE_ENTER, post_delay=max(0.15, special_key_delay_val), hold_time=0.02):
-                        send_special_key(VK_RETURN, Key.enter, post_delay=max(0.15, special_key_delay_val), hold_time=0.02)
+                        send_special_key(VK_RETURN, 'enter', post_delay=max(0.15, special_key_delay_val), hold_time=0.02)
                     typed_characters += 1
                     status['progress'] = typed_characters
                     
@@ -353,7 +601,8 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
                     if random_jitter > 0.0:
                         actual_delay += random.uniform(-random_jitter, random_jitter / 2)
                     actual_delay = max(0.01, actual_delay)
-                    time.sleep(actual_delay)
+                    clock.sleep(actual_delay, stop_event, label='line_break')
+                    engine_metrics.record('line_break', clock.now() - phase_start)
         else:
             for character in processed_text:
                 if stop_event.is_set():
@@ -369,40 +618,50 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
                         active_layout_type = layout_type
 
                 if character == "\n":
-                    keyboard_controller.press(Key.enter)
-                    keyboard_controller.release(Key.enter)
+                    tap_key('enter')
                 elif character == "\t":
-                    keyboard_controller.press(Key.tab)
-                    keyboard_controller.release(Key.tab)
+                    tap_key('tab')
                 elif character == " ":
-                    keyboard_controller.press(Key.space)
-                    keyboard_controller.release(Key.space)
+                    tap_key('space')
                 elif ord(character) < 32:
                     continue
                 else:
-                    keyboard_controller.type(character)
+                    phase_start = clock.now()
+                    sink.type_character(character)
+                    engine_metrics.record('unicode_send', clock.now() - phase_start)
 
                 typed_characters += 1
                 status['progress'] = typed_characters
+                keystroke_timeline.record(round(next_key_time * 1e9), clock.now_ns())
 
                 # 计算实际延时（包含随机抖动）
                 actual_delay = character_delay
                 if random_jitter > 0.0:
                     actual_delay += random.uniform(-random_jitter, random_jitter)
                 actual_delay = max(0.001, actual_delay)
-                time.sleep(actual_delay)
+                phase_start = clock.now()
+                next_key_time += actual_delay
+                if next_key_time < phase_start:
+                    next_key_time = phase_start + actual_delay
+                interrupted = clock.sleep_until(next_key_time, stop_event, label='inter_key')
+                engine_metrics.record('inter_key_sleep', clock.now() - phase_start)
+                if interrupted:
+                    break
+
+        typing_seconds = clock.now() - typing_start
 
         # 发送回车键
         if not stop_event.is_set() and send_enter:
-            time.sleep(0.2)
+            phase_start = clock.now()
+            clock.sleep(0.2, stop_event, label='send_enter')
             if ide_mode_enabled:
                 if not send_scan_key(SCANCODE_ESCAPE, post_delay=0.05, hold_time=0.01):
-                    send_special_key(VK_ESCAPE, Key.esc, post_delay=0.05, hold_time=0.01)
+                    send_special_key(VK_ESCAPE, 'esc', post_delay=0.05, hold_time=0.01)
                 if not send_scan_key(SCANCODE_ENTER, post_delay=max(0.15, special_key_delay), hold_time=0.02):
-                    send_special_key(VK_RETURN, Key.enter, post_delay=max(0.15, special_key_delay), hold_time=0.02)
+                    send_special_key(VK_RETURN, 'enter', post_delay=max(0.15, special_key_delay), hold_time=0.02)
             else:
-                keyboard_controller.press(Key.enter)
-                keyboard_controller.release(Key.enter)
+                tap_key('enter')
+            engine_metrics.record('send_enter', clock.now() - phase_start)
 
         if stop_event.is_set():
             status['current_status'] = 'ABORTED'
@@ -412,27 +671,83 @@ def execute_typing(text_content: str, speed_cps: int, countdown: int, jitter: in
             status['last_event'] = 'MISSION_SUCCESS'
 
     except Exception as error:
-        print(f"输入过程中发生错误: {error}")
+        logger.error("输入过程中发生错误: %s", error)
         status['current_status'] = 'ERROR'
         status['last_event'] = f'ERROR_{str(error)[:20]}'
     finally:
-        # 恢复原始输入法
-        if auto_switch and original_input_method:
-            try:
-                if target_thread_id:
-                    activate_layout_for_target(original_input_method)
-                current_active_layout = original_input_method
-            except Exception:
-                pass
-            original_input_method = None
-            target_window_handle = None
-            target_thread_id = None
-            current_active_layout = None
-        
-        # 重置状态和清理线程引用
-        status['is_typing'] = False
-        global typing_thread
-        typing_thread = None
+        try:
+            # 恢复原始输入法
+            if auto_switch and original_input_method:
+                try:
+                    if target_thread_id:
+                        activate_layout_for_target(original_input_method)
+                    current_active_layout = original_input_method
+                except Exception:
+                    pass
+                original_input_method = None
+                target_window_handle = None
+                target_thread_id = None
+                current_active_layout = None
+
+            if trace is not None:
+                stop_trace(trace)
+
+            engine_metrics.update_job(typed_characters=typed_characters, duration_seconds=clock.now() - job_start,
+                                      outcome=status['current_status'])
+            allocation_tracker.finish_job(total_characters=len(text_content), outcome=status['current_status'])
+            memory_accountant.finish_job(text_bytes=sys.getsizeof(text_content), total_characters=len(text_content),
+                                         outcome=status['current_status'])
+            if job_history is not None:
+                record_job_history({
+                    'started_at': format_timestamp(started_at), 'finished_at': format_timestamp(time.time()),
+                    'outcome': status['current_status'], 'target_app': target_app, 'speed_cps': speed_cps,
+                    'countdown': countdown, 'jitter': jitter, 'send_enter': send_enter, 'auto_switch': auto_switch,
+                    'ide_mode': ide_mode, 'text_hash': text_digest,
+                    'text_length': len(text_content), 'typed_characters': typed_characters,
+                    'plan_seconds': plan_seconds, 'typing_seconds': typing_seconds,
+                    'total_seconds': clock.now() - job_start,
+                }, text_content)
+        finally:
+            # 重置状态和清理线程引用：收尾中的任何失败都不能让界面停在“输入中”
+            status['is_typing'] = False
+            global typing_thread
+            typing_thread = None
+
+
+def read_request_body() -> bytes:
+    """读取请求体，按 Content-Encoding 解压 gzip 或 zstd"""
+    body = request.get_data(cache=False)
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=io.BytesIO(body))
+    elif encoding == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError('zstd encoding requires the zstandard package')
+        stream = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body))
+    else:
+        raise ValueError(f'Unsupported Content-Encoding: {encoding}')
+    try:
+        decoded = stream.read(MAX_REQUEST_BODY_BYTES + 1)
+    except Exception as error:
+        raise ValueError(f'Invalid {encoding} body: {error}')
+    if len(decoded) > MAX_REQUEST_BODY_BYTES:
+        raise ValueError('Request body too large')
+    return decoded
+
+
+def read_request_json() -> dict:
+    """读取（可能经过压缩的）JSON请求体"""
+    try:
+        data = json.loads(read_request_body() or b'{}')
+    except (UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError(f'Invalid JSON body: {error}')
+    if not isinstance(data, dict):
+        raise ValueError('JSON body must be an object')
+    return data
 
 
 @app.route('/api/start', methods=['POST'])
@@ -440,16 +755,38 @@ def start_typing():
     """开始打字"""
     global typing_thread, stop_event, status
     
-    # 检查是否有活跃的输入线程
-    if typing_thread and typing_thread.is_alive():
+    # 检查是否有活跃的输入线程（打字线程结束时会清空全局引用，先取局部引用再判断）
+    current_thread = typing_thread
+    if current_thread and current_thread.is_alive():
         return jsonify({'success': False, 'message': 'Already typing'}), 400
     
     # 如果上一个线程已完成，清理线程引用
-    if typing_thread and not typing_thread.is_alive():
+    if current_thread and not current_thread.is_alive():
         typing_thread = None
     
-    data = request.json
-    text_content = data.get('text', '')
+    # 内存统计的第一个阶段：请求体、解析出的 JSON 和文本缓存
+    memory_accountant.start_job()
+    try:
+        data = read_request_json()
+    except ValueError as error:
+        memory_accountant.cancel_job()
+        return jsonify({'success': False, 'message': str(error)}), 400
+
+    text_content = data.get('text')
+    text_digest = data.get('textHash')
+    if text_digest is not None and not is_text_digest(text_digest):
+        memory_accountant.cancel_job()
+        return jsonify({'success': False, 'message': 'Invalid textHash'}), 400
+    if text_content is None and text_digest:
+        # 客户端只发送哈希：命中缓存则无需重新上传文本
+        text_content = text_store.get(text_digest)
+        if text_content is None:
+            memory_accountant.cancel_job()
+            return jsonify({'success': False, 'missing': True, 'message': 'Text not cached'}), 404
+    elif text_content:
+        text_digest = compute_text_digest(text_content)
+        text_store.put(text_content, text_digest)
+    text_content = text_content or ''
     speed_cps = int(data.get('speed', 5))  # 默认5字符/秒
     countdown = int(data.get('countdown', 3))
     jitter = int(data.get('jitter', 5))
@@ -458,6 +795,7 @@ def start_typing():
     ide_mode = data.get('ideMode', False)
     
     if not text_content.strip():
+        memory_accountant.cancel_job()
         return jsonify({'success': False, 'message': 'No text provided'}), 400
     
     stop_event.clear()
@@ -471,12 +809,33 @@ def start_typing():
     
     typing_thread = threading.Thread(
         target=execute_typing,
-        args=(text_content, speed_cps, countdown, jitter, send_enter, auto_switch, ide_mode),
+        args=(text_content, speed_cps, countdown, jitter, send_enter, auto_switch, ide_mode, text_digest),
+        name='typing',
         daemon=True
     )
     typing_thread.start()
     
-    return jsonify({'success': True, 'message': 'Typing started'})
+    return jsonify({'success': True, 'message': 'Typing started', 'textHash': text_digest})
+
+
+@app.route('/api/texts/<digest>', methods=['GET'])
+def check_text(digest):
+    """查询文本是否已缓存"""
+    return jsonify({'exists': text_store.contains(digest), 'cache': text_store.stats()})
+
+
+@app.route('/api/texts/<digest>', methods=['PUT'])
+def upload_text(digest):
+    """上传文本到内容寻址缓存，请求体为UTF-8文本，可使用 gzip/zstd 压缩"""
+    try:
+        text_content = read_request_body().decode('utf-8')
+    except (ValueError, UnicodeDecodeError) as error:
+        return jsonify({'success': False, 'message': str(error)}), 400
+    if compute_text_digest(text_content) != digest:
+        return jsonify({'success': False, 'message': 'Hash mismatch'}), 400
+    # 超过缓存上限的文本不会被缓存，客户端需在 /api/start 中直接发送完整文本
+    cached = text_store.put(text_content, digest)
+    return jsonify({'success': True, 'cached': cached, 'textHash': digest})
 
 
 @app.route('/api/stop', methods=['POST'])
@@ -487,12 +846,13 @@ def stop_typing():
     # 设置停止信号
     stop_event.set()
     
-    # 等待线程结束（最多等待2秒）
-    if typing_thread and typing_thread.is_alive():
-        typing_thread.join(timeout=2.0)
-        if typing_thread.is_alive():
+    # 等待线程结束（最多等待2秒）；打字线程结束时会清空全局引用，使用局部引用
+    current_thread = typing_thread
+    if current_thread and current_thread.is_alive():
+        current_thread.join(timeout=2.0)
+        if current_thread.is_alive():
             # 如果线程仍在运行，强制清理状态
-            print("Warning: Typing thread did not stop gracefully")
+            logger.warning("Typing thread did not stop gracefully")
     
     # 确保状态正确重置
     status.update({
@@ -543,17 +903,245 @@ def get_status():
     })
 
 
+@app.route('/api/logs', methods=['GET'])
+def get_logs():
+    """获取最近的后端日志"""
+    min_level = request.args.get('level', 'NOTSET')
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    return jsonify(get_log_records(min_level, since, limit))
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    获取当前（或最近一次）打字任务的分阶段指标，开启内存统计时 memory 中为最近一个任务各阶段的堆与 RSS 峰值；
+    format=prometheus 时返回 Prometheus 文本格式
+    """
+    snapshot = engine_metrics.snapshot()
+    if request.args.get('format') == 'prometheus':
+        text = engine_metrics.to_prometheus(snapshot) + memory_accountant.to_prometheus(METRIC_PREFIX)
+        return Response(text, mimetype='text/plain; version=0.0.4')
+    snapshot['memory'] = memory_accountant.state()
+    return jsonify(snapshot)
+
+
+@app.route('/api/metrics/timing', methods=['GET'])
+def get_timing_metrics():
+    """获取当前（或最近一次）打字任务的按键节奏统计：实际与计划间隔、间隔误差直方图和漂移"""
+    return jsonify(keystroke_timeline.summary())
+
+
+def profile_targets(scope: str):
+    """采样目标：typing 只采打字线程（每次采样时重新查找，剖析期间开始的任务也能采到），all 为所有其他线程"""
+    if scope == 'all':
+        return lambda: [(thread.name, thread.ident) for thread in threading.enumerate()]
+
+    def typing_target():
+        thread = typing_thread
+        return [(thread.name, thread.ident)] if thread is not None and thread.is_alive() else []
+    return typing_target
+
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """
+    任务历史汇总：group=target_app（默认）|mode|speed_cps|sink|outcome|text_hash 分组的中位数达到速度等，
+    outcome 默认只统计完成的任务（all 为全部），since 为起始时间（YYYY-MM-DD HH:MM:SS），limit 为返回的最近任务数
+    """
+    history = job_history
+    if history is None:
+        return jsonify({'enabled': False, 'total_jobs': 0, 'groups': [], 'recent': []})
+    group_by = request.args.get('group', 'target_app')
+    outcome = request.args.get('outcome', 'COMPLETED')
+    limit = max(0, min(request.args.get('limit', 20, type=int), 1000))
+    try:
+        groups = history.aggregate(group_by, None if outcome == 'all' else outcome, request.args.get('since'))
+    except ValueError as error:
+        return jsonify({'success': False, 'message': str(error)}), 400
+    return jsonify({'enabled': True, 'path': str(history.path), 'total_jobs': history.count(), 'group': group_by,
+                    'groups': groups, 'recent': history.recent(limit)})
+
+
+@app.route('/api/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    对运行中的后端采样剖析 seconds 秒（默认 5），hz 为采样频率（默认 100），
+    thread=typing|all，format=collapsed（折叠栈文本）|speedscope（JSON）
+    """
+    seconds = request.args.get('seconds', 5.0, type=float)
+    hz = request.args.get('hz', 100.0, type=float)
+    scope = request.args.get('thread', 'typing')
+    output_format = request.args.get('format', 'collapsed')
+    if not 0 < seconds <= MAX_PROFILE_SECONDS or not 0 < hz <= MAX_PROFILE_HZ:
+        return jsonify({'success': False,
+                        'message': f'seconds 须在 (0, {MAX_PROFILE_SECONDS}]，hz 须在 (0, {MAX_PROFILE_HZ}]'}), 400
+    if scope not in ('typing', 'all') or output_format not in ('collapsed', 'speedscope'):
+        return jsonify({'success': False, 'message': 'thread 须为 typing/all，format 须为 collapsed/speedscope'}), 400
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'Profile already running'}), 409
+    try:
+        profile = SamplingProfiler(hz).run(seconds, profile_targets(scope), name=f'keyboard-typer {scope}',
+                                           label_threads=scope == 'all')
+    finally:
+        profile_lock.release()
+
+    headers = {f'X-Profile-{key.replace("_", "-").title()}': str(value) for key, value in profile.summary().items()}
+    if output_format == 'speedscope':
+        response = jsonify(profile.to_speedscope())
+        response.headers.update(headers)
+        return response
+    return Response(profile.to_collapsed(), mimetype='text/plain', headers=headers)
+
+
+@app.route('/api/debug/allocations', methods=['GET', 'POST'])
+def debug_allocations():
+    """查询最近一个任务的 tracemalloc 快照对比；POST {"enabled": true/false, "limit": N} 开启或关闭"""
+    if request.method == 'POST':
+        try:
+            data = read_request_json()
+        except ValueError as error:
+            return jsonify({'success': False, 'message': str(error)}), 400
+        if data.get('enabled'):
+            allocation_tracker.enable(int(data.get('limit') or 0) or None)
+        elif 'enabled' in data:
+            allocation_tracker.disable()
+    return jsonify(allocation_tracker.state())
+
+
+@app.route('/api/debug/memory', methods=['GET', 'POST'])
+def debug_memory():
+    """查询按阶段的内存统计；POST {"enabled": true/false, "interval": 秒} 开启或关闭（开启时 RSS 按 interval 采样）"""
+    if request.method == 'POST':
+        try:
+            data = read_request_json()
+        except ValueError as error:
+            return jsonify({'success': False, 'message': str(error)}), 400
+        if data.get('enabled'):
+            memory_accountant.enable(float(data.get('interval') or 0) or None)
+        elif 'enabled' in data:
+            memory_accountant.disable()
+    return jsonify(memory_accountant.state())
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查"""
-    return jsonify({'status': 'healthy', 'message': 'Backend is running'})
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Backend is running',
+        'sink': key_sink_name,
+        'sink_ready': key_sink is not None,
+        'uptime': round(time.perf_counter() - process_start_time, 3),
+        'import_ms': {name: round(seconds * 1000, 1) for name, seconds in import_timings.items()}
+    })
+
+
+def announce_ready(port: int, ready_file: str = None):
+    """服务开始监听后通知启动器：输出就绪行，并可选写入端口文件"""
+    if ready_file:
+        temp_file = f"{ready_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(str(port))
+        os.replace(temp_file, ready_file)
+    print(f"{READY_SIGNAL} port={port}", flush=True)
+
+
+def run_server(server_mode: str, host: str, port: int, threads: int, ready_file: str = None):
+    """运行HTTP服务"""
+    if server_mode == 'waitress':
+        try:
+            from waitress.server import create_server
+        except ImportError:
+            print("未安装 waitress，回退到 Flask 开发服务器")
+            server_mode = 'dev'
+        else:
+            print(f"使用 waitress 服务器 (线程池: {threads})")
+            # 固定大小的工作线程池，连接由 waitress 的异步主循环复用，支持 keep-alive
+            server = create_server(app, host=host, port=port, threads=threads,
+                                   connection_limit=max(100, threads * 4), channel_timeout=30)
+            announce_ready(server.effective_port, ready_file)
+            warm_up_key_sink()
+            server.run()
+            return
+
+    from werkzeug.serving import make_server
+    print("使用 Flask 开发服务器")
+    server = make_server(host, port, app, threaded=True)
+    announce_ready(server.server_port, ready_file)
+    warm_up_key_sink()
+    server.serve_forever()
+
+
+def print_import_report(top: int = 15):
+    """以 -X importtime 方式统计后端及按键模块的导入耗时"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    code = "import backend; backend.get_key_sink()"
+    env = dict(os.environ, KEYBOARD_TYPER_SINK=key_sink_name)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=backend_dir, env=env, capture_output=True, text=True)
+
+    # 只统计前两层导入（顶层缩进一个空格，每深一层多两个空格），累计耗时已包含子模块
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        level = (len(name) - len(name.lstrip()) + 1) // 2
+        if level <= 2:
+            rows.append((int(parts[1]), int(parts[0]), level, name.strip()))
+    rows.sort(reverse=True)
+
+    print(f"模块导入耗时报告 (按键输出端: {key_sink_name})")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative_us, self_us, level, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {'  ' * (level - 1)}{name}")
+    print(f"总计: {sum(row[0] for row in rows if row[2] == 1) / 1000:.1f} ms")
+    if result.returncode != 0:
+        print(f"导入失败:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Keyboard Typer 后端服务")
+    parser.add_argument(
+        "--server",
+        choices=["waitress", "dev"],
+        default="waitress",
+        help="HTTP服务模式: waitress 为生产服务器（默认），dev 为 Flask 开发服务器"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--threads", type=int, default=8, help="waitress 工作线程数")
+    parser.add_argument("--ready-file", default=None, help="开始监听后写入实际端口的文件路径")
+    parser.add_argument(
+        "--sink",
+        choices=["windows", "recording"],
+        default=None,
+        help="按键输出端: windows 注入真实按键，recording 只记录事件（默认按平台选择）"
+    )
+    parser.add_argument("--import-report", action="store_true", help="输出各模块导入耗时报告后退出")
+    parser.add_argument(
+        "--history-db",
+        default=os.environ.get('KEYBOARD_TYPER_HISTORY_DB', DEFAULT_HISTORY_PATH),
+        help="任务历史 SQLite 文件路径（默认 logs/job_history.sqlite3），传空串则不记录"
+    )
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
+    args = parse_arguments()
+    if args.sink:
+        key_sink_name = args.sink
+    if args.import_report:
+        print_import_report()
+        sys.exit(0)
+
+    set_job_history(args.history_db or None)
     print("Starting Keyboard Typer Backend Server...")
-    print("Server running on http://localhost:5000")
-    
-    # 初始化输入法处理
-    prepare_input_layout_handles()
+    print(f"Server running on http://localhost:{args.port}")
     
-    app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
\ No newline at end of file
+    # 输入法句柄在服务开始监听后于后台初始化，避免阻塞健康检查
+    run_server(args.server, args.host, args.port, args.threads, args.ready_file)
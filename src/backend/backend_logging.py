@@ -0,0 +1,133 @@
+"""
+后端日志模块
+提供分级、限流的日志记录：最近的日志保存在内存环形缓冲区中供 /api/logs 查询，
+控制台输出经有界队列交给后台线程写出，标准输出阻塞时也不会拖慢打字线程
+"""
+
+import collections
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """按消息模板限流：每个模板在时间窗口内最多放行 burst 条，多余的计数后在下个窗口提示"""
+
+    def __init__(self, window: float = 1.0, burst: int = 5):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._lock = threading.Lock()
+        # (logger, level, 模板) -> [窗口开始时间, 已放行数, 已抑制数]
+        self._states: Dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._states[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} (上个窗口内抑制了 {suppressed} 条相同日志)"
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+class RingBufferHandler(logging.Handler):
+    """将日志保存在固定容量的内存环形缓冲区中"""
+
+    def __init__(self, capacity: int = 1000):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+        self._sequence = itertools.count(1)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.records.append({
+                'seq': next(self._sequence),
+                'time': record.created,
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage()
+            })
+        except Exception:
+            self.handleError(record)
+
+    def get_records(self, min_level: int = logging.NOTSET, since: int = 0, limit: int = 200) -> List[dict]:
+        """按级别和序号筛选日志，返回最近的 limit 条"""
+        selected = [
+            entry for entry in list(self.records)
+            if entry['seq'] > since and logging.getLevelName(entry['level']) >= min_level
+        ]
+        return selected[-limit:] if limit > 0 else selected
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时直接丢弃日志并计数，保证记录日志的线程永不阻塞"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+ring_buffer_handler: Optional[RingBufferHandler] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_backend_logging(logger_name: str = 'keyboard_typer', level: int = logging.INFO,
+                          capacity: int = 1000, queue_size: int = 10000,
+                          rate_window: float = 1.0, rate_burst: int = 5) -> logging.Logger:
+    """配置后端日志：限流过滤器、内存环形缓冲区、经后台线程输出到标准错误"""
+    global ring_buffer_handler, queue_handler, _queue_listener
+
+    logger = logging.getLogger(logger_name)
+    if ring_buffer_handler is not None:
+        return logger
+
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.addFilter(RateLimitFilter(window=rate_window, burst=rate_burst))
+
+    ring_buffer_handler = RingBufferHandler(capacity)
+    logger.addHandler(ring_buffer_handler)
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    logger.addHandler(queue_handler)
+    _queue_listener = logging.handlers.QueueListener(queue_handler.queue, console_handler)
+    _queue_listener.start()
+
+    return logger
+
+
+def get_log_records(min_level: str = 'NOTSET', since: int = 0, limit: int = 200) -> Dict:
+    """查询环形缓冲区中的日志"""
+    level_value = logging.getLevelName(min_level.upper())
+    if not isinstance(level_value, int):
+        level_value = logging.NOTSET
+    records = ring_buffer_handler.get_records(level_value, since, limit) if ring_buffer_handler else []
+    return {
+        'records': records,
+        'dropped': queue_handler.dropped if queue_handler else 0
+    }
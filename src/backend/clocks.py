@@ -0,0 +1,134 @@
+"""
+时钟模块
+打字引擎通过时钟读取时间和等待，而不是直接调用 time.sleep：
+真实时钟按墙钟时间等待，虚拟时钟立即推进模拟时间并记录完整的等待计划，
+测试中可以在几毫秒内跑完长时间的打字任务，并对吞吐量、漂移和抖动分布做确定性的断言
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+
+class ScheduledWait(NamedTuple):
+    """一次等待：开始时间、请求的截止时间、实际结束时间（被打断时早于截止时间）和用途标签"""
+    start: float
+    deadline: float
+    end: float
+    label: str
+
+
+class RealClock:
+    """按墙钟时间等待的时钟"""
+
+    name = 'real'
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns()
+
+    def sleep_until(self, deadline: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        """等待到 deadline；传入 event 时可被提前打断，返回 event 是否已被设置"""
+        remaining = deadline - self.now()
+        if event is not None:
+            if remaining <= 0:
+                return event.is_set()
+            return event.wait(remaining)
+        if remaining > 0:
+            time.sleep(remaining)
+        return False
+
+    def sleep(self, seconds: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        """等待 seconds 秒，语义同 sleep_until"""
+        return self.sleep_until(self.now() + seconds, event, label)
+
+
+class VirtualClock:
+    """
+    立即推进模拟时间的时钟，不会真正等待
+    schedule 按顺序记录每一次等待；call_at 注册的回调在模拟时间到达时执行（例如在第 N 秒设置停止事件）
+    """
+
+    name = 'virtual'
+
+    def __init__(self, start: float = 0.0, record_schedule: bool = True):
+        self.time = start
+        # 长任务（如大语料基准）可关闭等待记录，避免每次等待保留一条记录
+        self.record_schedule = record_schedule
+        self.schedule: List[ScheduledWait] = []
+        self._callbacks = []
+        self._sequence = itertools.count()
+
+    def now(self) -> float:
+        return self.time
+
+    def now_ns(self) -> int:
+        return round(self.time * 1e9)
+
+    def advance(self, seconds: float):
+        """推进模拟时间（模拟按键发送等本身的耗时），期间到期的回调会被执行"""
+        target = self.time + max(0.0, seconds)
+        self._run_callbacks(target)
+        self.time = target
+
+    def call_at(self, when: float, callback: Callable[[], None]):
+        """模拟时间到达 when 时执行 callback"""
+        heapq.heappush(self._callbacks, (when, next(self._sequence), callback))
+
+    def sleep_until(self, deadline: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        start = self.time
+        deadline = max(deadline, start)
+        interrupted = self._run_callbacks(deadline, event)
+        if not interrupted:
+            self.time = deadline
+        if self.record_schedule:
+            self.schedule.append(ScheduledWait(start, deadline, self.time, label))
+        return interrupted
+
+    def sleep(self, seconds: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        return self.sleep_until(self.time + seconds, event, label)
+
+    def _run_callbacks(self, until: float, event: Optional[threading.Event] = None) -> bool:
+        """执行 until 之前到期的回调；某个回调设置了 event 时停在该时刻并返回 True"""
+        if event is not None and event.is_set():
+            return True
+        while self._callbacks and self._callbacks[0][0] <= until:
+            when, _, callback = heapq.heappop(self._callbacks)
+            self.time = max(self.time, when)
+            callback()
+            if event is not None and event.is_set():
+                return True
+        return False
+
+    # ---- 等待计划统计 ----
+
+    def waits(self, label: Optional[str] = None) -> List[ScheduledWait]:
+        """按标签筛选等待记录"""
+        if label is None:
+            return list(self.schedule)
+        return [wait for wait in self.schedule if wait.label == label]
+
+    def total_wait(self, label: Optional[str] = None) -> float:
+        return sum(wait.end - wait.start for wait in self.waits(label))
+
+    def intervals(self, label: str) -> List[float]:
+        """相邻两次该标签等待结束时刻之间的间隔（即按键的实际节奏）"""
+        ends = [wait.end for wait in self.waits(label)]
+        return [later - earlier for earlier, later in zip(ends, ends[1:])]
+
+
+CLOCKS = {
+    'real': RealClock,
+    'virtual': VirtualClock,
+}
+
+
+def create_clock(clock_name: str):
+    """按名称创建时钟"""
+    if clock_name not in CLOCKS:
+        raise ValueError(f"未知的时钟: {clock_name}")
+    return CLOCKS[clock_name]()
@@ -0,0 +1,130 @@
+"""
+打字引擎分阶段指标模块
+按阶段（倒计时、输入法切换、清除自动缩进、各发送路径、字符间等待等）统计调用次数、累计耗时和延迟分布，
+每个打字任务开始时重置，供 /api/metrics 以 JSON 或 Prometheus 文本格式查询。
+记录只做几次整数运算和一次对数运算，打字线程写入时不加锁
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional
+
+# 延迟直方图：从 1 微秒开始，每个桶的上界是上一个的 2^(1/4) 倍（相对误差约 19%），共 112 个桶覆盖到约 270 秒
+HISTOGRAM_MIN_SECONDS = 1e-6
+HISTOGRAM_BUCKETS_PER_DOUBLING = 4
+HISTOGRAM_BUCKET_COUNT = 112
+_LOG_RATIO = math.log(2) / HISTOGRAM_BUCKETS_PER_DOUBLING
+
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = 'keyboard_typer'
+
+
+def bucket_upper_bound(index: int) -> float:
+    return HISTOGRAM_MIN_SECONDS * math.exp((index + 1) * _LOG_RATIO)
+
+
+class PhaseHistogram:
+    """单个阶段的调用次数、累计耗时、最小/最大值和对数分桶直方图"""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKET_COUNT
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.minimum:
+            self.minimum = seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        if seconds <= HISTOGRAM_MIN_SECONDS:
+            index = 0
+        else:
+            index = min(HISTOGRAM_BUCKET_COUNT - 1, int(math.log(seconds / HISTOGRAM_MIN_SECONDS) / _LOG_RATIO))
+        self.buckets[index] += 1
+
+    def percentile(self, quantile: float) -> float:
+        """按分桶估算分位数：返回所在桶的上界，并限制在观测到的最小值与最大值之间"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(quantile * self.count))
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= rank:
+                if index == HISTOGRAM_BUCKET_COUNT - 1:
+                    return self.maximum
+                return min(self.maximum, max(self.minimum, bucket_upper_bound(index)))
+        return self.maximum
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'min_seconds': self.minimum if self.count else 0.0,
+            'max_seconds': self.maximum,
+            'p50_seconds': self.percentile(0.5),
+            'p95_seconds': self.percentile(0.95),
+            'p99_seconds': self.percentile(0.99),
+        }
+
+
+class EngineMetrics:
+    """按阶段名称汇总的打字任务指标"""
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseHistogram] = {}
+        self.job: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, **job_info):
+        """开始新任务：清空所有阶段，job_info 记录任务参数（速度、模式等）"""
+        with self._lock:
+            self.phases = {}
+            self.job = dict(job_info)
+
+    def record(self, phase: str, seconds: float):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases.setdefault(phase, PhaseHistogram())
+        histogram.record(seconds)
+
+    def update_job(self, **values):
+        self.job.update(values)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            phases = dict(self.phases)
+            job = dict(self.job)
+        return {
+            'job': job,
+            'phases': {name: histogram.as_dict() for name, histogram in sorted(phases.items())},
+        }
+
+    def to_prometheus(self, snapshot: Optional[Dict[str, object]] = None) -> str:
+        """以 Prometheus 文本格式输出：每个阶段一个 summary（分位数、总耗时、次数），任务数值型字段为 gauge"""
+        snapshot = snapshot or self.snapshot()
+        name = f'{METRIC_PREFIX}_phase_seconds'
+        lines: List[str] = [
+            f'# HELP {name} Time spent in each typing engine phase during the current job.',
+            f'# TYPE {name} summary',
+        ]
+        for phase, stats in snapshot['phases'].items():
+            for quantile in QUANTILES:
+                value = stats[f'p{int(quantile * 100)}_seconds']
+                lines.append(f'{name}{{phase="{phase}",quantile="{quantile}"}} {value:.9g}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {stats["total_seconds"]:.9g}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {stats["count"]}')
+        for key, value in snapshot['job'].items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            gauge = f'{METRIC_PREFIX}_job_{key}'
+            lines.append(f'# TYPE {gauge} gauge')
+            lines.append(f'{gauge} {value:.9g}')
+        return '\n'.join(lines) + '\n'
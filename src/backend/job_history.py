@@ -0,0 +1,157 @@
+"""
+任务历史模块
+每个打字任务结束后把参数、文本哈希与长度、输入法切换次数、达到的速度、各阶段耗时和结果追加到本地 SQLite，
+按目标程序、输入模式或设定速度汇总（中位数达到速度、完成率等），用实际数据判断哪些设置最快
+"""
+
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    target_app TEXT,
+    mode TEXT NOT NULL,
+    sink TEXT,
+    speed_cps INTEGER NOT NULL,
+    countdown INTEGER NOT NULL,
+    jitter INTEGER NOT NULL,
+    send_enter INTEGER NOT NULL,
+    auto_switch INTEGER NOT NULL,
+    ide_mode INTEGER NOT NULL,
+    text_hash TEXT,
+    text_length INTEGER NOT NULL,
+    typed_characters INTEGER NOT NULL,
+    switch_count INTEGER NOT NULL,
+    achieved_cps REAL,
+    countdown_seconds REAL,
+    plan_seconds REAL,
+    typing_seconds REAL,
+    send_enter_seconds REAL,
+    total_seconds REAL,
+    phases TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs(finished_at);
+"""
+
+COLUMNS = ('started_at', 'finished_at', 'outcome', 'target_app', 'mode', 'sink', 'speed_cps', 'countdown', 'jitter',
+           'send_enter', 'auto_switch', 'ide_mode', 'text_hash', 'text_length', 'typed_characters', 'switch_count',
+           'achieved_cps', 'countdown_seconds', 'plan_seconds', 'typing_seconds', 'send_enter_seconds',
+           'total_seconds', 'phases')
+
+# 可用于汇总的列；列名会拼进 SQL，只能从这里取
+GROUP_COLUMNS = ('target_app', 'mode', 'speed_cps', 'sink', 'outcome', 'text_hash')
+
+
+def job_mode(ide_mode: bool, auto_switch: bool) -> str:
+    """与编辑器模拟器 ENGINE_MODES 相同的模式名：normal、normal_switch、ide、ide_switch"""
+    return ('ide' if ide_mode else 'normal') + ('_switch' if auto_switch else '')
+
+
+def format_timestamp(seconds: float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
+
+
+class JobHistory:
+    """只追加的任务历史库，可在打字线程与请求线程间共享"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, job: Dict[str, object]) -> int:
+        """追加一个任务，job 中缺少的列记为 NULL；phases 可以是字典，保存为 JSON"""
+        values = dict(job)
+        if isinstance(values.get('phases'), dict):
+            values['phases'] = json.dumps(values['phases'], ensure_ascii=False)
+        for key in ('send_enter', 'auto_switch', 'ide_mode'):
+            values[key] = int(bool(values.get(key)))
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [values.get(column) for column in COLUMNS]
+            )
+        return cursor.lastrowid
+
+    def count(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def recent(self, limit: int = 20) -> List[Dict[str, object]]:
+        """最近的任务，新的在前"""
+        with self._lock:
+            rows = self.connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['phases'] = json.loads(job['phases']) if job['phases'] else {}
+            for key in ('send_enter', 'auto_switch', 'ide_mode'):
+                job[key] = bool(job[key])
+            jobs.append(job)
+        return jobs
+
+    def aggregate(self, group_by: str = 'target_app', outcome: Optional[str] = 'COMPLETED',
+                  since: Optional[str] = None) -> List[Dict[str, object]]:
+        """
+        按 group_by 分组汇总：任务数、完成数、达到速度（字符/秒）与设定速度之比的中位数、切换次数中位数等，
+        outcome 为 None 时包含所有结果（中断、出错的任务达到的速度同样计入）；按中位数达到速度从高到低排列
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"不支持的分组: {group_by}（可选 {', '.join(GROUP_COLUMNS)}）")
+        conditions, parameters = [], []
+        if outcome:
+            conditions.append("outcome = ?")
+            parameters.append(outcome)
+        if since:
+            conditions.append("finished_at >= ?")
+            parameters.append(since)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {group_by} AS grouping, outcome, speed_cps, achieved_cps, switch_count, typed_characters, "
+                f"typing_seconds FROM jobs{where} ORDER BY id", parameters
+            ).fetchall()
+
+        groups: Dict[object, List[sqlite3.Row]] = {}
+        for row in rows:
+            groups.setdefault(row['grouping'], []).append(row)
+        results = []
+        for key, members in groups.items():
+            achieved = [row['achieved_cps'] for row in members if row['achieved_cps'] is not None]
+            ratios = [row['achieved_cps'] / row['speed_cps'] for row in members
+                      if row['achieved_cps'] is not None and row['speed_cps']]
+            results.append({
+                group_by: key,
+                'jobs': len(members),
+                'completed': sum(1 for row in members if row['outcome'] == 'COMPLETED'),
+                'median_achieved_cps': statistics.median(achieved) if achieved else None,
+                'median_speed_ratio': statistics.median(ratios) if ratios else None,
+                'median_target_cps': statistics.median(row['speed_cps'] for row in members),
+                'median_switch_count': statistics.median(row['switch_count'] for row in members),
+                'typed_characters': sum(row['typed_characters'] for row in members),
+                'typing_seconds': sum(row['typing_seconds'] or 0.0 for row in members),
+            })
+        results.sort(key=lambda group: (group['median_achieved_cps'] is None, -(group['median_achieved_cps'] or 0)))
+        return results
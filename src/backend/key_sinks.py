@@ -0,0 +1,181 @@
+"""
+按键输出端模块
+将打字引擎与具体的按键注入实现解耦：Windows 下通过 pynput 与 pywin32 注入按键，
+其他平台和测试中使用只记录事件的替身实现
+"""
+
+import importlib
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# keybd_event 标志位（与 win32con 中的取值一致，避免在导入时加载 pywin32）
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_SCANCODE = 0x0008
+
+# 各重量级模块的导入耗时（秒），用于启动报告
+import_timings: Dict[str, float] = {}
+
+
+def timed_import(module_name: str):
+    """导入模块并记录耗时"""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_timings.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+
+class WindowsKeySink:
+    """Windows 按键输出端，创建时才加载 pynput 与 pywin32"""
+
+    name = 'windows'
+
+    def __init__(self):
+        keyboard = timed_import('pynput.keyboard')
+        self._win32api = timed_import('win32api')
+        self._win32gui = timed_import('win32gui')
+        self._win32process = timed_import('win32process')
+        self._ctypes = timed_import('ctypes')
+        self._user32 = self._ctypes.windll.user32
+        self._keys = keyboard.Key
+        self._controller = keyboard.Controller()
+
+    def type_character(self, character: str):
+        self._controller.type(character)
+
+    def press_key(self, key_name: str):
+        self._controller.press(getattr(self._keys, key_name))
+
+    def release_key(self, key_name: str):
+        self._controller.release(getattr(self._keys, key_name))
+
+    def keybd_event(self, vk_code: int, scancode: int, flags: int):
+        self._win32api.keybd_event(vk_code, scancode, flags, 0)
+
+    def get_foreground_window(self) -> int:
+        return self._win32gui.GetForegroundWindow()
+
+    def get_window_thread_id(self, window_handle: int) -> int:
+        thread_id, _ = self._win32process.GetWindowThreadProcessId(window_handle)
+        return thread_id
+
+    def get_window_process_name(self, window_handle: int) -> str:
+        """窗口所属进程的可执行文件名（小写，如 code.exe）"""
+        _, process_id = self._win32process.GetWindowThreadProcessId(window_handle)
+        # PROCESS_QUERY_INFORMATION | PROCESS_VM_READ
+        handle = self._win32api.OpenProcess(0x0400 | 0x0010, False, process_id)
+        try:
+            path = self._win32process.GetModuleFileNameEx(handle, 0)
+        finally:
+            self._win32api.CloseHandle(handle)
+        return path.replace('\\', '/').rsplit('/', 1)[-1].lower()
+
+    def get_current_thread_id(self) -> int:
+        return self._win32api.GetCurrentThreadId()
+
+    def get_keyboard_layout(self, thread_id: int) -> int:
+        return self._win32api.GetKeyboardLayout(thread_id)
+
+    def get_keyboard_layout_list(self) -> List[int]:
+        return self._win32api.GetKeyboardLayoutList()
+
+    def load_keyboard_layout(self, layout_id: str) -> int:
+        return self._win32api.LoadKeyboardLayout(layout_id, 0)
+
+    def attach_thread_input(self, thread_id: int, target_thread_id: int, attach: bool) -> bool:
+        self._ctypes.set_last_error(0)
+        return bool(self._user32.AttachThreadInput(thread_id, target_thread_id, attach))
+
+    def activate_keyboard_layout(self, layout_handle: int):
+        self._ctypes.set_last_error(0)
+        self._user32.ActivateKeyboardLayout(self._ctypes.c_void_p(layout_handle & 0xFFFFFFFFFFFFFFFF), 0)
+
+    def post_message(self, window_handle: int, message: int, wparam: int, lparam: int):
+        self._win32gui.PostMessage(window_handle, message, wparam, lparam)
+
+
+class RecordingKeySink:
+    """
+    记录按键事件的替身输出端，不依赖任何平台模块
+    事件以元组形式追加到 events：
+      ('type', 字符) / ('press', 键名) / ('release', 键名)
+      ('key', 虚拟键码, 扫描码, 标志位) / ('layout', 输入法句柄)
+    """
+
+    name = 'recording'
+
+    FOREGROUND_WINDOW = 0x1001
+    TARGET_THREAD_ID = 0x2001
+    CURRENT_THREAD_ID = 0x2002
+    LAYOUTS = [0x04090409, 0x08040804]
+
+    def __init__(self, process_name: str = 'recording'):
+        self.events: List[Tuple] = []
+        self.active_layout = self.LAYOUTS[0]
+        # 前台窗口所属的“进程名”，测试中可以设置为不同的目标程序
+        self.process_name = process_name
+
+    def clear(self):
+        self.events = []
+
+    def type_character(self, character: str):
+        self.events.append(('type', character))
+
+    def press_key(self, key_name: str):
+        self.events.append(('press', key_name))
+
+    def release_key(self, key_name: str):
+        self.events.append(('release', key_name))
+
+    def keybd_event(self, vk_code: int, scancode: int, flags: int):
+        self.events.append(('key', vk_code, scancode, flags))
+
+    def get_foreground_window(self) -> int:
+        return self.FOREGROUND_WINDOW
+
+    def get_window_thread_id(self, window_handle: int) -> int:
+        return self.TARGET_THREAD_ID
+
+    def get_window_process_name(self, window_handle: int) -> str:
+        return self.process_name
+
+    def get_current_thread_id(self) -> int:
+        return self.CURRENT_THREAD_ID
+
+    def get_keyboard_layout(self, thread_id: int) -> int:
+        return self.active_layout
+
+    def get_keyboard_layout_list(self) -> List[int]:
+        return list(self.LAYOUTS)
+
+    def load_keyboard_layout(self, layout_id: str) -> int:
+        return int(layout_id, 16) | (int(layout_id, 16) << 16)
+
+    def attach_thread_input(self, thread_id: int, target_thread_id: int, attach: bool) -> bool:
+        return True
+
+    def activate_keyboard_layout(self, layout_handle: int):
+        self.active_layout = layout_handle
+        self.events.append(('layout', layout_handle))
+
+    def post_message(self, window_handle: int, message: int, wparam: int, lparam: int):
+        pass
+
+
+KEY_SINKS = {
+    'windows': WindowsKeySink,
+    'recording': RecordingKeySink,
+}
+
+
+def default_sink_name() -> str:
+    """Windows 下默认注入真实按键，其他平台使用记录替身"""
+    return 'windows' if sys.platform == 'win32' else 'recording'
+
+
+def create_key_sink(sink_name: str):
+    """按名称创建按键输出端"""
+    if sink_name not in KEY_SINKS:
+        raise ValueError(f"未知的按键输出端: {sink_name}")
+    return KEY_SINKS[sink_name]()
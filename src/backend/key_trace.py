@@ -0,0 +1,267 @@
+"""
+按键轨迹模块
+把打字引擎的每个操作（字符、按键、扫描码、输入法切换、等待）以定长二进制记录追加写入轨迹文件，
+读取时通过 mmap 按下标访问；回放引擎按原速或缩放后的速度把轨迹重新注入任意按键输出端。
+轨迹也可以作为黄金样本：回放到记录输出端和编辑器模拟器，检查打字计划的修改是否改变了输出或按键数
+"""
+
+import mmap
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+TRACE_MAGIC = b'KTTRACE1'
+TRACE_VERSION = 1
+# 文件头：魔数、版本、记录长度、保留、创建时间（Unix 秒）、保留
+HEADER = struct.Struct('<8sHHIdQ')
+# 记录（32 字节）：时间戳（纳秒，相对轨迹开始）、值（无符号 64 位）、等待时长（纳秒）、代码、操作、标志位、保留
+RECORD = struct.Struct('<qQqHBBI')
+
+OP_TYPE = 1       # value = 字符码位
+OP_PRESS = 2      # code = 键名编号
+OP_RELEASE = 3    # code = 键名编号
+OP_KEY = 4        # code = 虚拟键码，value = 扫描码，flags = keybd_event 标志位
+OP_LAYOUT = 5     # value = 输入法句柄
+OP_DELAY = 6      # code = 等待标签编号，duration_ns = 请求的等待时长
+
+OP_NAMES = {OP_TYPE: 'type', OP_PRESS: 'press', OP_RELEASE: 'release', OP_KEY: 'key', OP_LAYOUT: 'layout',
+            OP_DELAY: 'delay'}
+
+# 编号只能追加，不能调整顺序，否则旧轨迹无法解析
+KEY_NAMES = ['', 'enter', 'tab', 'space', 'esc', 'shift', 'home', 'delete', 'backspace']
+DELAY_LABELS = ['', 'countdown', 'inter_key', 'key_hold', 'key_settle', 'line_break', 'layout_switch', 'send_enter']
+
+
+class TraceRecord(NamedTuple):
+    timestamp_ns: int
+    value: int
+    duration_ns: int
+    code: int
+    op: int
+    flags: int
+
+    @property
+    def name(self) -> str:
+        return OP_NAMES.get(self.op, 'unknown')
+
+
+def _name_code(names: List[str], name: str) -> int:
+    try:
+        return names.index(name)
+    except ValueError:
+        return 0
+
+
+class TraceWriter:
+    """定长记录的只追加轨迹文件"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, 'ab')
+        if new_file:
+            self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD.size, 0, time.time(), 0))
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def record(self, timestamp_ns: int, op: int, code: int = 0, value: int = 0, flags: int = 0,
+               duration_ns: int = 0):
+        packed = RECORD.pack(timestamp_ns, value & 0xFFFFFFFFFFFFFFFF, duration_ns, code, op, flags, 0)
+        with self._lock:
+            self._file.write(packed)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """以 mmap 读取轨迹文件，末尾不完整的记录（写入中断）会被忽略"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        size = self.path.stat().st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"不是按键轨迹文件: {self.path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, _, self.created, _ = HEADER.unpack_from(self._map, 0)
+        if magic != TRACE_MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"不是按键轨迹文件或版本不兼容: {self.path}")
+        self.version = version
+        self._count = (size - HEADER.size) // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> TraceRecord:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return TraceRecord(*RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)[:6])
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        unpack_from = RECORD.unpack_from
+        for offset in range(HEADER.size, HEADER.size + self._count * RECORD.size, RECORD.size):
+            yield TraceRecord(*unpack_from(self._map, offset)[:6])
+
+    @property
+    def duration_ns(self) -> int:
+        """最后一条记录（含其等待时长）结束的时刻"""
+        if not self._count:
+            return 0
+        last = self[-1]
+        return last.timestamp_ns + last.duration_ns
+
+    def events(self) -> List[Tuple]:
+        """转换为 RecordingKeySink.events 格式的事件（不含等待），可直接交给编辑器模拟器"""
+        return [event for event in (record_to_event(record) for record in self) if event is not None]
+
+    def delays(self) -> List[Tuple[int, int, str]]:
+        """(开始时刻, 时长, 标签) 形式的等待记录"""
+        return [
+            (record.timestamp_ns, record.duration_ns,
+             DELAY_LABELS[record.code] if record.code < len(DELAY_LABELS) else '')
+            for record in self if record.op == OP_DELAY
+        ]
+
+    def close(self):
+        if getattr(self, '_map', None) is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record_to_event(record: TraceRecord) -> Optional[Tuple]:
+    if record.op == OP_TYPE:
+        return ('type', chr(record.value))
+    if record.op in (OP_PRESS, OP_RELEASE):
+        key_name = KEY_NAMES[record.code] if record.code < len(KEY_NAMES) else ''
+        return (record.name, key_name)
+    if record.op == OP_KEY:
+        return ('key', record.code, record.value, record.flags)
+    if record.op == OP_LAYOUT:
+        return ('layout', record.value)
+    return None
+
+
+class TracingKeySink:
+    """包装一个按键输出端：转发所有调用，并把发出按键的调用写入轨迹"""
+
+    def __init__(self, inner, writer: TraceWriter, clock, start_ns: Optional[int] = None):
+        self.inner = inner
+        self.writer = writer
+        self.clock = clock
+        self.start_ns = clock.now_ns() if start_ns is None else start_ns
+        self.name = getattr(inner, 'name', 'tracing')
+
+    def _timestamp(self) -> int:
+        return self.clock.now_ns() - self.start_ns
+
+    def type_character(self, character: str):
+        self.inner.type_character(character)
+        self.writer.record(self._timestamp(), OP_TYPE, value=ord(character))
+
+    def press_key(self, key_name: str):
+        self.inner.press_key(key_name)
+        self.writer.record(self._timestamp(), OP_PRESS, code=_name_code(KEY_NAMES, key_name))
+
+    def release_key(self, key_name: str):
+        self.inner.release_key(key_name)
+        self.writer.record(self._timestamp(), OP_RELEASE, code=_name_code(KEY_NAMES, key_name))
+
+    def keybd_event(self, vk_code: int, scancode: int, flags: int):
+        self.inner.keybd_event(vk_code, scancode, flags)
+        self.writer.record(self._timestamp(), OP_KEY, code=vk_code, value=scancode, flags=flags)
+
+    def activate_keyboard_layout(self, layout_handle: int):
+        self.inner.activate_keyboard_layout(layout_handle)
+        self.writer.record(self._timestamp(), OP_LAYOUT, value=layout_handle)
+
+    def __getattr__(self, attribute):
+        # 查询窗口、线程和输入法列表的调用不写入轨迹
+        return getattr(self.inner, attribute)
+
+
+class TracingClock:
+    """包装一个时钟：每次等待前把请求的等待写入轨迹"""
+
+    def __init__(self, inner, writer: TraceWriter, start_ns: Optional[int] = None):
+        self.inner = inner
+        self.writer = writer
+        self.start_ns = inner.now_ns() if start_ns is None else start_ns
+        self.name = getattr(inner, 'name', 'tracing')
+
+    def now(self) -> float:
+        return self.inner.now()
+
+    def now_ns(self) -> int:
+        return self.inner.now_ns()
+
+    def sleep_until(self, deadline: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        start = self.inner.now()
+        self.writer.record(self.inner.now_ns() - self.start_ns, OP_DELAY, code=_name_code(DELAY_LABELS, label),
+                           duration_ns=max(0, round((deadline - start) * 1e9)))
+        return self.inner.sleep_until(deadline, event, label)
+
+    def sleep(self, seconds: float, event: Optional[threading.Event] = None, label: str = '') -> bool:
+        return self.sleep_until(self.inner.now() + seconds, event, label)
+
+    def __getattr__(self, attribute):
+        return getattr(self.inner, attribute)
+
+
+def replay_trace(trace: Union[TraceReader, str, Path], sink, clock, speed: float = 1.0,
+                 stop_event: Optional[threading.Event] = None) -> int:
+    """
+    把轨迹重新注入按键输出端，返回注入的事件数
+    每条记录在 开始时刻 + 时间戳/speed 时注入；speed 为 0 或负数时不等待，尽快注入
+    """
+    reader = trace if isinstance(trace, TraceReader) else TraceReader(trace)
+    injected = 0
+    try:
+        start = clock.now()
+        for record in reader:
+            if record.op == OP_DELAY:
+                continue
+            if speed > 0:
+                if clock.sleep_until(start + record.timestamp_ns / 1e9 / speed, stop_event, 'replay'):
+                    break
+            elif stop_event is not None and stop_event.is_set():
+                break
+            event = record_to_event(record)
+            kind = event[0]
+            if kind == 'type':
+                sink.type_character(event[1])
+            elif kind == 'press':
+                sink.press_key(event[1])
+            elif kind == 'release':
+                sink.release_key(event[1])
+            elif kind == 'key':
+                sink.keybd_event(*event[1:])
+            elif kind == 'layout':
+                sink.activate_keyboard_layout(event[1])
+            injected += 1
+    finally:
+        if reader is not trace:
+            reader.close()
+    return injected
@@ -0,0 +1,111 @@
+"""
+按键时间线模块
+打字引擎每发送一个字符就把计划发送时刻和实际发送时刻（纳秒，perf_counter_ns）写入预先分配的环形缓冲区，
+任务结束后据此得到实际间隔与计划间隔的分布、间隔误差直方图、累计漂移和尾部延迟，
+用来判断计时器精度、GIL 竞争或发送过慢是否让引擎跟不上设定的速度
+"""
+
+import math
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 间隔误差（实际间隔 - 计划间隔，毫秒）直方图的分界，两端为开区间
+ERROR_EDGES_MS = (-5.0, -2.0, -1.0, -0.5, -0.2, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+# 实际间隔与计划间隔对照直方图的分界（毫秒），避开常用速度对应的整数间隔（如 5、10、50、200 毫秒）
+INTERVAL_EDGES_MS = (1.5, 3.0, 7.0, 15.0, 30.0, 70.0, 150.0, 300.0, 700.0, 1500.0, 3000.0)
+
+
+def distribution(values: Sequence[float]) -> Dict[str, float]:
+    """均值、最小/最大值与 p50/p95/p99（最近秩法）"""
+    if not values:
+        return {'mean': 0.0, 'min': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    ordered = sorted(values)
+
+    def rank(quantile: float) -> float:
+        return ordered[max(0, min(len(ordered) - 1, math.ceil(quantile * len(ordered)) - 1))]
+
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'min': ordered[0],
+        'p50': rank(0.5),
+        'p95': rank(0.95),
+        'p99': rank(0.99),
+        'max': ordered[-1],
+    }
+
+
+def histogram(values: Sequence[float], edges: Sequence[float]) -> List[int]:
+    """按分界统计个数，返回 len(edges) + 1 个桶（首尾为开区间）"""
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[bisect_left(edges, value)] += 1
+    return counts
+
+
+def bucket_labels(edges: Sequence[float]) -> List[Tuple[Optional[float], Optional[float]]]:
+    """各桶的 (下界, 上界)，开区间一侧为 None"""
+    bounds = [None, *edges, None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class KeystrokeTimeline:
+    """计划与实际发送时刻的环形缓冲区，容量固定，超出后覆盖最早的记录"""
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.scheduled = array('q', bytes(8 * capacity))
+        self.actual = array('q', bytes(8 * capacity))
+        self.count = 0
+        self.scheduled_cps = 0.0
+
+    def reset(self, scheduled_cps: float = 0.0):
+        self.count = 0
+        self.scheduled_cps = scheduled_cps
+
+    def record(self, scheduled_ns: int, actual_ns: int):
+        index = self.count % self.capacity
+        self.scheduled[index] = scheduled_ns
+        self.actual[index] = actual_ns
+        self.count += 1
+
+    def samples(self) -> Tuple[List[int], List[int]]:
+        """按时间顺序返回缓冲区中保留的 (计划时刻, 实际时刻)"""
+        retained = min(self.count, self.capacity)
+        start = self.count - retained
+        order = [(start + offset) % self.capacity for offset in range(retained)]
+        return [self.scheduled[i] for i in order], [self.actual[i] for i in order]
+
+    def summary(self) -> Dict[str, object]:
+        """实际与计划间隔的分布、间隔误差直方图、漂移（实际时刻晚于计划的程度）和达到的速度"""
+        scheduled, actual = self.samples()
+        actual_intervals = [(later - earlier) / 1e6 for earlier, later in zip(actual, actual[1:])]
+        scheduled_intervals = [(later - earlier) / 1e6 for earlier, later in zip(scheduled, scheduled[1:])]
+        errors = [got - planned for got, planned in zip(actual_intervals, scheduled_intervals)]
+        lateness = [(got - planned) / 1e6 for got, planned in zip(actual, scheduled)]
+
+        span = (actual[-1] - actual[0]) / 1e9 if len(actual) > 1 else 0.0
+        return {
+            'events': self.count,
+            'retained': len(actual),
+            'dropped': self.count - len(actual),
+            'scheduled_cps': self.scheduled_cps,
+            'achieved_cps': (len(actual) - 1) / span if span > 0 else 0.0,
+            'actual_interval_ms': distribution(actual_intervals),
+            'scheduled_interval_ms': distribution(scheduled_intervals),
+            'interval_error_ms': dict(distribution(errors),
+                                      mean_abs=sum(abs(error) for error in errors) / len(errors) if errors else 0.0),
+            'lateness_ms': dict(distribution(lateness), final=lateness[-1] if lateness else 0.0),
+            'error_histogram': [
+                {'lower_ms': lower, 'upper_ms': upper, 'count': count}
+                for (lower, upper), count in zip(bucket_labels(ERROR_EDGES_MS), histogram(errors, ERROR_EDGES_MS))
+            ],
+            'interval_histogram': [
+                {'lower_ms': lower, 'upper_ms': upper, 'actual': got, 'scheduled': planned}
+                for (lower, upper), got, planned in zip(
+                    bucket_labels(INTERVAL_EDGES_MS),
+                    histogram(actual_intervals, INTERVAL_EDGES_MS),
+                    histogram(scheduled_intervals, INTERVAL_EDGES_MS)
+                )
+            ],
+        }
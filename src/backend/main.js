@@ -6,6 +6,10 @@ const fs = require('fs');
 let mainWindow;
 let backendProcess;
 
+// 后端开始监听后输出的就绪行前缀，需与 backend.py 中的 READY_SIGNAL 保持一致
+const BACKEND_READY_SIGNAL = 'BACKEND_READY';
+const BACKEND_READY_TIMEOUT_MS = 20000;
+
 // Disable GPU to reduce white-screen issues on some devices.
 app.disableHardwareAcceleration();
 
@@ -81,12 +85,28 @@ function getBackendLaunchConfig() {
   };
 }
 
-function startBackend() {
+function startBackend(onReady) {
   const config = getBackendLaunchConfig();
   if (!config) {
+    onReady(false);
     return;
   }
 
+  let ready = false;
+  let stdoutBuffer = '';
+  const markReady = (isReady) => {
+    if (ready) {
+      return;
+    }
+    ready = true;
+    clearTimeout(readyTimer);
+    onReady(isReady);
+  };
+  const readyTimer = setTimeout(() => {
+    console.error(`[Backend] Not ready after ${BACKEND_READY_TIMEOUT_MS} ms`);
+    markReady(false);
+  }, BACKEND_READY_TIMEOUT_MS);
+
   backendProcess = spawn(config.command, config.args, {
     cwd: config.options.cwd,
     env: process.env,
@@ -95,6 +115,12 @@ function startBackend() {
 
   backendProcess.stdout.on('data', (data) => {
     console.log(`Backend: ${data}`);
+    if (!ready) {
+      stdoutBuffer += data.toString();
+      if (stdoutBuffer.includes(BACKEND_READY_SIGNAL)) {
+        markReady(true);
+      }
+    }
   });
 
   backendProcess.stderr.on('data', (data) => {
@@ -103,6 +129,7 @@ function startBackend() {
 
   backendProcess.on('close', (code) => {
     console.log(`Backend exited with code ${code}`);
+    markReady(false);
   });
 }
 
@@ -114,8 +141,12 @@ function stopBackend() {
 }
 
 app.on('ready', () => {
-  startBackend();
-  setTimeout(createWindow, 1500);
+  // 后端就绪（或超时/退出）后再创建窗口，界面自身会轮询健康状态
+  startBackend(() => {
+    if (!mainWindow) {
+      createWindow();
+    }
+  });
 });
 
 app.on('window-all-closed', () => {
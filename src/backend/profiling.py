@@ -0,0 +1,440 @@
+"""
+运行时剖析模块
+SamplingProfiler 在发起剖析的线程（如处理请求的线程）中按固定频率读取目标线程（通常是打字线程）的调用栈，
+只统计每个调用栈被采到的次数，不像 cProfile 那样挂钩每次函数调用，对被剖析的线程几乎没有额外开销；
+结果可输出为折叠栈（flamegraph.pl / speedscope 均可导入）或 speedscope 的 JSON 格式。
+AllocationTracker 在每个任务开始和结束时各取一次 tracemalloc 快照，给出本次任务内存变化最大的代码位置；
+MemoryAccountant 按任务阶段（解析请求、倒计时、生成计划、发送按键）记录 Python 堆（tracemalloc）与进程 RSS 的峰值
+"""
+
+import ctypes
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+MAX_STACK_DEPTH = 128
+
+# 栈帧：(函数名, 文件名, 首行号)
+Frame = Tuple[str, str, int]
+
+
+class Profile:
+    """一次采样的结果：各调用栈（从外到内的栈帧编号）被采到的次数"""
+
+    def __init__(self, interval: float, name: str = 'profile'):
+        self.interval = interval
+        self.name = name
+        self.frames: List[Frame] = []
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self.duration = 0.0
+        self._frame_index: Dict[Frame, int] = {}
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def frame_id(self, frame: Frame) -> int:
+        index = self._frame_index.get(frame)
+        if index is None:
+            index = self._frame_index[frame] = len(self.frames)
+            self.frames.append(frame)
+        return index
+
+    def frame_label(self, index: int) -> str:
+        function, filename, line = self.frames[index]
+        if not filename:
+            return function
+        return f"{function} ({os.path.basename(filename)}:{line})"
+
+    def to_collapsed(self) -> str:
+        """折叠栈格式：每行 “外层;…;内层 次数”，按次数从多到少排列"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            labels = (self.frame_label(index).replace(';', ':') for index in stack)
+            lines.append(f"{';'.join(labels)} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def to_speedscope(self) -> Dict[str, object]:
+        """speedscope 的 sampled 格式，每个调用栈的权重为 次数 × 采样间隔（秒）"""
+        stacks = self.stacks.most_common()
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': self.name,
+            'exporter': 'keyboard-typer',
+            'activeProfileIndex': 0,
+            'shared': {
+                'frames': [
+                    {'name': function, 'file': filename, 'line': line} if filename else {'name': function}
+                    for function, filename, line in self.frames
+                ],
+            },
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.duration,
+                'samples': [list(stack) for stack, _ in stacks],
+                'weights': [count * self.interval for _, count in stacks],
+            }],
+        }
+
+    def summary(self) -> Dict[str, object]:
+        return {'samples': self.samples, 'ticks': self.ticks, 'duration_seconds': self.duration,
+                'interval_seconds': self.interval}
+
+
+class SamplingProfiler:
+    """
+    在调用线程中按 hz 频率读取 sys._current_frames() 采样目标线程的调用栈。
+    targets 每次采样时调用，返回 (线程名, 线程 ident) 列表，目标线程尚未启动或已结束时返回空列表即可
+    """
+
+    def __init__(self, hz: float = 100.0, max_depth: int = MAX_STACK_DEPTH):
+        if hz <= 0:
+            raise ValueError("采样频率必须大于 0")
+        self.interval = 1.0 / hz
+        self.max_depth = max_depth
+        self._code_frames: Dict[object, Frame] = {}
+
+    def _stack(self, profile: Profile, frame) -> Tuple[int, ...]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            key = self._code_frames.get(code)
+            if key is None:
+                key = self._code_frames[code] = (getattr(code, 'co_qualname', code.co_name), code.co_filename,
+                                                 code.co_firstlineno)
+            stack.append(profile.frame_id(key))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def run(self, seconds: float, targets: Callable[[], Iterable[Tuple[str, int]]], name: str = 'profile',
+            label_threads: bool = False, stop_event: Optional[threading.Event] = None) -> Profile:
+        """采样 seconds 秒；label_threads 为 True 时以线程名作为每个调用栈的根"""
+        profile = Profile(self.interval, name)
+        own_ident = threading.get_ident()
+        start = time.perf_counter()
+        next_tick = start
+        end = start + seconds
+        while True:
+            frames = sys._current_frames()
+            for thread_name, ident in targets():
+                frame = frames.get(ident)
+                if frame is None or ident == own_ident:
+                    continue
+                stack = self._stack(profile, frame)
+                if label_threads:
+                    stack = (profile.frame_id((f"thread {thread_name}", '', 0)),) + stack
+                profile.stacks[stack] += 1
+            del frames
+            profile.ticks += 1
+
+            next_tick += self.interval
+            now = time.perf_counter()
+            if next_tick >= end:
+                break
+            # 落后时跳过错过的采样点，不补采
+            if next_tick < now:
+                next_tick = now
+            if stop_event is not None:
+                if stop_event.wait(next_tick - now):
+                    break
+            else:
+                time.sleep(next_tick - now)
+        profile.duration = time.perf_counter() - start
+        return profile
+
+
+class TracemallocUsers:
+    """
+    tracemalloc 是进程级的，AllocationTracker 与 MemoryAccountant 可能同时开启：
+    各使用者分别登记，第一个登记时启动追踪，最后一个注销时停止（进程外部已启动的追踪不停止）
+    """
+
+    def __init__(self):
+        self._users = set()
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def acquire(self, user, frames: int = 1):
+        with self._lock:
+            if not self._users and not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._started_tracing = True
+            self._users.add(user)
+
+    def release(self, user):
+        with self._lock:
+            self._users.discard(user)
+            if not self._users and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def shared(self, user) -> bool:
+        """除 user 外还有其他使用者（此时 user 不应重置峰值等全局状态）"""
+        with self._lock:
+            return bool(self._users - {user})
+
+
+tracemalloc_users = TracemallocUsers()
+
+
+class AllocationTracker:
+    """每个任务前后的 tracemalloc 快照对比；未启用时 start_job/finish_job 不做任何事"""
+
+    def __init__(self, limit: int = 20, frames: int = 1):
+        self.limit = limit
+        self.frames = frames
+        self.enabled = False
+        self.last_job: Optional[Dict[str, object]] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def enable(self, limit: Optional[int] = None):
+        with self._lock:
+            if limit:
+                self.limit = limit
+            tracemalloc_users.acquire(self, self.frames)
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            self._snapshot = None
+            tracemalloc_users.release(self)
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def start_job(self):
+        with self._lock:
+            if self.enabled and tracemalloc.is_tracing():
+                self._snapshot = self._take_snapshot()
+
+    def finish_job(self, **job_info) -> Optional[Dict[str, object]]:
+        """与任务开始时的快照对比，按字节数变化（绝对值）保留前 limit 个代码位置"""
+        with self._lock:
+            if self._snapshot is None or not tracemalloc.is_tracing():
+                return None
+            start, self._snapshot = self._snapshot, None
+            differences = self._take_snapshot().compare_to(start, 'lineno')
+            current, peak = tracemalloc.get_traced_memory()
+            self.last_job = dict(
+                job_info,
+                size_diff_bytes=sum(stat.size_diff for stat in differences),
+                count_diff=sum(stat.count_diff for stat in differences),
+                traced_bytes=current,
+                traced_peak_bytes=peak,
+                top=[
+                    {
+                        'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        'size_diff_bytes': stat.size_diff,
+                        'count_diff': stat.count_diff,
+                        'size_bytes': stat.size,
+                        'count': stat.count,
+                    }
+                    for stat in differences[:self.limit]
+                ],
+            )
+            return self.last_job
+
+    def state(self) -> Dict[str, object]:
+        return {'enabled': self.enabled, 'tracing': tracemalloc.is_tracing(), 'limit': self.limit,
+                'last_job': self.last_job}
+
+
+def current_rss_bytes() -> Optional[int]:
+    """当前进程的常驻内存（字节）：Linux 读 /proc/self/statm，Windows 为工作集大小，其他系统返回 None"""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'rb') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+class MemoryAccountant:
+    """
+    按阶段记录一个任务的内存：每个阶段结束时记下 Python 堆的当前值与阶段内峰值（相对任务开始时，tracemalloc）
+    以及 RSS 的当前值与阶段内峰值（后台线程每 interval 秒采样一次，阶段边界各补采一次）。
+    未启用时所有方法不做任何事
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.enabled = False
+        self.last_job: Optional[Dict[str, object]] = None
+        self._job: Optional[Dict[str, object]] = None
+        self._stage: Optional[Dict[str, object]] = None
+        self._rss_peak = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._lock = threading.Lock()
+
+    def enable(self, interval: Optional[float] = None):
+        with self._lock:
+            if interval:
+                self.interval = interval
+            tracemalloc_users.acquire(self)
+            self.enabled = True
+            if self._sampler is None and current_rss_bytes() is not None:
+                self._stop_sampling.clear()
+                self._sampler = threading.Thread(target=self._sample, name='memory-sampler', daemon=True)
+                self._sampler.start()
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            self._job = self._stage = None
+            sampler, self._sampler = self._sampler, None
+            self._stop_sampling.set()
+            tracemalloc_users.release(self)
+        if sampler is not None:
+            sampler.join()
+
+    def _sample(self):
+        while not self._stop_sampling.wait(self.interval):
+            rss = current_rss_bytes()
+            if rss is not None and rss > self._rss_peak:
+                self._rss_peak = rss
+
+    @staticmethod
+    def _heap() -> Optional[Tuple[int, int]]:
+        return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+
+    def _new_job(self):
+        heap = self._heap()
+        self._job = {'baseline_heap_bytes': heap[0] if heap else None, 'baseline_rss_bytes': current_rss_bytes(),
+                     'stages': []}
+
+    def _open_stage(self, name: str):
+        rss = current_rss_bytes()
+        self._rss_peak = rss or 0
+        # 每个阶段单独统计堆峰值；Python 3.8 没有 reset_peak，峰值会从任务开始累计。
+        # AllocationTracker 同时开启时不重置，以免改动它报告的 traced_peak_bytes，阶段峰值同样改为累计
+        if (tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+                and not tracemalloc_users.shared(self)):
+            tracemalloc.reset_peak()
+        self._stage = {'stage': name, 'start': time.perf_counter()}
+
+    def _close_stage(self):
+        stage, self._stage = self._stage, None
+        if stage is None or self._job is None:
+            return
+        heap = self._heap()
+        rss = current_rss_bytes()
+        baseline_heap = self._job['baseline_heap_bytes']
+        record = {'stage': stage['stage'], 'seconds': time.perf_counter() - stage['start']}
+        if heap is not None and baseline_heap is not None:
+            record['heap_bytes'] = heap[0] - baseline_heap
+            record['heap_peak_bytes'] = max(0, heap[1] - baseline_heap)
+        if rss is not None:
+            record['rss_bytes'] = rss
+            record['rss_peak_bytes'] = max(rss, self._rss_peak)
+        self._job['stages'].append(record)
+
+    def start_job(self):
+        """开始记录新任务（第一个阶段为解析请求），未完成的上一个任务被丢弃"""
+        with self._lock:
+            if not self.enabled:
+                return
+            self._new_job()
+            self._open_stage('request')
+
+    def cancel_job(self):
+        with self._lock:
+            self._job = self._stage = None
+
+    def enter_stage(self, name: str):
+        """结束当前阶段并开始 name 阶段；没有进行中的任务时（直接调用打字引擎）从此阶段开始记录"""
+        with self._lock:
+            if not self.enabled:
+                return
+            if self._job is None:
+                self._new_job()
+            else:
+                self._close_stage()
+            self._open_stage(name)
+
+    def finish_job(self, text_bytes: int = 0, **job_info) -> Optional[Dict[str, object]]:
+        """
+        结束任务：峰值取各阶段的最大值，heap_peak_per_input_byte 为堆峰值与输入文本对象大小（sys.getsizeof）之比，
+        用于检查大文本任务的内存是否与输入大小成比例
+        """
+        with self._lock:
+            if self._job is None:
+                return None
+            self._close_stage()
+            job, self._job = self._job, None
+            stages = job['stages']
+            heap_peaks = [stage['heap_peak_bytes'] for stage in stages if 'heap_peak_bytes' in stage]
+            rss_peaks = [stage['rss_peak_bytes'] for stage in stages if 'rss_peak_bytes' in stage]
+            peak_heap = max(heap_peaks) if heap_peaks else None
+            peak_rss = max(rss_peaks) if rss_peaks else None
+            baseline_rss = job['baseline_rss_bytes']
+            self.last_job = dict(
+                job_info,
+                text_bytes=text_bytes,
+                peak_heap_bytes=peak_heap,
+                peak_rss_bytes=peak_rss,
+                rss_growth_bytes=peak_rss - baseline_rss if peak_rss is not None and baseline_rss is not None
+                else None,
+                heap_peak_per_input_byte=peak_heap / text_bytes if peak_heap is not None and text_bytes else None,
+                stages=stages,
+            )
+            return self.last_job
+
+    def state(self) -> Dict[str, object]:
+        return {'enabled': self.enabled, 'tracing': tracemalloc.is_tracing(),
+                'rss_available': current_rss_bytes() is not None, 'interval_seconds': self.interval,
+                'last_job': self.last_job}
+
+    def to_prometheus(self, prefix: str) -> str:
+        """最近一个任务各阶段的峰值（gauge），没有记录时为空"""
+        job = self.last_job
+        if not job:
+            return ''
+        lines: List[str] = []
+        for key, metric in (('heap_peak_bytes', 'memory_stage_heap_peak_bytes'),
+                            ('rss_peak_bytes', 'memory_stage_rss_peak_bytes')):
+            name = f'{prefix}_{metric}'
+            lines.append(f'# TYPE {name} gauge')
+            for stage in job['stages']:
+                if key in stage:
+                    lines.append(f'{name}{{stage="{stage["stage"]}"}} {stage[key]}')
+        for key in ('peak_heap_bytes', 'peak_rss_bytes', 'rss_growth_bytes', 'text_bytes'):
+            if job.get(key) is not None:
+                name = f'{prefix}_memory_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {job[key]}')
+        return '\n'.join(lines) + '\n'
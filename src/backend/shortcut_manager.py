@@ -6,11 +6,12 @@
 
 import os
 import sys
-import winshell
 from pathlib import Path
-from win32com.client import Dispatch
 import argparse
 
+# winshell 与 win32com 只在创建/删除快捷方式时导入：launcher.py 每次启动都会导入本模块，
+# 而加载 COM 支持较慢，且在非 Windows 系统上不可用
+
 
 class ShortcutManager:
     """快捷方式管理器"""
@@ -42,6 +43,7 @@ class ShortcutManager:
     def create_desktop_shortcut(self) -> bool:
         """创建桌面快捷方式"""
         try:
+            import winshell
             desktop = winshell.desktop()
             shortcut_path = os.path.join(desktop, f"{self.app_name}.lnk")
             
@@ -50,6 +52,7 @@ class ShortcutManager:
                 os.remove(shortcut_path)
             
             # 创建快捷方式
+            from win32com.client import Dispatch
             shell = Dispatch('WScript.Shell')
             shortcut = shell.CreateShortCut(shortcut_path)
             
@@ -84,6 +87,7 @@ class ShortcutManager:
     def create_start_menu_shortcut(self) -> bool:
         """创建开始菜单快捷方式"""
         try:
+            import winshell
             # 获取开始菜单程序文件夹
             start_menu = winshell.start_menu()
             app_folder = os.path.join(start_menu, "Programs", self.app_name)
@@ -98,6 +102,7 @@ class ShortcutManager:
                 os.remove(shortcut_path)
             
             # 创建快捷方式
+            from win32com.client import Dispatch
             shell = Dispatch('WScript.Shell')
             shortcut = shell.CreateShortCut(shortcut_path)
             
@@ -132,6 +137,7 @@ class ShortcutManager:
     def remove_desktop_shortcut(self) -> bool:
         """删除桌面快捷方式"""
         try:
+            import winshell
             desktop = winshell.desktop()
             shortcut_path = os.path.join(desktop, f"{self.app_name}.lnk")
             
@@ -150,6 +156,7 @@ class ShortcutManager:
     def remove_start_menu_shortcut(self) -> bool:
         """删除开始菜单快捷方式"""
         try:
+            import winshell
             start_menu = winshell.start_menu()
             app_folder = os.path.join(start_menu, "Programs", self.app_name)
             
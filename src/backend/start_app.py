@@ -1,4 +1,7 @@
 import argparse
+import collections
+import logging
+import logging.handlers
 import os
 import shutil
 import subprocess
@@ -6,6 +9,15 @@ import sys
 import time
 import threading
 from pathlib import Path
+from typing import Optional
+
+# 后端开始监听后输出的就绪行前缀，需与 backend.py 中的 READY_SIGNAL 保持一致
+BACKEND_READY_SIGNAL = "BACKEND_READY"
+BACKEND_READY_TIMEOUT = 20.0
+BACKEND_LOG_MAX_BYTES = 1024 * 1024
+BACKEND_LOG_BACKUPS = 5
+# 后端退出后等待日志泵读完管道中剩余输出的最长秒数
+BACKEND_PUMP_DRAIN_TIMEOUT = 2.0
 
 def resolve_project_root() -> Path:
     # 从 src/backend/ 目录向上两级到达项目根目录
@@ -29,34 +41,113 @@ def install_node_dependencies(npm_path: str, project_root: Path) -> None:
     except subprocess.CalledProcessError as exc:
         raise RuntimeError("npm install 执行失败，请检查网络或 npm 配置。") from exc
 
-def start_flask_backend(project_root: Path) -> subprocess.Popen:
+class BackendLogPump:
+    """
+    后台线程持续读取后端的 stdout/stderr 并写入滚动日志文件，
+    避免管道缓冲区写满后阻塞后端；同时负责检测就绪行
+    """
+
+    def __init__(self, process: subprocess.Popen, log_dir: Path,
+                 max_bytes: int = BACKEND_LOG_MAX_BYTES, backup_count: int = BACKEND_LOG_BACKUPS):
+        self.process = process
+        self.ready_event = threading.Event()
+        self.ready_port: Optional[int] = None
+        self.recent_stderr = collections.deque(maxlen=50)
+        self.threads = []
+
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger("keyboard_typer.backend_process")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_dir / "backend.log", maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(asctime)s [%(stream)s] %(message)s"))
+        self.logger.addHandler(file_handler)
+
+    def start(self) -> "BackendLogPump":
+        self.threads = [
+            threading.Thread(target=self._pump, args=(self.process.stdout, "stdout"),
+                             name="backend-stdout-pump", daemon=True),
+            threading.Thread(target=self._pump, args=(self.process.stderr, "stderr"),
+                             name="backend-stderr-pump", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _pump(self, stream, stream_name: str):
+        for line in stream:
+            line = line.rstrip("\r\n")
+            if stream_name == "stdout" and not self.ready_event.is_set() and line.startswith(BACKEND_READY_SIGNAL):
+                try:
+                    self.ready_port = int(line.split("port=", 1)[1])
+                except (IndexError, ValueError):
+                    self.ready_port = 5000
+                self.ready_event.set()
+            if stream_name == "stderr":
+                self.recent_stderr.append(line)
+            self.logger.info(line, extra={"stream": stream_name})
+        # 标准输出关闭意味着进程已退出
+        if stream_name == "stdout":
+            self.ready_event.set()
+
+    def wait_ready(self, timeout: float) -> Optional[int]:
+        """等待就绪行，返回端口；超时或进程退出时返回 None"""
+        self.ready_event.wait(timeout)
+        return self.ready_port
+
+    def join(self, timeout: float) -> bool:
+        """进程退出后等待读取线程读完管道中剩余的输出，返回是否已全部读完"""
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self.threads)
+
+
+def start_flask_backend(project_root: Path, server_mode: str = "waitress",
+                        ready_timeout: float = BACKEND_READY_TIMEOUT) -> subprocess.Popen:
     """启动Flask后端服务器"""
     backend_script = project_root / "src" / "backend" / "backend.py"
     if not backend_script.exists():
         raise RuntimeError(f"未找到后端脚本: {backend_script}")
     
-    print("[INFO] 正在启动 Flask 后端服务器...")
+    print(f"[INFO] 正在启动 Flask 后端服务器 (模式: {server_mode})...")
     python_executable = sys.executable
     
     # 在新进程中启动Flask后端
     process = subprocess.Popen(
-        [python_executable, str(backend_script)],
+        [python_executable, str(backend_script), "--server", server_mode],
         cwd=project_root / "src" / "backend",
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
+        errors="replace",
         bufsize=1
     )
+    log_dir = project_root / "logs"
+    pump = BackendLogPump(process, log_dir).start()
     
-    # 等待后端启动
-    print("[INFO] 等待后端服务器启动 (3秒)...")
-    time.sleep(3)
+    # 等待后端输出就绪信号，而不是固定等待
+    print(f"[INFO] 等待后端服务器就绪 (最长 {ready_timeout:.0f} 秒)...")
+    start_time = time.monotonic()
+    port = pump.wait_ready(ready_timeout)
     
-    if process.poll() is not None:
-        stdout, stderr = process.communicate()
+    if port is None:
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            raise RuntimeError(f"后端在 {ready_timeout:.0f} 秒内未就绪")
+        pump.join(BACKEND_PUMP_DRAIN_TIMEOUT)
+        stderr = "\n".join(pump.recent_stderr)
         raise RuntimeError(f"后端启动失败:\n{stderr}")
     
-    print("[INFO] Flask 后端服务器已启动 (http://localhost:5000)")
+    print(f"[INFO] Flask 后端服务器已启动 (http://localhost:{port}, 耗时 {time.monotonic() - start_time:.2f} 秒)")
+    print(f"[INFO] 后端日志: {log_dir / 'backend.log'}")
     return process
 
 def run_electron_app(npm_path: str, project_root: Path, dev_mode: bool) -> subprocess.Popen:
@@ -83,6 +174,12 @@ def parse_arguments() -> argparse.Namespace:
         action="store_true",
         help="以开发模式运行，自动打开调试工具"
     )
+    parser.add_argument(
+        "--server",
+        choices=["waitress", "dev"],
+        default="waitress",
+        help="后端HTTP服务模式: waitress 为生产服务器（默认），dev 为 Flask 开发服务器"
+    )
     return parser.parse_args()
 
 
@@ -93,7 +190,7 @@ def main(args: argparse.Namespace) -> None:
     
     try:
         # 启动Flask后端
-        backend_process = start_flask_backend(project_root)
+        backend_process = start_flask_backend(project_root, server_mode=args.server)
         
         # 安装npm依赖并启动Electron前端
         npm_path = ensure_npm_available()
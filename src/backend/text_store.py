@@ -0,0 +1,118 @@
+"""
+内容寻址文本缓存模块
+按 SHA-256 哈希保存上传过的文本及其预处理结果（打字计划），
+总占用超过字节上限时按最近最少使用顺序淘汰
+"""
+
+import collections
+import hashlib
+import re
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+TEXT_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def compute_text_digest(text: str) -> str:
+    """计算文本的内容哈希；JSON 转义可能带入孤立的代理项（如 \\ud83d），按 surrogatepass 编码而不报错"""
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def is_text_digest(value: Any) -> bool:
+    """是否为 compute_text_digest 格式的哈希（64 位小写十六进制字符串）"""
+    return isinstance(value, str) and TEXT_DIGEST_PATTERN.fullmatch(value) is not None
+
+
+def estimate_size(value: Any) -> int:
+    """估算字符串、列表、字典等缓存对象占用的字节数"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(item) for item in value.values())
+    return size
+
+
+class TextStore:
+    """按内容哈希寻址、按字节数上限做 LRU 淘汰的文本与计划缓存"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "collections.OrderedDict[str, Dict]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str, digest: Optional[str] = None) -> bool:
+        """保存文本，返回是否已缓存；超过上限的单个文本不缓存，之后只能随请求发送完整文本"""
+        digest = digest or compute_text_digest(text)
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return True
+            size = estimate_size(text)
+            if size > self.max_bytes:
+                return False
+            self._entries[digest] = {'text': text, 'plans': {}, 'size': size}
+            self.total_bytes += size
+            self._evict()
+        return True
+
+    def get(self, digest: str) -> Optional[str]:
+        """按哈希读取文本，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(digest)
+            return entry['text']
+
+    def contains(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def get_plan(self, digest: str, plan_key: Hashable, builder: Callable[[str], Any]) -> Optional[Any]:
+        """读取文本的预处理计划，不存在时用 builder 生成并缓存；文本未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            plan = entry['plans'].get(plan_key)
+            if plan is not None:
+                self._entries.move_to_end(digest)
+                return plan
+            text = entry['text']
+
+        # 在锁外生成计划，避免大文本预处理阻塞其他请求
+        plan = builder(text)
+        plan_size = estimate_size(plan)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and plan_key not in entry['plans']:
+                entry['plans'][plan_key] = plan
+                entry['size'] += plan_size
+                self.total_bytes += plan_size
+                self._entries.move_to_end(digest)
+                self._evict()
+        return plan
+
+    def _evict(self):
+        """淘汰最久未使用的条目直到总占用不超过上限（调用方需持有锁）"""
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry['size']
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
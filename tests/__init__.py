@@ -10,6 +10,12 @@
 - content_diff_tests: 内容差异检测测试
 - newline_tests: 换行检测测试
 - indentation_tests: 空格缩进检测测试
+- editor_emulator: 编辑器模拟器
+- editor_emulation_tests: 编辑器模拟测试
+- corpus_generator: 压力测试语料生成器
+- fault_injector: 批量故障注入器
+- report_stream: 流式 JSONL 测试报告
+- results_store: 测试结果历史库
 - run_all_tests: 主测试运行器
 
 使用方法：
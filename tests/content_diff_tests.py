@@ -9,7 +9,7 @@ import sys
 import os
 from pathlib import Path
 import unittest
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import time
 import random
 import string
@@ -18,14 +18,28 @@ import string
 sys.path.append(str(Path(__file__).parent))
 sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
 
-from test_framework import KeyboardTyperTestFramework, TestResult
+from test_framework import KeyboardTyperTestFramework, TestResult, run_test_group
+from fault_injector import FaultInjector
+from corpus_generator import CORPUS_KINDS, load_corpus, parse_size
+
+# 压力测试中每种语料的大小，可通过环境变量调大（如 100MB）
+STRESS_CORPUS_BYTES = parse_size(os.environ.get('KEYBOARD_TYPER_STRESS_BYTES', '64KB'))
+STRESS_CORPUS_SEED = 0
 
 
 class ContentDifferenceTests:
     """内容差异测试类"""
     
-    def __init__(self):
-        self.framework = KeyboardTyperTestFramework()
+    # run_all_tests 依次执行的用例组；并行运行时以组为单位分配到各工作进程
+    TEST_GROUPS = [
+        'run_perfect_input_tests',
+        'run_error_simulation_tests',
+        'run_stress_tests'
+    ]
+    
+    def __init__(self, keep_results: bool = True):
+        """keep_results 为 False 时结果只写入附加的 JSONL 报告，不在内存中保留（主测试运行器使用）"""
+        self.framework = KeyboardTyperTestFramework(keep_results=keep_results)
         self.test_cases = []
         self._prepare_test_cases()
     
@@ -140,40 +154,8 @@ class ContentDifferenceTests:
         if error_rate == 0.0:
             return text  # 无错误，直接返回原文本
         
-        result = []
-        for i, char in enumerate(text):
-            if random.random() < error_rate:
-                # 随机选择错误类型
-                error_type = random.choice(['missing', 'extra', 'wrong'])
-                
-                if error_type == 'missing':
-                    # 缺字：跳过当前字符
-                    continue
-                elif error_type == 'extra':
-                    # 多字：添加额外字符
-                    if char.isalpha():
-                        extra_char = random.choice(string.ascii_letters)
-                    elif char.isdigit():
-                        extra_char = random.choice(string.digits)
-                    else:
-                        extra_char = random.choice('!@#$%^&*()')
-                    result.append(extra_char)
-                    result.append(char)
-                elif error_type == 'wrong':
-                    # 错字：替换为错误字符
-                    if char.isalpha():
-                        wrong_char = random.choice(string.ascii_letters)
-                    elif char.isdigit():
-                        wrong_char = random.choice(string.digits)
-                    elif char == ' ':
-                        wrong_char = random.choice(['\t', '  '])  # 空格错误
-                    else:
-                        wrong_char = random.choice('!@#$%^&*()')
-                    result.append(wrong_char)
-            else:
-                result.append(char)
-        
-        return ''.join(result)
+        # 批量注入错误，种子取自 random 模块，随用例组种子复现
+        return FaultInjector(random.getrandbits(32)).inject(text, char_rate=error_rate).text
     
     def run_perfect_input_tests(self):
         """运行完美输入测试（无错误）"""
@@ -260,6 +242,13 @@ class ContentDifferenceTests:
                 "description": "测试500个随机混合字符"
             }
         ]
+        # 磁盘缓存的可复现语料
+        for kind in CORPUS_KINDS:
+            stress_cases.append({
+                "name": f"语料-{kind}",
+                "input": load_corpus(kind, STRESS_CORPUS_BYTES, STRESS_CORPUS_SEED),
+                "description": f"测试 {STRESS_CORPUS_BYTES} 字节的 {kind} 语料"
+            })
         
         for test_case in stress_cases:
             print(f"测试: {test_case['name']}")
@@ -279,8 +268,8 @@ class ContentDifferenceTests:
                 print(f"  差异数量: {len(result.differences)}")
             print()
     
-    def run_all_tests(self):
-        """运行所有内容差异测试"""
+    def run_all_tests(self, seed: Optional[int] = None):
+        """运行所有内容差异测试（seed 为 None 时不固定随机数种子）"""
         print("开始内容差异检测测试")
         print("测试目标：检测输入与输出在内容上的差异（缺字/多字/错字）")
         print()
@@ -288,30 +277,33 @@ class ContentDifferenceTests:
         start_time = time.time()
         
         # 运行各类测试
-        self.run_perfect_input_tests()
-        self.run_error_simulation_tests()
-        self.run_stress_tests()
+        for group in self.TEST_GROUPS:
+            run_test_group(self, group, seed)
         
         # 生成报告
         total_time = time.time() - start_time
         print("=" * 60)
         print("测试完成，生成报告...")
         print(f"总执行时间: {total_time:.3f}秒")
+        self.save_reports()
+        
+        return self.framework.test_results
+    
+    def save_reports(self):
+        """将测试框架中的结果保存为文本和JSON报告"""
         # 创建带日期的报告文件夹
         dated_folder = self.framework.create_dated_report_folder()
         
         # 保存详细报告
         report_file = dated_folder / "content_diff_test_report.txt"
-        report_content = self.framework.generate_report(str(report_file))
+        self.framework.generate_report(str(report_file))
         
         # 保存JSON报告
-        json_report_file = dated_folder / "content_diff_test_report.json"
+        json_report_file = dated_folder / "content_diff_test_report.jsonl"
         self.framework.export_json_report(str(json_report_file))
         
         print(f"详细报告已保存到: {report_file}")
         print(f"JSON报告已保存到: {json_report_file}")
-        
-        return self.framework.test_results
 
 
 def main():
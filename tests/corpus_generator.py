@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压力测试语料生成器
+按 (语料类型, 大小, 种子) 流式生成可复现的文本，从几 KB 到数百 MB：
+- mixed_cjk: 中英文、数字、标点混排的段落
+- deep_indent_code: 深层嵌套、空格与制表符缩进混用的代码
+- newline_mix: CRLF / LF / CR 混用的多行文本
+- switch_heavy: 中英文逐字交替、需要频繁切换输入法的极端文本
+生成结果以 UTF-8 缓存在磁盘上，读取时通过 mmap 映射，重复运行不必重新生成
+"""
+
+import argparse
+import codecs
+import mmap
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+# 生成逻辑变化时递增，旧的缓存文件随之失效
+GENERATOR_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "corpora"
+DEFAULT_CHUNK_LINES = 2048
+
+ASCII_WORDS = [
+    'the', 'keyboard', 'typer', 'input', 'layout', 'switch', 'value', 'return', 'hello', 'world',
+    'test', 'data', 'config', 'window', 'speed', 'delay', 'buffer', 'stream', 'python', 'line'
+]
+CJK_WORDS = [
+    '你好', '世界', '测试', '输入', '键盘', '中文', '文本', '换行', '缩进', '速度',
+    '程序', '窗口', '切换', '输入法', '数据', '结果', '配置', '字符', '模拟', '打字'
+]
+CJK_CHARACTERS = ''.join(CJK_WORDS)
+PUNCTUATION = ['，', '。', '、', '；', '：', '！', '？', ',', '.', ';', ':', '!', '?']
+CODE_KEYWORDS = ['if', 'for', 'while', 'with', 'def', 'class', 'try', 'elif', 'else']
+LINE_ENDINGS = ['\r\n', '\n', '\r']
+
+
+def _mixed_cjk_lines(rng: random.Random) -> Iterator[str]:
+    while True:
+        words = []
+        for _ in range(rng.randint(4, 16)):
+            roll = rng.random()
+            if roll < 0.45:
+                words.append(rng.choice(CJK_WORDS))
+            elif roll < 0.85:
+                words.append(rng.choice(ASCII_WORDS))
+            elif roll < 0.95:
+                words.append(str(rng.randint(0, 99999)))
+            else:
+                words.append(rng.choice(PUNCTUATION))
+        yield ' '.join(words) + '\n'
+
+
+def _deep_indent_code_lines(rng: random.Random) -> Iterator[str]:
+    depth = 0
+    indent_unit = '    '
+    while True:
+        if depth == 0 and rng.random() < 0.1:
+            # 每个顶层代码块随机使用 2/4 个空格或制表符缩进
+            indent_unit = rng.choice(['  ', '    ', '\t'])
+        indent = indent_unit * depth
+        roll = rng.random()
+        if roll < 0.35 and depth < 16:
+            keyword = rng.choice(CODE_KEYWORDS)
+            yield f"{indent}{keyword} {rng.choice(ASCII_WORDS)}_{rng.randint(0, 99)}:\n"
+            depth += 1
+        elif roll < 0.55 and depth > 0:
+            depth -= rng.randint(1, min(depth, 3))
+            yield f"{indent}return {rng.choice(ASCII_WORDS)}  # {rng.choice(CJK_WORDS)}\n"
+        elif roll < 0.62:
+            # 空行，偶尔带有行尾空白
+            yield rng.choice(['\n', indent + '\n'])
+        else:
+            yield f"{indent}{rng.choice(ASCII_WORDS)} = {rng.choice(ASCII_WORDS)}({rng.randint(0, 999)})\n"
+
+
+def _newline_mix_lines(rng: random.Random) -> Iterator[str]:
+    ending = '\n'
+    while True:
+        if rng.random() < 0.2:
+            # 以段为单位切换换行风格，段内偶尔混入其他换行符
+            ending = rng.choice(LINE_ENDINGS)
+        line_ending = rng.choice(LINE_ENDINGS) if rng.random() < 0.1 else ending
+        if rng.random() < 0.1:
+            yield line_ending
+            continue
+        words = [rng.choice(ASCII_WORDS if rng.random() < 0.6 else CJK_WORDS) for _ in range(rng.randint(1, 10))]
+        yield ' '.join(words) + line_ending
+
+
+# 逐字交替时每段 1~2 个字符
+_SWITCH_ASCII = 'abcdefghijklmnopqrstuvwxyz0123456789'
+_SWITCH_CJK_RUNS = list(CJK_CHARACTERS) + [a + b for a in CJK_CHARACTERS for b in CJK_CHARACTERS]
+_SWITCH_ASCII_RUNS = list(_SWITCH_ASCII) + [a + b for a in _SWITCH_ASCII for b in _SWITCH_ASCII]
+
+
+def _switch_heavy_lines(rng: random.Random) -> Iterator[str]:
+    while True:
+        # 中英文片段严格交替，每行以任一种开头
+        count = rng.randint(3, 20)
+        cjk_runs = rng.choices(_SWITCH_CJK_RUNS, k=count)
+        ascii_runs = rng.choices(_SWITCH_ASCII_RUNS, k=count)
+        pairs = zip(cjk_runs, ascii_runs) if rng.random() < 0.5 else zip(ascii_runs, cjk_runs)
+        yield ''.join(map(''.join, pairs)) + '\n'
+
+
+CORPUS_KINDS: Dict[str, Callable[[random.Random], Iterator[str]]] = {
+    'mixed_cjk': _mixed_cjk_lines,
+    'deep_indent_code': _deep_indent_code_lines,
+    'newline_mix': _newline_mix_lines,
+    'switch_heavy': _switch_heavy_lines,
+}
+
+
+def parse_size(value: str) -> int:
+    """解析 '64KB'、'100MB'、'1GB' 或纯数字形式的字节数"""
+    text = value.strip().upper()
+    for suffix, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024), ('B', 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def iter_corpus_chunks(kind: str, size: int, seed: int = 0,
+                       chunk_lines: int = DEFAULT_CHUNK_LINES) -> Iterator[bytes]:
+    """流式生成语料的 UTF-8 字节块，总长度恰好不超过 size 字节；相同参数总是得到相同内容"""
+    if kind not in CORPUS_KINDS:
+        raise ValueError(f"未知的语料类型: {kind}，可选: {', '.join(CORPUS_KINDS)}")
+    rng = random.Random(f"{kind}:{seed}:{GENERATOR_VERSION}")
+    lines = CORPUS_KINDS[kind](rng)
+    remaining = size
+    while remaining > 0:
+        chunk = ''.join(next(lines) for _ in range(chunk_lines)).encode('utf-8')
+        if len(chunk) > remaining:
+            # 截断时丢弃被切开的多字节字符
+            chunk = chunk[:remaining].decode('utf-8', errors='ignore').encode('utf-8')
+            remaining = 0
+        else:
+            remaining -= len(chunk)
+        yield chunk
+
+
+def generate_corpus(kind: str, size: int, seed: int = 0) -> str:
+    """直接在内存中生成语料文本（适合小语料）"""
+    return b''.join(iter_corpus_chunks(kind, size, seed)).decode('utf-8')
+
+
+class CorpusCache:
+    """语料的磁盘缓存：首次请求时流式写入文件，之后直接映射读取"""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or os.environ.get('KEYBOARD_TYPER_CORPUS_DIR', DEFAULT_CACHE_DIR))
+
+    def path_for(self, kind: str, size: int, seed: int) -> Path:
+        return self.directory / f"{kind}-{size}-{seed}-v{GENERATOR_VERSION}.txt"
+
+    def ensure(self, kind: str, size: int, seed: int = 0) -> Path:
+        """返回缓存文件路径，不存在时先生成（写入临时文件后原子替换，并发生成互不干扰）"""
+        path = self.path_for(kind, size, seed)
+        if path.exists():
+            return path
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in iter_corpus_chunks(kind, size, seed):
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        return path
+
+    @contextmanager
+    def open(self, kind: str, size: int, seed: int = 0) -> Iterator[memoryview]:
+        """以只读 mmap 映射缓存的语料，返回字节视图（退出上下文后失效）"""
+        path = self.ensure(kind, size, seed)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b'')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def load_text(self, kind: str, size: int, seed: int = 0) -> str:
+        """读取完整语料文本（从映射直接解码，不经过中间的 bytes 副本）"""
+        with self.open(kind, size, seed) as view:
+            return str(view, 'utf-8')
+
+    def iter_text(self, kind: str, size: int, seed: int = 0, chunk_bytes: int = 1024 * 1024) -> Iterator[str]:
+        """分块解码语料，供不需要整段文本的流式处理使用"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with self.open(kind, size, seed) as view:
+            for start in range(0, len(view), chunk_bytes):
+                text = decoder.decode(view[start:start + chunk_bytes])
+                if text:
+                    yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+_default_cache = None
+
+
+def load_corpus(kind: str, size: int, seed: int = 0) -> str:
+    """使用默认缓存目录读取（必要时生成）语料"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CorpusCache()
+    return _default_cache.load_text(kind, size, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成并缓存压力测试语料")
+    parser.add_argument("--kind", choices=list(CORPUS_KINDS) + ['all'], default='all', help="语料类型")
+    parser.add_argument("--size", type=parse_size, default=parse_size('1MB'), help="语料大小，如 64KB、100MB")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--cache-dir", help="缓存目录（默认 tests/corpora 或 KEYBOARD_TYPER_CORPUS_DIR）")
+    args = parser.parse_args()
+
+    cache = CorpusCache(args.cache_dir)
+    kinds: List[str] = list(CORPUS_KINDS) if args.kind == 'all' else [args.kind]
+    for kind in kinds:
+        start = time.perf_counter()
+        cached = cache.path_for(kind, args.size, args.seed).exists()
+        path = cache.ensure(kind, args.size, args.seed)
+        elapsed = time.perf_counter() - start
+        state = "已缓存" if cached else f"生成耗时 {elapsed:.2f}秒"
+        print(f"{kind:<18} {path.stat().st_size:>12} 字节  {state}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
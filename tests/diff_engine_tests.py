@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+差异算法后端测试脚本
+以 difflib 参考实现为基准，检查 Myers 与分层实现的正确性：
+操作码可还原文本、编辑代价不劣于参考实现（Myers 为最小代价）、缺字/多字/错字分类一致
+"""
+
+import sys
+import random
+import time
+from pathlib import Path
+from collections import Counter
+
+sys.path.append(str(Path(__file__).parent))
+
+from diff_engines import DIFF_ENGINES, get_diff_engine, validate_opcodes, edit_cost
+from test_framework import CheckTally, TextComparisonEngine
+
+
+class DiffEngineTests(CheckTally):
+    """差异算法后端测试类"""
+
+    def __init__(self, seed: int = 20240601):
+        super().__init__()
+        self.seed = seed
+        self.reference = get_diff_engine('difflib')
+        self.candidates = [get_diff_engine(name) for name in DIFF_ENGINES if name != 'difflib']
+
+    def run_exhaustive_small_tests(self, cases: int = 2000):
+        """小字母表随机用例：与动态规划求得的最小编辑代价对比"""
+        print("=" * 60)
+        print("运行小规模随机对比测试")
+        print("=" * 60)
+
+        rng = random.Random(self.seed)
+
+        def min_edit_cost(a: str, b: str) -> int:
+            previous = list(range(len(b) + 1))
+            for i in range(1, len(a) + 1):
+                current = [i] + [0] * len(b)
+                for j in range(1, len(b) + 1):
+                    if a[i - 1] == b[j - 1]:
+                        current[j] = previous[j - 1]
+                    else:
+                        current[j] = 1 + min(previous[j], current[j - 1])
+                previous = current
+            return previous[-1]
+
+        for _ in range(cases):
+            a = ''.join(rng.choices('ab\n ', k=rng.randint(0, 12)))
+            b = ''.join(rng.choices('ab\n ', k=rng.randint(0, 12)))
+            optimal = min_edit_cost(a, b)
+            for engine in self.candidates:
+                opcodes = engine.get_opcodes(a, b)
+                self.check(f"{engine.name} 操作码有效", validate_opcodes(a, b, opcodes), repr((a, b)))
+                if engine.minimal:
+                    self.check(f"{engine.name} 编辑代价最优", edit_cost(opcodes)['total'] == optimal, repr((a, b)))
+        print(f"完成 {cases} 个用例")
+
+    def run_classification_tests(self):
+        """单点错误用例：各后端给出的差异分类应与参考实现一致"""
+        print("=" * 60)
+        print("运行差异分类一致性测试")
+        print("=" * 60)
+
+        base = "def hello():\n    print('你好 World')\n    return True\n"
+        cases = [
+            ("缺字", base.replace("hello", "helo")),
+            ("多字", base.replace("World", "Worldd")),
+            ("错字", base.replace("return", "retern")),
+            ("缺换行", base.replace(":\n", ":", 1)),
+            ("缩进错误", base.replace("    return", "  return")),
+            ("中文错字", base.replace("你好", "您好")),
+        ]
+
+        reference_engine = TextComparisonEngine('difflib')
+        for name, actual in cases:
+            expected_types = Counter(d.type for d in reference_engine.compare_texts(base, actual))
+            for engine_name in DIFF_ENGINES:
+                if engine_name == 'difflib':
+                    continue
+                engine = TextComparisonEngine(engine_name)
+                actual_types = Counter(d.type for d in engine.compare_texts(base, actual))
+                self.check(f"{engine_name} {name}", actual_types == expected_types,
+                           f"期望 {dict(expected_types)}, 实际 {dict(actual_types)}")
+            print(f"测试: {name} -> {dict((k.value, v) for k, v in expected_types.items())}")
+
+    def run_large_input_tests(self, size: int = 200_000, edits: int = 100):
+        """较大输入：各后端结果必须有效，且编辑代价不高于参考实现"""
+        print("=" * 60)
+        print(f"运行大文本测试 ({size} 字符, {edits} 处修改)")
+        print("=" * 60)
+
+        rng = random.Random(self.seed)
+        expected = ''.join(rng.choices('abcdefgh 你好世界\n', k=size))
+        actual = list(expected)
+        for _ in range(edits):
+            position = rng.randrange(len(actual))
+            operation = rng.choice(['delete', 'insert', 'replace'])
+            if operation == 'delete':
+                del actual[position]
+            elif operation == 'insert':
+                actual.insert(position, 'x')
+            else:
+                actual[position] = 'y'
+        actual = ''.join(actual)
+
+        start = time.perf_counter()
+        reference_cost = edit_cost(self.reference.get_opcodes(expected, actual))['total']
+        print(f"  difflib: 代价 {reference_cost}, 耗时 {time.perf_counter() - start:.3f}秒")
+        for engine in self.candidates:
+            start = time.perf_counter()
+            opcodes = engine.get_opcodes(expected, actual)
+            elapsed = time.perf_counter() - start
+            cost = edit_cost(opcodes)['total']
+            print(f"  {engine.name}: 代价 {cost}, 耗时 {elapsed:.3f}秒")
+            self.check(f"{engine.name} 大文本操作码有效", validate_opcodes(expected, actual, opcodes))
+            self.check(f"{engine.name} 大文本代价不劣于参考实现", cost <= reference_cost,
+                       f"{cost} > {reference_cost}")
+
+    def run_detail_limit_tests(self, cases: int = 500, detail_limit: int = 2):
+        """摘要模式和有限明细模式：各类差异数量与完整模式一致，明细条数不超过上限"""
+        print("=" * 60)
+        print("运行差异明细上限测试")
+        print("=" * 60)
+
+        rng = random.Random(self.seed)
+        engine = TextComparisonEngine()
+        for _ in range(cases):
+            a = ''.join(rng.choices('ab \t\n\r', k=rng.randint(0, 40)))
+            b = ''.join(rng.choices('ab \t\n\r', k=rng.randint(0, 40)))
+            full = engine.compare(a, b)
+            full_types = Counter(d.type for d in full.differences)
+            summary = engine.compare(a, b, detail_limit=0)
+            bounded = engine.compare(a, b, detail_limit=detail_limit)
+            bounded_types = Counter(d.type for d in bounded.differences)
+
+            self.check("完整模式计数", full.counts == dict(full_types), repr((a, b)))
+            self.check("摘要模式计数", summary.counts == full.counts and not summary.differences, repr((a, b)))
+            self.check("有限明细计数", bounded.counts == full.counts, repr((a, b)))
+            self.check("有限明细条数",
+                       all(bounded_types[t] == min(n, detail_limit) for t, n in full_types.items()), repr((a, b)))
+            self.check("有限明细为完整明细的子序列",
+                       [d for d in full.differences if d in bounded.differences] == bounded.differences, repr((a, b)))
+        print(f"完成 {cases} 个用例")
+
+    def run_high_error_rate_tests(self, size: int = 50_000, error_rate: float = 0.2):
+        """高错误率：几乎每行都有修改时分层实现仍应快速给出有效结果"""
+        print("=" * 60)
+        print(f"运行高错误率测试 ({size} 字符, 错误率 {error_rate:.0%})")
+        print("=" * 60)
+
+        rng = random.Random(self.seed)
+        expected = ''.join(rng.choices('abcdefgh 你好世界\n', k=size))
+        actual = ''.join(
+            rng.choice(['', 'x', 'y' + character]) if rng.random() < error_rate else character
+            for character in expected
+        )
+
+        reference_cost = edit_cost(self.reference.get_opcodes(expected, actual))['total']
+        engine = get_diff_engine('hierarchical')
+        start = time.perf_counter()
+        opcodes = engine.get_opcodes(expected, actual)
+        elapsed = time.perf_counter() - start
+        cost = edit_cost(opcodes)['total']
+        print(f"  difflib: 代价 {reference_cost}")
+        print(f"  hierarchical: 代价 {cost}, 耗时 {elapsed:.3f}秒")
+        self.check("hierarchical 高错误率操作码有效", validate_opcodes(expected, actual, opcodes))
+        self.check("hierarchical 高错误率代价不劣于参考实现", cost <= reference_cost,
+                   f"{cost} > {reference_cost}")
+
+    def run_all_tests(self) -> bool:
+        self.run_exhaustive_small_tests()
+        self.run_classification_tests()
+        self.run_detail_limit_tests()
+        self.run_large_input_tests()
+        self.run_high_error_rate_tests()
+        print("=" * 60)
+        return self.finish("差异算法测试")
+
+
+def main():
+    tests = DiffEngineTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符级差异算法后端
+为 TextComparisonEngine 提供可替换的 diff 实现：
+- difflib: 基于 difflib.SequenceMatcher 的参考实现
+- myers: Myers O(ND) 算法，使用中间蛇（middle snake）分治实现线性空间
+- hierarchical: 先按整行对齐，只在变化的行块内部再做字符级 Myers 差异
+各后端输出与 SequenceMatcher.get_opcodes() 相同格式的操作码
+"""
+
+import difflib
+from itertools import accumulate
+from typing import Dict, List, Sequence, Tuple
+
+Opcode = Tuple[str, int, int, int, int]
+
+# 匹配段比较时先逐步放大切片长度，长的相同片段在C层面完成比较
+_GALLOP_START = 16
+
+# 分层差异中超过该长度（两侧字符数之和）的变化行块先按锚点切分再做 Myers 差异
+_ANCHOR_BLOCK_SIZE = 256
+# 锚点为两侧在对应位置附近各只出现一次的相同片段
+_ANCHOR_LENGTH = 8
+_ANCHOR_PROBES = 64
+# 总长度小于该值的相同行段不作为行级对齐结果
+_MIN_EQUAL_LINES_LENGTH = 2 * _ANCHOR_LENGTH
+
+
+def _forward_match_length(a: Sequence, a_pos: int, a_end: int, b: Sequence, b_pos: int, b_end: int) -> int:
+    """从 (a_pos, b_pos) 向后的公共前缀长度"""
+    limit = min(a_end - a_pos, b_end - b_pos)
+    if limit <= 0 or a[a_pos] != b[b_pos]:
+        return 0
+    matched = 1
+    step = _GALLOP_START
+    while matched < limit:
+        k = min(step, limit - matched)
+        if a[a_pos + matched:a_pos + matched + k] == b[b_pos + matched:b_pos + matched + k]:
+            matched += k
+            step <<= 1
+        elif k <= _GALLOP_START:
+            while matched < limit and a[a_pos + matched] == b[b_pos + matched]:
+                matched += 1
+            return matched
+        else:
+            step = k >> 1
+    return matched
+
+
+def _backward_match_length(a: Sequence, a_start: int, a_end: int, b: Sequence, b_start: int, b_end: int) -> int:
+    """以 (a_end, b_end) 结尾（不含）向前的公共后缀长度"""
+    limit = min(a_end - a_start, b_end - b_start)
+    if limit <= 0 or a[a_end - 1] != b[b_end - 1]:
+        return 0
+    matched = 1
+    step = _GALLOP_START
+    while matched < limit:
+        k = min(step, limit - matched)
+        if a[a_end - matched - k:a_end - matched] == b[b_end - matched - k:b_end - matched]:
+            matched += k
+            step <<= 1
+        elif k <= _GALLOP_START:
+            while matched < limit and a[a_end - matched - 1] == b[b_end - matched - 1]:
+                matched += 1
+            return matched
+        else:
+            step = k >> 1
+    return matched
+
+
+def merge_edit_operations(edits: List[Opcode], a_length: int, b_length: int) -> List[Opcode]:
+    """将有序的删除/插入操作合并为 difflib 风格的操作码（相邻的删除与插入合并为 replace）"""
+    opcodes: List[Opcode] = []
+    blocks: List[List[int]] = []
+    for _, i1, i2, j1, j2 in edits:
+        if blocks and blocks[-1][1] == i1 and blocks[-1][3] == j1:
+            blocks[-1][1] = i2
+            blocks[-1][3] = j2
+        else:
+            blocks.append([i1, i2, j1, j2])
+
+    i = j = 0
+    for i1, i2, j1, j2 in blocks:
+        if i1 > i:
+            opcodes.append(('equal', i, i1, j, j1))
+        if i2 > i1 and j2 > j1:
+            tag = 'replace'
+        elif i2 > i1:
+            tag = 'delete'
+        else:
+            tag = 'insert'
+        opcodes.append((tag, i1, i2, j1, j2))
+        i, j = i2, j2
+    if i < a_length or j < b_length:
+        opcodes.append(('equal', i, a_length, j, b_length))
+    return opcodes
+
+
+class DifflibDiffEngine:
+    """基于 difflib.SequenceMatcher 的参考实现"""
+
+    name = 'difflib'
+    minimal = False
+
+    def get_opcodes(self, a: Sequence, b: Sequence) -> List[Opcode]:
+        return difflib.SequenceMatcher(None, a, b).get_opcodes()
+
+
+class MyersDiffEngine:
+    """Myers O(ND) 差异算法，线性空间的中间蛇分治实现"""
+
+    name = 'myers'
+    minimal = True
+
+    def get_opcodes(self, a: Sequence, b: Sequence) -> List[Opcode]:
+        edits: List[Opcode] = []
+        self._diff(a, 0, len(a), b, 0, len(b), edits)
+        return merge_edit_operations(edits, len(a), len(b))
+
+    def _diff(self, a, a_lo, a_hi, b, b_lo, b_hi, edits: List[Opcode]):
+        # 去掉公共前缀和后缀，剩余部分必然以差异开头和结尾
+        prefix = _forward_match_length(a, a_lo, a_hi, b, b_lo, b_hi)
+        a_lo += prefix
+        b_lo += prefix
+        suffix = _backward_match_length(a, a_lo, a_hi, b, b_lo, b_hi)
+        a_hi -= suffix
+        b_hi -= suffix
+
+        if a_lo == a_hi:
+            if b_lo < b_hi:
+                edits.append(('insert', a_lo, a_lo, b_lo, b_hi))
+            return
+        if b_lo == b_hi:
+            edits.append(('delete', a_lo, a_hi, b_lo, b_lo))
+            return
+
+        split = self._middle_snake(a, a_lo, a_hi, b, b_lo, b_hi)
+        if split is None:
+            edits.append(('delete', a_lo, a_hi, b_lo, b_lo))
+            edits.append(('insert', a_hi, a_hi, b_lo, b_hi))
+            return
+        x, y = split
+        self._diff(a, a_lo, x, b, b_lo, y, edits)
+        self._diff(a, x, a_hi, b, y, b_hi, edits)
+
+    def _middle_snake(self, a, a_lo, a_hi, b, b_lo, b_hi):
+        """同时从两端搜索最短编辑路径，返回路径重叠处的分割点（绝对坐标）"""
+        n = a_hi - a_lo
+        m = b_hi - b_lo
+        max_d = (n + m + 1) // 2
+        v_offset = max_d
+        v_length = 2 * max_d + 2
+        v1 = [-1] * v_length
+        v2 = [-1] * v_length
+        v1[v_offset + 1] = 0
+        v2[v_offset + 1] = 0
+        delta = n - m
+        # 差值为奇数时在前向搜索中检测重叠，否则在反向搜索中检测
+        front = (delta % 2 != 0)
+        k1start = k1end = k2start = k2end = 0
+
+        for d in range(max_d):
+            for k1 in range(-d + k1start, d + 1 - k1end, 2):
+                k1_offset = v_offset + k1
+                if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                    x1 = v1[k1_offset + 1]
+                else:
+                    x1 = v1[k1_offset - 1] + 1
+                y1 = x1 - k1
+                if x1 < n and y1 < m:
+                    x1 += _forward_match_length(a, a_lo + x1, a_hi, b, b_lo + y1, b_hi)
+                    y1 = x1 - k1
+                v1[k1_offset] = x1
+                if x1 > n:
+                    k1end += 2
+                elif y1 > m:
+                    k1start += 2
+                elif front:
+                    k2_offset = v_offset + delta - k1
+                    if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                        if x1 >= n - v2[k2_offset]:
+                            return a_lo + x1, b_lo + y1
+
+            for k2 in range(-d + k2start, d + 1 - k2end, 2):
+                k2_offset = v_offset + k2
+                if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                    x2 = v2[k2_offset + 1]
+                else:
+                    x2 = v2[k2_offset - 1] + 1
+                y2 = x2 - k2
+                if x2 < n and y2 < m:
+                    x2 += _backward_match_length(a, a_lo, a_hi - x2, b, b_lo, b_hi - y2)
+                    y2 = x2 - k2
+                v2[k2_offset] = x2
+                if x2 > n:
+                    k2end += 2
+                elif y2 > m:
+                    k2start += 2
+                elif not front:
+                    k1_offset = v_offset + delta - k2
+                    if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                        x1 = v1[k1_offset]
+                        y1 = v_offset + x1 - k1_offset
+                        if x1 >= n - x2:
+                            return a_lo + x1, b_lo + y1
+        return None
+
+
+class HierarchicalDiffEngine:
+    """分层差异：先比较行序列，再只对变化的行块做字符级 Myers 差异
+    行级对齐使用 SequenceMatcher（整行按哈希匹配，行数多、改动分散时远快于逐行 Myers），
+    未变化的行不参与字符级搜索。错误率高时几乎每行都有变化，行块会很大，
+    此时先在块中部附近找唯一的相同片段作为锚点二分切开，避免 O(ND) 搜索退化。
+    代价是结果不保证全局最小（行对齐与锚点优先）"""
+
+    name = 'hierarchical'
+    minimal = False
+
+    def __init__(self):
+        self.line_engine = DifflibDiffEngine()
+        self.char_engine = MyersDiffEngine()
+
+    def get_opcodes(self, a: str, b: str) -> List[Opcode]:
+        a_lines = a.splitlines(keepends=True)
+        b_lines = b.splitlines(keepends=True)
+        a_offsets = list(accumulate(map(len, a_lines), initial=0))
+        b_offsets = list(accumulate(map(len, b_lines), initial=0))
+
+        # 变化的行块（全文坐标）；很短的相同行（如空行）多为偶然匹配，并入相邻的变化块，避免把行块对歪
+        blocks: List[List[int]] = []
+        for tag, i1, i2, j1, j2 in self.line_engine.get_opcodes(a_lines, b_lines):
+            a_start, a_end = a_offsets[i1], a_offsets[i2]
+            b_start, b_end = b_offsets[j1], b_offsets[j2]
+            if tag == 'equal' and a_end - a_start >= _MIN_EQUAL_LINES_LENGTH:
+                continue
+            if blocks and blocks[-1][1] == a_start and blocks[-1][3] == b_start:
+                blocks[-1][1] = a_end
+                blocks[-1][3] = b_end
+            else:
+                blocks.append([a_start, a_end, b_start, b_end])
+
+        edits: List[Opcode] = []
+        for a_start, a_end, b_start, b_end in blocks:
+            if a_start == a_end:
+                edits.append(('insert', a_start, a_start, b_start, b_end))
+            elif b_start == b_end:
+                edits.append(('delete', a_start, a_end, b_start, b_start))
+            else:
+                # 变化的行块内部做字符级差异
+                self._diff_block(a, a_start, a_end, b, b_start, b_end, edits)
+        return merge_edit_operations(edits, len(a), len(b))
+
+    def _diff_block(self, a: str, a_lo: int, a_hi: int, b: str, b_lo: int, b_hi: int, edits: List[Opcode]):
+        if (a_hi - a_lo) + (b_hi - b_lo) > _ANCHOR_BLOCK_SIZE:
+            anchor = self._find_anchor(a, a_lo, a_hi, b, b_lo, b_hi)
+            if anchor is not None:
+                x, y = anchor
+                self._diff_block(a, a_lo, x, b, b_lo, y, edits)
+                self._diff_block(a, x, a_hi, b, y, b_hi, edits)
+                return
+        self.char_engine._diff(a, a_lo, a_hi, b, b_lo, b_hi, edits)
+
+    def _find_anchor(self, a: str, a_lo: int, a_hi: int, b: str, b_lo: int, b_hi: int):
+        """在 a 的中部取片段，先到 b 中按比例对应的位置附近查找，找不到再在整个块中查找，
+        片段在两侧查找范围内都唯一时作为切分点"""
+        if a_hi - a_lo < 2 * _ANCHOR_LENGTH or b_hi - b_lo < 2 * _ANCHOR_LENGTH:
+            return None
+        # 对应位置的偏差随块长增长，搜索半径随之放大
+        local_radius = max(_ANCHOR_BLOCK_SIZE // 2, (a_hi - a_lo) // 64)
+        block_radius = max(a_hi - a_lo, b_hi - b_lo)
+        a_mid = (a_lo + a_hi) // 2
+        for radius in (local_radius, block_radius):
+            for probe in range(_ANCHOR_PROBES):
+                # 从中点向两侧交替取片段
+                step = (probe + 1) // 2 * _ANCHOR_LENGTH
+                x = a_mid + step if probe % 2 == 0 else a_mid - step
+                if x <= a_lo or x + _ANCHOR_LENGTH > a_hi:
+                    continue
+                fragment = a[x:x + _ANCHOR_LENGTH]
+                b_center = b_lo + (x - a_lo) * (b_hi - b_lo) // (a_hi - a_lo)
+                search_lo = max(b_lo + 1, b_center - radius)
+                search_hi = min(b_hi, b_center + radius + _ANCHOR_LENGTH)
+                y = b.find(fragment, search_lo, search_hi)
+                if y < 0 or b.find(fragment, y + 1, search_hi) >= 0:
+                    continue
+                if a.count(fragment, max(a_lo, x - radius), min(a_hi, x + radius + _ANCHOR_LENGTH)) != 1:
+                    continue
+                return x, y
+            if radius >= block_radius:
+                break
+        return None
+
+
+DIFF_ENGINES = {
+    'difflib': DifflibDiffEngine,
+    'myers': MyersDiffEngine,
+    'hierarchical': HierarchicalDiffEngine,
+}
+
+
+def get_diff_engine(name: str):
+    """按名称创建差异算法后端"""
+    if name not in DIFF_ENGINES:
+        raise ValueError(f"未知的差异算法: {name}，可选: {', '.join(DIFF_ENGINES)}")
+    return DIFF_ENGINES[name]()
+
+
+def validate_opcodes(a: Sequence, b: Sequence, opcodes: List[Opcode]) -> bool:
+    """检查操作码是否完整覆盖两个序列，且应用后能由 a 得到 b"""
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        if i1 != i or j1 != j:
+            return False
+        if tag == 'equal' and a[i1:i2] != b[j1:j2]:
+            return False
+        i, j = i2, j2
+    return i == len(a) and j == len(b)
+
+
+def edit_cost(opcodes: List[Opcode]) -> Dict[str, int]:
+    """统计操作码中删除与插入的字符数"""
+    deleted = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ('delete', 'replace'))
+    inserted = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ('insert', 'replace'))
+    return {'deleted': deleted, 'inserted': inserted, 'total': deleted + inserted}
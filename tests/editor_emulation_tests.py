@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编辑器模拟测试脚本
+在记录输出端上运行后端真实的打字引擎，用编辑器模拟器还原各编辑器中得到的文本，
+检测各输入模式（普通/IDE，是否自动切换输入法）的还原度与按键开销
+"""
+
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+import time
+
+# 添加当前目录和backend目录到路径，以便导入测试框架和backend模块
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+from test_framework import KeyboardTyperTestFramework, TestResult, run_test_group
+from editor_emulator import ENGINE_MODES, EditorEmulator, EngineTypist
+from key_sinks import KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP, KEYEVENTF_SCANCODE, RecordingKeySink
+
+
+def scan_key(scancode: int, extended: bool = False) -> List[Tuple]:
+    """一次扫描码按键（按下与释放）对应的记录事件"""
+    flags = KEYEVENTF_SCANCODE | (KEYEVENTF_EXTENDEDKEY if extended else 0)
+    return [('key', 0, scancode, flags), ('key', 0, scancode, flags | KEYEVENTF_KEYUP)]
+
+
+def typed(text: str) -> List[Tuple]:
+    return [('type', character) for character in text]
+
+
+# IDE 模式换行后清除自动缩进的按键序列：Shift+Home 选中缩进，Delete 删除
+CLEAR_INDENT = [('key', 0x10, 0, 0)] + scan_key(0x47, True) + scan_key(0x53, True) + [('key', 0x10, 0, KEYEVENTF_KEYUP)]
+ENTER = scan_key(0x1C)
+ESCAPE = scan_key(0x01)
+
+
+class EventReplay:
+    """把固定的事件序列回放到编辑器模拟器，作为 simulate_typing_func 使用"""
+
+    def __init__(self, editor: str, events: List[Tuple]):
+        self.editor = editor
+        self.events = events
+        self.last_metrics = None
+
+    def __call__(self, text: str, **kwargs) -> str:
+        emulator = EditorEmulator(self.editor)
+        output = emulator.replay(self.events)
+        self.last_metrics = dict(emulator.metrics)
+        return output
+
+
+class EditorEmulationTests:
+    """编辑器模拟测试类"""
+
+    # run_all_tests 依次执行的用例组；并行运行时以组为单位分配到各工作进程
+    TEST_GROUPS = [
+        'run_editor_behavior_tests',
+        'run_engine_mode_tests'
+    ]
+
+    EDITORS = ['notepad', 'vscode', 'jetbrains']
+
+    def __init__(self, keep_results: bool = True):
+        """keep_results 为 False 时结果只写入附加的 JSONL 报告，不在内存中保留（主测试运行器使用）"""
+        self.framework = KeyboardTyperTestFramework(keep_results=keep_results)
+        self.test_cases = []
+        self._prepare_test_cases()
+
+    def _prepare_test_cases(self):
+        """准备打字引擎测试用例"""
+        self.test_cases.extend([
+            {
+                "name": "多行文本",
+                "input": "第一行 first line\n第二行 second line\n",
+                "description": "测试以换行结尾的多行文本"
+            },
+            {
+                "name": "Python缩进",
+                "input": "def main():\n    if ok:\n        run(1)\n    return 1\n",
+                "description": "测试编辑器自动缩进下的多级缩进"
+            },
+            {
+                "name": "花括号代码",
+                "input": "int f() {\n    return g(1, [2]);\n}",
+                "description": "测试括号自动补全"
+            },
+            {
+                "name": "中英混排",
+                "input": "Hello你好World世界 test 测试",
+                "description": "测试输入法频繁切换"
+            }
+        ])
+
+    def _report(self, result: TestResult):
+        status = "✓ 通过" if result.passed else "✗ 失败"
+        print(f"  结果: {status}")
+        if result.metrics:
+            print(f"  按键/字符: {result.metrics.get('keystrokes_per_char', 0):.2f}  "
+                  f"输入法切换: {result.metrics.get('layout_switches', 0)}")
+        if not result.passed:
+            print(f"  差异统计: {result.summary}")
+        print()
+
+    def run_editor_behavior_tests(self):
+        """用手写的事件序列检查编辑器模拟器本身的行为"""
+        print("=" * 60)
+        print("运行编辑器行为测试")
+        print("=" * 60)
+
+        behavior_cases = [
+            ("清除自动缩进", 'vscode', "if a:\nb",
+             typed("if a:") + ENTER + CLEAR_INDENT + typed("b")),
+            ("括号中回车后清除缩进", 'vscode', "f(\n\n)",
+             typed("f(") + ENTER + CLEAR_INDENT),
+            ("括号补全后跳过右括号", 'vscode', "g(1)",
+             typed("g(1)")),
+            ("补全列表吞掉回车", 'vscode', "name",
+             typed("name") + ENTER),
+            ("Esc关闭补全列表后回车", 'vscode', "name\n",
+             typed("name") + ESCAPE + ENTER),
+            ("记事本Tab", 'notepad', "\tx",
+             [('press', 'tab'), ('release', 'tab')] + typed("x")),
+            ("中文输入法截获空格", 'pinyin_notepad', "你好",
+             [('layout', RecordingKeySink.LAYOUTS[1])] + typed("你") + [('press', 'space')] + typed("好")),
+        ]
+
+        for name, editor, expected, events in behavior_cases:
+            print(f"测试: {name} ({editor})")
+            result = self.framework.run_test(
+                test_name=f"编辑器行为-{name}",
+                input_text=expected,
+                simulate_typing_func=EventReplay(editor, events)
+            )
+            self._report(result)
+
+    def run_engine_mode_tests(self):
+        """在各编辑器中运行打字引擎的每种输入模式"""
+        print("=" * 60)
+        print("运行打字引擎输入模式测试")
+        print("=" * 60)
+
+        for editor in self.EDITORS:
+            for mode in ENGINE_MODES:
+                typist = EngineTypist(editor, mode)
+                for test_case in self.test_cases:
+                    print(f"测试: {test_case['name']} ({editor}/{mode})")
+                    result = self.framework.run_test(
+                        test_name=f"引擎-{editor}-{mode}-{test_case['name']}",
+                        input_text=test_case['input'],
+                        simulate_typing_func=typist
+                    )
+                    self._report(result)
+
+    def run_all_tests(self, seed: Optional[int] = None):
+        """运行所有编辑器模拟测试（seed 为 None 时不固定随机数种子）"""
+        print("开始编辑器模拟测试")
+        print("测试目标：检测各输入模式在不同编辑器中的还原度与按键开销")
+        print()
+
+        start_time = time.time()
+
+        for group in self.TEST_GROUPS:
+            run_test_group(self, group, seed)
+
+        total_time = time.time() - start_time
+        print("=" * 60)
+        print("测试完成，生成报告...")
+        print(f"总执行时间: {total_time:.3f}秒")
+        self.save_reports()
+
+        return self.framework.test_results
+
+    def save_reports(self):
+        """将测试框架中的结果保存为文本和JSONL报告"""
+        dated_folder = self.framework.create_dated_report_folder()
+
+        report_file = dated_folder / "editor_emulation_test_report.txt"
+        self.framework.generate_report(str(report_file))
+
+        json_report_file = dated_folder / "editor_emulation_test_report.jsonl"
+        self.framework.export_json_report(str(json_report_file))
+
+        print(f"详细报告已保存到: {report_file}")
+        print(f"JSON报告已保存到: {json_report_file}")
+
+
+def main():
+    """主函数"""
+    print("编辑器模拟测试脚本")
+    print("=" * 60)
+
+    editor_tests = EditorEmulationTests()
+    results = editor_tests.run_all_tests()
+
+    total_tests = len(results)
+    passed_tests = sum(1 for r in results if r.passed)
+
+    print("\n" + "=" * 60)
+    print("测试总结")
+    print("=" * 60)
+    print(f"总测试数: {total_tests}")
+    print(f"通过测试: {passed_tests}")
+    print(f"失败测试: {total_tests - passed_tests}")
+    if total_tests:
+        print(f"通过率: {passed_tests/total_tests*100:.1f}%")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
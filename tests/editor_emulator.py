@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编辑器模拟器
+把按键输出端记录的事件（RecordingKeySink.events）回放到模拟的文本编辑器中，重建目标窗口最终的文本内容。
+模拟回车、Tab、空格、Shift+Home 选择与 Delete、Esc、自动缩进、括号自动补全、补全弹窗和输入法布局状态，
+不同编辑器的行为由 EditorConfig 描述。EngineTypist 在记录输出端上运行真实的 execute_typing，
+再用模拟器还原结果，可在任意平台上衡量各输入模式的还原度与按键开销；引擎使用虚拟时钟，不会真正等待。
+"""
+
+import importlib
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+from clocks import VirtualClock
+from key_sinks import KEYEVENTF_KEYUP, KEYEVENTF_SCANCODE, RecordingKeySink
+
+# 虚拟键码与扫描码到键名的映射（与 backend.py 中发送的按键一致）
+VIRTUAL_KEYS = {0x10: 'shift', 0x09: 'tab', 0x20: 'space', 0x1B: 'esc', 0x0D: 'enter'}
+SCAN_CODES = {0x2A: 'shift', 0x36: 'shift', 0x0F: 'tab', 0x39: 'space', 0x01: 'esc', 0x1C: 'enter',
+              0x47: 'home', 0x53: 'delete'}
+ENGLISH_LANGUAGE_ID = 0x0409
+
+BRACKET_PAIRS = {'(': ')', '[': ']', '{': '}'}
+QUOTE_PAIRS = {'"': '"', "'": "'", '`': '`'}
+
+
+@dataclass
+class EditorConfig:
+    """编辑器行为配置"""
+    name: str
+    # 回车后保留上一行的缩进；行尾是 indent_after 中的字符时再增加一级
+    auto_indent: bool = False
+    indent_after: str = ''
+    indent_unit: str = '    '
+    # Tab 键插入的内容
+    tab_text: str = '\t'
+    # 自动补全的括号与引号
+    auto_close: Dict[str, str] = field(default_factory=dict)
+    # Home 键：'smart' 先到首个非空白字符、已在该处时到行首；'line_start' 总是到行首
+    home_mode: str = 'line_start'
+    # 连续输入 completion_min_chars 个标识符字符后弹出补全列表，回车/Tab 会接受补全而不是换行/缩进
+    completion_popup: bool = False
+    completion_min_chars: int = 2
+    # 非英文输入法布局下以按键形式发送的空格/回车/Tab 被输入法截获（部分拼音输入法的行为）
+    ime_intercepts_keys: bool = False
+
+
+EDITOR_CONFIGS: Dict[str, EditorConfig] = {
+    'notepad': EditorConfig(name='notepad'),
+    'vscode': EditorConfig(
+        name='vscode', auto_indent=True, indent_after=':{[(', tab_text='    ',
+        auto_close={**BRACKET_PAIRS, **QUOTE_PAIRS}, home_mode='smart', completion_popup=True
+    ),
+    'jetbrains': EditorConfig(
+        name='jetbrains', auto_indent=True, indent_after=':{[(', tab_text='    ',
+        auto_close={**BRACKET_PAIRS, '"': '"', "'": "'"}, home_mode='smart', completion_popup=True,
+        completion_min_chars=1
+    ),
+    'pinyin_notepad': EditorConfig(name='pinyin_notepad', ime_intercepts_keys=True),
+}
+
+
+def get_editor_config(editor) -> EditorConfig:
+    """按名称获取编辑器配置（也可直接传入 EditorConfig）"""
+    if isinstance(editor, EditorConfig):
+        return editor
+    if editor not in EDITOR_CONFIGS:
+        raise ValueError(f"未知的编辑器: {editor}，可选: {', '.join(EDITOR_CONFIGS)}")
+    return EDITOR_CONFIGS[editor]
+
+
+def _is_word_character(character: str) -> bool:
+    return character.isascii() and (character.isalnum() or character == '_')
+
+
+class EditorEmulator:
+    """
+    回放按键事件的编辑器模型
+    文本以光标为界存放在两个栈中（光标右侧倒序存放），光标附近的插入和删除都是 O(1)
+    """
+
+    def __init__(self, config='notepad', layout: int = RecordingKeySink.LAYOUTS[0]):
+        self.config = get_editor_config(config)
+        self._left: List[str] = []
+        self._right: List[str] = []
+        # 光标右侧被选中的字符数（Shift+Home 向左选择后光标位于选区起点）
+        self._selection = 0
+        # 光标右侧紧邻的、由自动补全插入的右括号/引号数量，输入相同字符时直接跳过
+        self._auto_closers = 0
+        self._word_length = 0
+        self._popup_open = False
+        self._shift_down = False
+        self.layout = layout
+        self.metrics: Dict[str, int] = {
+            'keystrokes': 0,
+            'layout_switches': 0,
+            'auto_inserted': 0,
+            'overtyped': 0,
+            'completion_accepts': 0,
+            'ime_intercepted': 0,
+            'selection_deletes': 0,
+            # Shift 未松开时按下的其他键（Shift+回车/Shift+Tab 在多数编辑器中含义不同）
+            'shift_held_keys': 0,
+        }
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._left) + ''.join(reversed(self._right))
+
+    @property
+    def ime_active(self) -> bool:
+        return (self.layout & 0xFFFF) != ENGLISH_LANGUAGE_ID
+
+    def replay(self, events: Iterable[Tuple]) -> str:
+        """依次处理记录的事件，返回最终文本"""
+        for event in events:
+            self.handle_event(event)
+        return self.text
+
+    def handle_event(self, event: Tuple):
+        kind = event[0]
+        if kind == 'type':
+            self.metrics['keystrokes'] += 1
+            self.type_character(event[1])
+        elif kind == 'press':
+            self.metrics['keystrokes'] += 1
+            self.press(event[1])
+        elif kind == 'release':
+            if event[1] == 'shift':
+                self._shift_down = False
+        elif kind == 'key':
+            _, vk_code, scancode, flags = event
+            key_name = SCAN_CODES.get(scancode) if flags & KEYEVENTF_SCANCODE else VIRTUAL_KEYS.get(vk_code)
+            if key_name is None:
+                return
+            if flags & KEYEVENTF_KEYUP:
+                if key_name == 'shift':
+                    self._shift_down = False
+                return
+            self.metrics['keystrokes'] += 1
+            self.press(key_name)
+        elif kind == 'layout':
+            if event[1] != self.layout:
+                self.metrics['layout_switches'] += 1
+            self.layout = event[1]
+
+    # ---- 按键 ----
+
+    def press(self, key_name: str):
+        if key_name == 'shift':
+            self._shift_down = True
+            return
+        if self._shift_down and key_name != 'home':
+            self.metrics['shift_held_keys'] += 1
+        if key_name in ('enter', 'tab', 'space') and self.config.ime_intercepts_keys and self.ime_active:
+            self.metrics['ime_intercepted'] += 1
+            return
+        if key_name == 'enter':
+            self.enter()
+        elif key_name == 'tab':
+            self.tab()
+        elif key_name == 'space':
+            self.type_character(' ')
+        elif key_name == 'esc':
+            self._popup_open = False
+        elif key_name == 'home':
+            self.home(select=self._shift_down)
+        elif key_name == 'delete':
+            self.delete()
+
+    def type_character(self, character: str):
+        if character == '\n':
+            self.enter()
+            return
+        if character == '\t':
+            self.tab()
+            return
+        self._delete_selection()
+        config = self.config
+        if self._auto_closers and self._right and self._right[-1] == character:
+            # 输入自动补全过的右括号/引号时跳过已有字符
+            self._left.append(self._right.pop())
+            self._auto_closers -= 1
+            self.metrics['overtyped'] += 1
+        elif character in config.auto_close and self._can_auto_close(character):
+            self._left.append(character)
+            self._right.append(config.auto_close[character])
+            self._auto_closers += 1
+            self.metrics['auto_inserted'] += 1
+        else:
+            self._left.append(character)
+        self._update_completion(character)
+
+    def enter(self):
+        if self._accept_completion():
+            return
+        self._delete_selection()
+        indent = ''
+        extra = ''
+        if self.config.auto_indent:
+            line = self._current_line_before_cursor()
+            indent = line[:len(line) - len(line.lstrip(' \t'))]
+            stripped = line.rstrip()
+            if stripped and stripped[-1] in self.config.indent_after:
+                extra = self.config.indent_unit
+        between_brackets = (self._auto_closers and self._left and self._right
+                            and BRACKET_PAIRS.get(self._left[-1]) == self._right[-1])
+        self._left.append('\n')
+        self._left.extend(indent + extra)
+        if between_brackets:
+            # 在一对括号中间回车：右括号移到下一行，与上一行对齐
+            self._right.extend(reversed('\n' + indent))
+        self._auto_closers = 0
+        self._reset_completion()
+
+    def tab(self):
+        if self._accept_completion():
+            return
+        self._delete_selection()
+        self._left.extend(self.config.tab_text)
+        self._reset_completion()
+
+    def home(self, select: bool = False):
+        """把光标移到行首（smart 模式下先到首个非空白字符），select 时选中经过的字符"""
+        line = self._current_line_before_cursor()
+        target = 0
+        if self.config.home_mode == 'smart':
+            rest = self._current_line_after_cursor()
+            full_line = line + rest
+            first_non_blank = len(full_line) - len(full_line.lstrip(' \t'))
+            if len(line) != first_non_blank:
+                target = first_non_blank
+        moved = len(line) - target
+        if moved > 0:
+            for _ in range(moved):
+                self._right.append(self._left.pop())
+        elif moved < 0:
+            for _ in range(-moved):
+                self._left.append(self._right.pop())
+        self._selection = max(0, moved) if select else 0
+        self._auto_closers = 0
+        self._reset_completion()
+
+    def delete(self):
+        if self._selection:
+            self._delete_selection()
+        elif self._right:
+            self._right.pop()
+        self._auto_closers = 0
+        self._reset_completion()
+
+    # ---- 内部状态 ----
+
+    def _delete_selection(self):
+        if self._selection:
+            del self._right[len(self._right) - self._selection:]
+            self._selection = 0
+            self.metrics['selection_deletes'] += 1
+
+    def _can_auto_close(self, character: str) -> bool:
+        """仿照常见编辑器：右侧为行尾、空白或右括号时才补全；引号前不能紧跟单词字符"""
+        following = self._right[-1] if self._right else ''
+        if following and not (following.isspace() or following in ')]}'):
+            return False
+        if character in QUOTE_PAIRS:
+            previous = self._left[-1] if self._left else ''
+            return not (previous and _is_word_character(previous))
+        return True
+
+    def _update_completion(self, character: str):
+        if not self.config.completion_popup:
+            return
+        if _is_word_character(character):
+            self._word_length += 1
+            if self._word_length >= self.config.completion_min_chars:
+                self._popup_open = True
+        else:
+            self._reset_completion()
+
+    def _reset_completion(self):
+        self._word_length = 0
+        self._popup_open = False
+
+    def _accept_completion(self) -> bool:
+        """补全列表打开时回车/Tab 被用来接受补全（假定补全项就是已输入的单词）"""
+        if not self._popup_open:
+            return False
+        self.metrics['completion_accepts'] += 1
+        self._reset_completion()
+        return True
+
+    def _current_line_before_cursor(self) -> str:
+        characters = []
+        for character in reversed(self._left):
+            if character == '\n':
+                break
+            characters.append(character)
+        return ''.join(reversed(characters))
+
+    def _current_line_after_cursor(self) -> str:
+        characters = []
+        for character in reversed(self._right):
+            if character == '\n':
+                break
+            characters.append(character)
+        return ''.join(characters)
+
+
+# 打字引擎的输入模式：(IDE模式, 自动切换输入法)
+ENGINE_MODES: Dict[str, Tuple[bool, bool]] = {
+    'normal': (False, False),
+    'normal_switch': (False, True),
+    'ide': (True, False),
+    'ide_switch': (True, True),
+}
+
+
+class CountingKeySink(RecordingKeySink):
+    """只按事件类型计数、不保存事件的记录输出端，大语料下内存不随输入增长"""
+
+    def __init__(self, process_name: str = 'recording'):
+        super().__init__(process_name=process_name)
+        self.counts = Counter()
+
+    def type_character(self, character: str):
+        self.counts['type'] += 1
+
+    def press_key(self, key_name: str):
+        self.counts['press'] += 1
+
+    def release_key(self, key_name: str):
+        self.counts['release'] += 1
+
+    def keybd_event(self, vk_code: int, scancode: int, flags: int):
+        self.counts['key'] += 1
+
+    def activate_keyboard_layout(self, layout_handle: int):
+        self.active_layout = layout_handle
+        self.counts['layout'] += 1
+
+
+@contextmanager
+def engine_harness(sink: Optional[RecordingKeySink] = None, clock=None) -> Iterator[Tuple[RecordingKeySink, object]]:
+    """
+    临时把后端的按键输出端与时钟换成 sink（默认新的记录输出端）和 clock（默认新的虚拟时钟）并清除停止事件，
+    产出 (输出端, 时钟)；退出时恢复原来的输出端与时钟，并清除块内设置的停止事件
+    """
+    backend = importlib.import_module('backend')
+    sink = RecordingKeySink() if sink is None else sink
+    clock = VirtualClock() if clock is None else clock
+    previous_sink, previous_clock = backend.key_sink, backend.clock
+    backend.set_key_sink(sink)
+    backend.set_clock(clock)
+    backend.stop_event.clear()
+    try:
+        yield sink, clock
+    finally:
+        backend.set_key_sink(previous_sink)
+        backend.set_clock(previous_clock)
+        backend.stop_event.clear()
+
+
+class EngineTypist:
+    """
+    以 simulate_typing_func 的形式运行后端真实的 execute_typing：
+    按键写入记录输出端，再由编辑器模拟器还原目标窗口中的文本；last_metrics 为最近一次的按键开销，
+    其中 simulated_seconds 与 chars_per_second 按虚拟时钟计算，即真实环境中该任务的耗时与速度
+    """
+
+    def __init__(self, editor='vscode', mode: str = 'normal', speed_cps: int = 1000, send_enter: bool = False):
+        if mode not in ENGINE_MODES:
+            raise ValueError(f"未知的输入模式: {mode}，可选: {', '.join(ENGINE_MODES)}")
+        self.config = get_editor_config(editor)
+        self.mode = mode
+        self.ide_mode, self.auto_switch = ENGINE_MODES[mode]
+        self.speed_cps = speed_cps
+        self.send_enter = send_enter
+        self.last_metrics: Optional[Dict[str, float]] = None
+        self.last_clock: Optional[VirtualClock] = None
+        self.backend = importlib.import_module('backend')
+
+    def __call__(self, text: str, **kwargs) -> str:
+        backend = self.backend
+        with engine_harness() as (sink, clock):
+            start = time.perf_counter()
+            backend.execute_typing(text, self.speed_cps, 0, 0, self.send_enter, self.auto_switch, self.ide_mode)
+            elapsed = time.perf_counter() - start
+        self.last_clock = clock
+        if backend.status['current_status'] != 'COMPLETED':
+            raise RuntimeError(f"打字引擎未正常完成: {backend.status['current_status']}")
+
+        emulator = EditorEmulator(self.config, layout=RecordingKeySink.LAYOUTS[0])
+        output = emulator.replay(sink.events)
+        characters = max(1, len(text))
+        self.last_metrics = dict(emulator.metrics)
+        self.last_metrics.update({
+            'events': len(sink.events),
+            'keystrokes_per_char': emulator.metrics['keystrokes'] / characters,
+            'engine_seconds': elapsed,
+            'simulated_seconds': clock.now(),
+            'chars_per_second': len(text) / clock.now() if clock.now() > 0 else 0.0,
+        })
+        return output
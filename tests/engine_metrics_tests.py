@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打字引擎分阶段指标测试脚本
+检查分桶直方图的分位数精度、每个任务的阶段计数与重置，以及 /api/metrics 的 JSON 和 Prometheus 输出
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from editor_emulator import engine_harness
+from engine_metrics import PhaseHistogram
+from test_framework import CheckTally
+
+
+def run_job(text: str, speed_cps: int = 50, countdown: int = 0, send_enter: bool = False, auto_switch: bool = False,
+            ide_mode: bool = False):
+    with engine_harness():
+        backend.execute_typing(text, speed_cps, countdown, 0, send_enter, auto_switch, ide_mode)
+
+
+class EngineMetricsTests(CheckTally):
+    """打字引擎分阶段指标测试类"""
+
+    def run_histogram_tests(self):
+        """分桶分位数与精确分位数的相对误差不超过一个桶宽"""
+        print("=" * 60)
+        print("运行直方图测试")
+        print("=" * 60)
+
+        generator = random.Random(42)
+        samples = [generator.lognormvariate(-6, 1) for _ in range(20000)]
+        histogram = PhaseHistogram()
+        for sample in samples:
+            histogram.record(sample)
+        ordered = sorted(samples)
+        for quantile in (0.5, 0.95, 0.99):
+            exact = ordered[int(quantile * len(ordered)) - 1]
+            estimate = histogram.percentile(quantile)
+            self.check(f"p{int(quantile * 100)} 误差", abs(estimate - exact) / exact < 0.2,
+                       f"{estimate:.6f} vs {exact:.6f}")
+        self.check("计数与累计耗时", histogram.count == 20000 and abs(histogram.total - sum(samples)) < 1e-9)
+
+        extremes = PhaseHistogram()
+        extremes.record(0.0)
+        extremes.record(1e6)
+        self.check("超出范围的值落入首尾桶", extremes.buckets[0] == 1 and extremes.buckets[-1] == 1)
+        self.check("分位数不超过最大值", extremes.percentile(0.99) == 1e6)
+
+        start = time.perf_counter()
+        for _ in range(100000):
+            histogram.record(0.0002)
+        per_record = (time.perf_counter() - start) / 100000
+        self.check("记录开销低", per_record < 5e-6, f"{per_record * 1e9:.0f}ns")
+
+    def run_phase_tests(self):
+        """各阶段的调用次数与任务内容对应，新任务开始时重置"""
+        print("=" * 60)
+        print("运行阶段统计测试")
+        print("=" * 60)
+
+        run_job("ab cd", countdown=2, send_enter=True)
+        phases = backend.engine_metrics.snapshot()['phases']
+        self.check("倒计时每秒一次", phases['countdown']['count'] == 2 and phases['countdown']['total_seconds'] == 2.0)
+        self.check("普通字符走 Unicode 发送", phases['unicode_send']['count'] == 4)
+        self.check("空格与结尾回车走 tap_key", phases['tap_key']['count'] == 2)
+        self.check("每个字符后一次等待", phases['inter_key_sleep']['count'] == 5)
+        self.check("等待符合速度", abs(phases['inter_key_sleep']['p50_seconds'] - 0.02) < 0.004,
+                   str(phases['inter_key_sleep']['p50_seconds']))
+
+        run_job("x\n  y\nz你", ide_mode=True, auto_switch=True)
+        snapshot = backend.engine_metrics.snapshot()
+        phases = snapshot['phases']
+        self.check("新任务重置倒计时", 'countdown' not in phases)
+        self.check("每次换行清除自动缩进", phases['clear_auto_indent']['count'] == 2)
+        self.check("换行阶段", phases['line_break']['count'] == 2)
+        self.check("扫描码发送", phases['scan_key']['count'] >= 2 * 4 + 2)
+        # 目标窗口原本是英文布局，只有“你”需要切换（结束后的恢复不经过 ensure_input_layout）
+        self.check("输入法切换", phases['ensure_input_layout']['count'] == 1)
+        job = snapshot['job']
+        self.check("任务信息", job['ide_mode'] is True and job['outcome'] == 'COMPLETED'
+                   and job['typed_characters'] == 8 and job['duration_seconds'] > 0, str(job))
+
+    def run_endpoint_tests(self):
+        """/api/metrics 返回 JSON，format=prometheus 返回 summary 文本"""
+        print("=" * 60)
+        print("运行接口测试")
+        print("=" * 60)
+
+        run_job("hello world")
+        client = backend.app.test_client()
+        response = client.get('/api/metrics')
+        self.check("JSON 格式", response.status_code == 200 and 'unicode_send' in response.get_json()['phases'])
+
+        response = client.get('/api/metrics?format=prometheus')
+        body = response.get_data(as_text=True)
+        self.check("Prometheus 内容类型", response.mimetype == 'text/plain')
+        self.check("summary 类型声明", '# TYPE keyboard_typer_phase_seconds summary' in body)
+        self.check("分位数样本", 'keyboard_typer_phase_seconds{phase="unicode_send",quantile="0.99"}' in body)
+        self.check("次数样本", 'keyboard_typer_phase_seconds_count{phase="inter_key_sleep"} 11' in body)
+        self.check("任务 gauge", 'keyboard_typer_job_typed_characters 11' in body)
+        self.check("非数值字段不输出", 'outcome' not in body and 'ide_mode' not in body)
+
+    def run_all_tests(self) -> bool:
+        self.run_histogram_tests()
+        self.run_phase_tests()
+        self.run_endpoint_tests()
+        print("=" * 60)
+        return self.finish("指标测试")
+
+
+def main():
+    tests = EngineMetricsTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量故障注入器
+一次性为整段文本抽取出错位置（按几何分布跳跃抽样，耗时与错误数成正比而不是与文本长度成正比），
+再用切片拼接生成带错误的文本，同时返回每个错误的真实标注，用于评估比较引擎的分类准确率。
+
+错误类别沿用测试脚本中的分类：
+- 字符：缺字 / 多字 / 错字
+- 换行：缺少换行、错误的换行符类型、多余换行、\\r\\n 拆开 / 颠倒 / 缺一半
+- 缩进：数量错误、类型错误（空格与Tab互换）、缺少缩进、多余缩进
+- 空格：单词间空格缺失 / 多余 / 变成Tab
+"""
+
+import math
+import random
+import re
+import string
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from test_framework import DifferenceType
+
+# 标注中的错误子类型，数组中保存其下标
+FAULT_KINDS: List[Tuple[DifferenceType, str]] = [
+    (DifferenceType.MISSING_CHAR, 'missing'),
+    (DifferenceType.EXTRA_CHAR, 'extra'),
+    (DifferenceType.WRONG_CHAR, 'wrong'),
+    (DifferenceType.NEWLINE_ERROR, 'missing'),
+    (DifferenceType.NEWLINE_ERROR, 'wrong_type'),
+    (DifferenceType.NEWLINE_ERROR, 'extra'),
+    (DifferenceType.NEWLINE_ERROR, 'split'),
+    (DifferenceType.NEWLINE_ERROR, 'wrong_order'),
+    (DifferenceType.NEWLINE_ERROR, 'missing_part'),
+    (DifferenceType.INDENTATION_ERROR, 'wrong_count'),
+    (DifferenceType.INDENTATION_ERROR, 'wrong_type'),
+    (DifferenceType.INDENTATION_ERROR, 'missing'),
+    (DifferenceType.INDENTATION_ERROR, 'extra'),
+    (DifferenceType.WHITESPACE_ERROR, 'missing'),
+    (DifferenceType.WHITESPACE_ERROR, 'extra'),
+    (DifferenceType.WHITESPACE_ERROR, 'wrong_char'),
+]
+_KIND_CODES = {kind: code for code, kind in enumerate(FAULT_KINDS)}
+
+_LINE_BREAK_PATTERN = re.compile(r'\r\n|\n')
+_INDENT_PATTERN = re.compile(r'^[ \t]+', re.MULTILINE)
+_PUNCTUATION = '!@#$%^&*()'
+
+
+class InjectedFault(NamedTuple):
+    """一个注入的错误：期望文本中的 [expected_start, expected_end) 在实际文本中变为 [actual_start, actual_end)"""
+    type: DifferenceType
+    kind: str
+    expected_start: int
+    expected_end: int
+    actual_start: int
+    actual_end: int
+
+
+class FaultLabels:
+    """按列存放的错误标注（array 模块的紧凑数组），迭代时才生成 InjectedFault"""
+
+    __slots__ = ('codes', 'expected_starts', 'expected_ends', 'actual_starts', 'actual_ends')
+
+    def __init__(self):
+        self.codes = array('B')
+        self.expected_starts = array('q')
+        self.expected_ends = array('q')
+        self.actual_starts = array('q')
+        self.actual_ends = array('q')
+
+    def append(self, code: int, expected_start: int, expected_end: int, actual_start: int, actual_end: int):
+        self.codes.append(code)
+        self.expected_starts.append(expected_start)
+        self.expected_ends.append(expected_end)
+        self.actual_starts.append(actual_start)
+        self.actual_ends.append(actual_end)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[InjectedFault]:
+        for code, e1, e2, a1, a2 in zip(self.codes, self.expected_starts, self.expected_ends,
+                                        self.actual_starts, self.actual_ends):
+            diff_type, kind = FAULT_KINDS[code]
+            yield InjectedFault(diff_type, kind, e1, e2, a1, a2)
+
+    def to_expected(self, actual_position: int) -> int:
+        """把实际文本中的位置换算为期望文本中的对应位置（落在错误内部时取该错误的期望起点）"""
+        index = bisect_right(self.actual_starts, actual_position) - 1
+        if index < 0:
+            return actual_position
+        if actual_position < self.actual_ends[index]:
+            return self.expected_starts[index]
+        return actual_position - self.actual_ends[index] + self.expected_ends[index]
+
+    def counts(self) -> Dict[DifferenceType, int]:
+        """按差异类型统计错误数量"""
+        result: Dict[DifferenceType, int] = {}
+        for code in self.codes:
+            diff_type = FAULT_KINDS[code][0]
+            result[diff_type] = result.get(diff_type, 0) + 1
+        return result
+
+
+class InjectionResult(NamedTuple):
+    text: str
+    labels: FaultLabels
+
+
+class FaultInjector:
+    """带种子的批量故障注入器；相同种子、相同文本和错误率总是得到相同结果"""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+
+    def inject(self, text: str, char_rate: float = 0.0, newline_rate: float = 0.0,
+               indent_rate: float = 0.0, space_rate: float = 0.0) -> InjectionResult:
+        """
+        按各类错误率向文本注入错误
+        char_rate: 每个字符（换行符除外）发生缺字/多字/错字的概率
+        newline_rate: 每个换行（\\n 或 \\r\\n）出错的概率
+        indent_rate: 每个有缩进的行缩进出错的概率
+        space_rate: 每个行内空格出错的概率
+        """
+        # (期望文本起点, 终点, 替换文本, 子类型编号)
+        edits: List[Tuple[int, int, str, int]] = []
+        if char_rate > 0:
+            edits.extend(self._character_edits(text, char_rate))
+        if newline_rate > 0:
+            edits.extend(self._newline_edits(text, newline_rate))
+        if indent_rate > 0:
+            edits.extend(self._indent_edits(text, indent_rate))
+        if space_rate > 0:
+            edits.extend(self._space_edits(text, space_rate))
+        return self._apply(text, edits)
+
+    def _sample(self, count: int, rate: float) -> List[int]:
+        """从 range(count) 中以概率 rate 独立抽取下标：按几何分布跳过未出错的位置"""
+        if rate <= 0 or count <= 0:
+            return []
+        if rate >= 1:
+            return list(range(count))
+        log_keep = math.log(1.0 - rate)
+        random_value = self.rng.random
+        indices = []
+        index = -1
+        while True:
+            index += 1 + int(math.log(1.0 - random_value()) / log_keep)
+            if index >= count:
+                return indices
+            indices.append(index)
+
+    def _replacement_pool(self, char: str) -> str:
+        if char.isalpha():
+            return string.ascii_letters
+        if char.isdigit():
+            return string.digits
+        return _PUNCTUATION
+
+    def _character_edits(self, text: str, rate: float):
+        positions = [p for p in self._sample(len(text), rate) if text[p] not in '\r\n']
+        kinds = self.rng.choices((0, 1, 2), k=len(positions))
+        random_value = self.rng.random
+        pools: Dict[str, str] = {}
+        missing_code = _KIND_CODES[(DifferenceType.MISSING_CHAR, 'missing')]
+        extra_code = _KIND_CODES[(DifferenceType.EXTRA_CHAR, 'extra')]
+        wrong_code = _KIND_CODES[(DifferenceType.WRONG_CHAR, 'wrong')]
+        edits = []
+        for position, kind in zip(positions, kinds):
+            if kind == 0:
+                edits.append((position, position + 1, '', missing_code))
+                continue
+            char = text[position]
+            pool = pools.get(char)
+            if pool is None:
+                pool = pools[char] = self._replacement_pool(char)
+            replacement = pool[int(random_value() * len(pool))]
+            if kind == 1:
+                # 多字：在当前字符前多输入一个同类字符
+                edits.append((position, position, replacement, extra_code))
+            else:
+                if char == ' ':
+                    replacement = '\t' if random_value() < 0.5 else '  '
+                elif replacement == char:
+                    replacement = pool[(pool.index(replacement) + 1) % len(pool)]
+                edits.append((position, position + 1, replacement, wrong_code))
+        return edits
+
+    def _newline_edits(self, text: str, rate: float):
+        breaks = [(m.start(), m.end()) for m in _LINE_BREAK_PATTERN.finditer(text)]
+        choice = self.rng.choice
+        for index in self._sample(len(breaks), rate):
+            start, end = breaks[index]
+            if end - start == 1:
+                kind = choice(('missing', 'wrong_type', 'extra'))
+                replacement = {'missing': ' ', 'extra': '\n\n'}.get(kind) or choice(['\r\n', '\r', '\n\n'])
+            else:
+                kind = choice(('split', 'wrong_order', 'missing_part'))
+                replacement = {'split': '\r \n', 'wrong_order': '\n\r'}.get(kind) or choice(['\r', '\n'])
+            yield start, end, replacement, _KIND_CODES[(DifferenceType.NEWLINE_ERROR, kind)]
+
+    def _indent_edits(self, text: str, rate: float):
+        indents = [(m.start(), m.end()) for m in _INDENT_PATTERN.finditer(text)]
+        choice = self.rng.choice
+        for index in self._sample(len(indents), rate):
+            start, end = indents[index]
+            indent = text[start:end]
+            kind = choice(('wrong_count', 'wrong_type', 'missing', 'extra'))
+            if kind == 'wrong_count':
+                unit = indent[0]
+                delta = choice((-2, -1, 1, 2, 3) if unit == ' ' else (-1, 1, 2))
+                replacement = unit * max(0, len(indent) + delta)
+            elif kind == 'wrong_type':
+                replacement = '\t' * max(1, len(indent) // 4) if indent[0] == ' ' else ' ' * (len(indent) * 4)
+            elif kind == 'missing':
+                replacement = ''
+            else:
+                replacement = indent + choice(['  ', '\t', '    '])
+            if replacement != indent:
+                yield start, end, replacement, _KIND_CODES[(DifferenceType.INDENTATION_ERROR, kind)]
+
+    def _space_edits(self, text: str, rate: float):
+        for position in self._sample(len(text), rate):
+            if text[position] != ' ':
+                continue
+            # 只处理行内空格，行首缩进由缩进错误负责
+            before = position - 1
+            while before >= 0 and text[before] in ' \t':
+                before -= 1
+            if before < 0 or text[before] in '\r\n':
+                continue
+            kind = self.rng.choice(('missing', 'extra', 'wrong_char'))
+            replacement = {'missing': '', 'extra': '  ', 'wrong_char': '\t'}[kind]
+            yield position, position + 1, replacement, _KIND_CODES[(DifferenceType.WHITESPACE_ERROR, kind)]
+
+    def _apply(self, text: str, edits: List[Tuple[int, int, str, int]]) -> InjectionResult:
+        """按位置应用互不重叠的修改（与前一个修改重叠的丢弃），拼接出实际文本并记录标注"""
+        edits.sort()
+        codes = []
+        expected_starts = []
+        expected_ends = []
+        actual_starts = []
+        actual_ends = []
+        pieces = []
+        cursor = -1
+        actual_length = 0
+        for start, end, replacement, code in edits:
+            # 与前一个修改重叠或相接时丢弃，避免两个错误粘连成一处
+            if start <= cursor:
+                continue
+            if cursor < 0:
+                cursor = 0
+            pieces.append(text[cursor:start])
+            pieces.append(replacement)
+            actual_length += start - cursor
+            codes.append(code)
+            expected_starts.append(start)
+            expected_ends.append(end)
+            actual_starts.append(actual_length)
+            actual_length += len(replacement)
+            actual_ends.append(actual_length)
+            cursor = end
+        pieces.append(text[max(cursor, 0):])
+
+        labels = FaultLabels()
+        labels.codes = array('B', codes)
+        labels.expected_starts = array('q', expected_starts)
+        labels.expected_ends = array('q', expected_ends)
+        labels.actual_starts = array('q', actual_starts)
+        labels.actual_ends = array('q', actual_ends)
+        return InjectionResult(''.join(pieces), labels)
@@ -17,14 +17,25 @@ from typing import List, Dict, Tuple, Optional
 sys.path.append(str(Path(__file__).parent))
 sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
 
-from test_framework import KeyboardTyperTestFramework, TestResult
+from test_framework import KeyboardTyperTestFramework, TestResult, run_test_group
+from fault_injector import FaultInjector
 
 
 class IndentationTests:
     """空格缩进测试类"""
     
-    def __init__(self):
-        self.framework = KeyboardTyperTestFramework()
+    # run_all_tests 依次执行的用例组；并行运行时以组为单位分配到各工作进程
+    TEST_GROUPS = [
+        'run_basic_indentation_tests',
+        'run_code_indentation_tests',
+        'run_special_space_tests',
+        'run_indentation_consistency_check',
+        'run_error_simulation_tests'
+    ]
+    
+    def __init__(self, keep_results: bool = True):
+        """keep_results 为 False 时结果只写入附加的 JSONL 报告，不在内存中保留（主测试运行器使用）"""
+        self.framework = KeyboardTyperTestFramework(keep_results=keep_results)
         self.test_cases = []
         self._prepare_test_cases()
     
@@ -172,77 +183,8 @@ class IndentationTests:
         if error_rate == 0.0:
             return text  # 无错误，直接返回原文本
         
-        lines = text.split('\n')
-        result_lines = []
-        
-        for line in lines:
-            if random.random() < error_rate and (line.startswith(' ') or line.startswith('\t')):
-                # 对有缩进的行进行错误模拟
-                content = line.lstrip()
-                original_indent = line[:len(line) - len(content)]
-                
-                error_type = random.choice(['wrong_count', 'wrong_type', 'missing', 'extra'])
-                
-                if error_type == 'wrong_count':
-                    # 错误的缩进数量
-                    if original_indent.startswith(' '):
-                        # 空格缩进，随机改变数量
-                        space_count = len(original_indent)
-                        new_count = max(0, space_count + random.randint(-2, 3))
-                        new_indent = ' ' * new_count
-                    else:
-                        # Tab缩进，随机改变数量
-                        tab_count = len(original_indent)
-                        new_count = max(0, tab_count + random.randint(-1, 2))
-                        new_indent = '\t' * new_count
-                    result_lines.append(new_indent + content)
-                
-                elif error_type == 'wrong_type':
-                    # 错误的缩进类型（空格变Tab或Tab变空格）
-                    if original_indent.startswith(' '):
-                        # 空格变Tab
-                        space_count = len(original_indent)
-                        tab_count = max(1, space_count // 4)
-                        new_indent = '\t' * tab_count
-                    else:
-                        # Tab变空格
-                        tab_count = len(original_indent)
-                        space_count = tab_count * 4
-                        new_indent = ' ' * space_count
-                    result_lines.append(new_indent + content)
-                
-                elif error_type == 'missing':
-                    # 缺少缩进
-                    result_lines.append(content)
-                
-                elif error_type == 'extra':
-                    # 额外的缩进
-                    extra_indent = random.choice(['  ', '\t', '    '])
-                    result_lines.append(original_indent + extra_indent + content)
-            
-            else:
-                # 对普通空格进行错误模拟
-                if ' ' in line and random.random() < error_rate * 0.5:
-                    # 随机改变单词间的空格
-                    words = line.split(' ')
-                    new_line_parts = []
-                    for i, word in enumerate(words):
-                        new_line_parts.append(word)
-                        if i < len(words) - 1:  # 不是最后一个单词
-                            space_error = random.choice(['missing', 'extra', 'wrong_char'])
-                            if space_error == 'missing':
-                                pass  # 不添加空格
-                            elif space_error == 'extra':
-                                new_line_parts.append('  ')  # 双空格
-                            elif space_error == 'wrong_char':
-                                new_line_parts.append('\t')  # 用Tab替代空格
-                            else:
-                                new_line_parts.append(' ')  # 正常空格
-                    result_lines.append(''.join(new_line_parts))
-                else:
-                    result_lines.append(line)
-        
-        return '\n'.join(result_lines)
+        # 批量注入错误，种子取自 random 模块，随用例组种子复现
+        return FaultInjector(random.getrandbits(32)).inject(text, indent_rate=error_rate, space_rate=error_rate * 0.5).text
     
     def analyze_indentation_pattern(self, text: str) -> Dict[str, any]:
         """分析文本的缩进模式"""
@@ -453,8 +395,8 @@ class IndentationTests:
             print(f"结果: {status}")
             print()
     
-    def run_all_tests(self):
-        """运行所有缩进测试"""
+    def run_all_tests(self, seed: Optional[int] = None):
+        """运行所有缩进测试（seed 为 None 时不固定随机数种子）"""
         print("开始空格缩进检测测试")
         print("测试目标：检测输入与输出在空格和缩进方面的正确性")
         print()
@@ -462,33 +404,33 @@ class IndentationTests:
         start_time = time.time()
         
         # 运行各类测试
-        self.run_basic_indentation_tests()
-        self.run_code_indentation_tests()
-        self.run_special_space_tests()
-        self.run_indentation_consistency_check()
-        self.run_error_simulation_tests()
+        for group in self.TEST_GROUPS:
+            run_test_group(self, group, seed)
         
         # 生成报告
         total_time = time.time() - start_time
         print("=" * 60)
         print("测试完成，生成报告...")
         print(f"总执行时间: {total_time:.3f}秒")
+        self.save_reports()
         
+        return self.framework.test_results
+    
+    def save_reports(self):
+        """将测试框架中的结果保存为文本和JSON报告"""
         # 创建带日期的报告文件夹
         dated_folder = self.framework.create_dated_report_folder()
         
         # 保存详细报告
         report_file = dated_folder / "indentation_test_report.txt"
-        report_content = self.framework.generate_report(str(report_file))
+        self.framework.generate_report(str(report_file))
         
         # 保存JSON报告
-        json_report_file = dated_folder / "indentation_test_report.json"
+        json_report_file = dated_folder / "indentation_test_report.jsonl"
         self.framework.export_json_report(str(json_report_file))
         
         print(f"详细报告已保存到: {report_file}")
         print(f"JSON报告已保存到: {json_report_file}")
-        
-        return self.framework.test_results
 
 
 def main():
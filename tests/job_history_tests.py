@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务历史测试脚本
+检查每个结束的任务（完成、中断）追加到 SQLite 任务历史的参数、文本哈希、切换次数、达到速度和各阶段耗时，
+/api/history 按目标程序与输入模式的汇总，写入失败时任务照常收尾，以及未设置历史库时不记录
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from editor_emulator import engine_harness
+from job_history import JobHistory
+from key_sinks import RecordingKeySink
+from text_store import compute_text_digest
+from test_framework import CheckTally
+
+
+def run_job(text: str, speed_cps: int = 100, auto_switch: bool = False, ide_mode: bool = False,
+            target_app: str = 'notepad.exe', stop_at: float = None):
+    """在记录输出端和虚拟时钟上运行一次任务，stop_at 为设置停止事件的模拟时刻"""
+    with engine_harness(RecordingKeySink(process_name=target_app)) as (_, clock):
+        if stop_at is not None:
+            clock.call_at(stop_at, backend.stop_event.set)
+        backend.execute_typing(text, speed_cps, 1, 0, False, auto_switch, ide_mode)
+
+
+class JobHistoryTests(CheckTally):
+    """任务历史测试类"""
+
+    def run_recording_tests(self):
+        """完成与中断的任务都被记录，字段与任务一致"""
+        print("=" * 60)
+        print("运行任务记录测试")
+        print("=" * 60)
+
+        text = "hello 世界 world 你好"
+        run_job(text, speed_cps=50, auto_switch=True, target_app='code.exe')
+        job = backend.job_history.recent(1)[0]
+        self.check("结果", job['outcome'] == 'COMPLETED', job['outcome'])
+        self.check("参数", (job['speed_cps'], job['countdown'], job['auto_switch'], job['ide_mode'], job['mode'])
+                   == (50, 1, True, False, 'normal_switch'), str(job))
+        self.check("目标程序与输出端", job['target_app'] == 'code.exe' and job['sink'] == 'recording')
+        self.check("文本哈希与长度", job['text_hash'] == compute_text_digest(text) and job['text_length'] == len(text))
+        self.check("输入法切换次数", job['switch_count'] == 3, str(job['switch_count']))
+        self.check("达到速度", job['achieved_cps'] == job['typed_characters'] / job['typing_seconds'], str(job))
+        self.check("切换输入法的等待使速度低于设定", 30 < job['achieved_cps'] < 50, str(job['achieved_cps']))
+        self.check("各阶段耗时", job['countdown_seconds'] == 1.0 and job['typing_seconds'] > 0
+                   and job['total_seconds'] >= job['countdown_seconds'] + job['typing_seconds'], str(job))
+        self.check("分阶段明细", 'inter_key_sleep' in job['phases'] and 'unicode_send' in job['phases'])
+
+        run_job("x" * 200, speed_cps=20, stop_at=3.0)
+        job = backend.job_history.recent(1)[0]
+        self.check("中断的任务", job['outcome'] == 'ABORTED' and 0 < job['typed_characters'] < 200, str(job)[:200])
+
+        run_job("abc", stop_at=0.5)
+        job = backend.job_history.recent(1)[0]
+        self.check("倒计时中中断没有速度", job['typed_characters'] == 0 and job['achieved_cps'] is None
+                   and job['typing_seconds'] is None)
+        self.check("倒计时中中断记为中止", job['outcome'] == 'ABORTED'
+                   and backend.engine_metrics.snapshot()['job']['outcome'] == 'ABORTED', job['outcome'])
+        outcomes = {group['outcome'] for group in backend.job_history.aggregate('outcome', outcome=None)}
+        self.check("结果中没有倒计时状态", outcomes == {'COMPLETED', 'ABORTED'}, str(outcomes))
+
+    def run_aggregate_tests(self):
+        """/api/history 按目标程序、模式汇总中位数达到速度"""
+        print("=" * 60)
+        print("运行汇总测试")
+        print("=" * 60)
+
+        for speed in (40, 60, 80):
+            run_job("def f():\n    return 1\n", speed_cps=speed, ide_mode=True, target_app='pycharm64.exe')
+            run_job("plain text line", speed_cps=speed * 2, target_app='notepad.exe')
+
+        client = backend.app.test_client()
+        body = client.get('/api/history?group=target_app').get_json()
+        groups = {group['target_app']: group for group in body['groups']}
+        self.check("记录数", body['enabled'] and body['total_jobs'] == backend.job_history.count() == 9,
+                   str(body['total_jobs']))
+        self.check("只统计完成的任务", groups['notepad.exe']['jobs'] == 3 and groups['pycharm64.exe']['jobs'] == 3
+                   and groups['code.exe']['jobs'] == 1, str({key: group['jobs'] for key, group in groups.items()}))
+        notepad = groups['notepad.exe']
+        self.check("中位数达到速度", abs(notepad['median_achieved_cps'] - 120) < 10
+                   and notepad['median_target_cps'] == 120, str(notepad))
+        self.check("按中位数速度排序", body['groups'][0]['target_app'] == 'notepad.exe')
+        self.check("IDE 模式的换行等待使速度低于设定",
+                   groups['pycharm64.exe']['median_speed_ratio'] < notepad['median_speed_ratio'])
+
+        body = client.get('/api/history?group=mode&outcome=all&limit=2').get_json()
+        modes = {group['mode']: group for group in body['groups']}
+        self.check("按模式汇总", set(modes) == {'normal', 'normal_switch', 'ide'}
+                   and modes['normal']['jobs'] == 5 and modes['normal']['completed'] == 3, str(modes)[:200])
+        self.check("最近任务", len(body['recent']) == 2 and body['recent'][0]['target_app'] == 'notepad.exe')
+        self.check("拒绝未知分组", client.get('/api/history?group=text_length;DROP').status_code == 400)
+
+    def run_cleanup_tests(self):
+        """计算文本哈希或写入任务历史失败时任务照常收尾，界面不会停在输入中"""
+        print("=" * 60)
+        print("运行收尾测试")
+        print("=" * 60)
+
+        count = backend.job_history.count()
+        backend.status['is_typing'] = True
+        run_job("ab\ud83dcd")
+        job = backend.job_history.recent(1)[0]
+        self.check("含孤立代理项的文本照常记录", backend.job_history.count() == count + 1
+                   and job['text_hash'] == compute_text_digest("ab\ud83dcd") and not backend.status['is_typing'])
+
+        def fail(text):
+            raise UnicodeEncodeError('utf-8', text, 0, 1, "surrogates not allowed")
+
+        backend.compute_text_digest = fail
+        try:
+            backend.status['is_typing'] = True
+            backend.typing_thread = threading.current_thread()
+            run_job("abc")
+        finally:
+            backend.compute_text_digest = compute_text_digest
+        self.check("写入失败时仍重置状态", not backend.status['is_typing'] and backend.typing_thread is None
+                   and backend.status['current_status'] == 'COMPLETED', str(backend.status))
+        self.check("写入失败的任务不记录", backend.job_history.count() == count + 1)
+
+    def run_persistence_tests(self, path: Path):
+        """重新打开后保留记录；未设置历史库时不记录"""
+        print("=" * 60)
+        print("运行持久化测试")
+        print("=" * 60)
+
+        count = backend.job_history.count()
+        backend.set_job_history(None)
+        run_job("not recorded")
+        body = backend.app.test_client().get('/api/history').get_json()
+        self.check("未设置时不记录", not body['enabled'] and body['groups'] == [])
+        with JobHistory(path) as history:
+            self.check("重新打开后保留记录", history.count() == count, str(history.count()))
+
+    def run_all_tests(self) -> bool:
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / "history" / "jobs.sqlite3"
+            backend.set_job_history(path)
+            try:
+                self.run_recording_tests()
+                self.run_aggregate_tests()
+                self.run_cleanup_tests()
+                self.run_persistence_tests(path)
+            finally:
+                backend.set_job_history(None)
+        print("=" * 60)
+        return self.finish("任务历史测试")
+
+
+def main():
+    tests = JobHistoryTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
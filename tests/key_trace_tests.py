@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按键轨迹测试脚本
+检查轨迹文件的写入与 mmap 读取、截断与格式校验、按原速和缩放速度回放，
+并用 golden_traces 目录中的黄金轨迹确认打字计划的修改没有改变编辑器中的输出和按键数。
+打字计划有意改变时，运行 python key_trace_tests.py --update-golden 重新生成黄金轨迹
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from clocks import VirtualClock
+from editor_emulator import ENGINE_MODES, EditorEmulator, EngineTypist, engine_harness, get_editor_config
+from key_sinks import RecordingKeySink
+from key_trace import OP_DELAY, RECORD, TraceReader, TraceWriter, replay_trace
+from test_framework import CheckTally
+
+GOLDEN_DIRECTORY = Path(__file__).parent / "golden_traces"
+GOLDEN_SPEED_CPS = 1000
+
+# 黄金轨迹：名称 -> (编辑器, 输入模式, 文本)
+GOLDEN_CASES = {
+    'python_ide_vscode': ('vscode', 'ide', "def area(r):\n    if r < 0:\n        return 0\n    return 3.14 * r * r\n"),
+    'mixed_cjk_notepad': ('notepad', 'ide_switch', "Hello 世界, 你好 world!\n第二行: done."),
+    'braces_normal_notepad': ('notepad', 'normal', "int main() {\n\treturn 0;\n}"),
+}
+
+
+def run_job(text: str, speed_cps: int = 100, countdown: int = 0, auto_switch: bool = False, ide_mode: bool = False,
+            trace_directory=None):
+    """在记录输出端和虚拟时钟上运行一次任务，返回 (记录输出端, 虚拟时钟)"""
+    previous_directory = backend.trace_directory
+    backend.set_trace_directory(trace_directory)
+    try:
+        with engine_harness() as (sink, clock):
+            backend.execute_typing(text, speed_cps, countdown, 0, False, auto_switch, ide_mode)
+    finally:
+        backend.set_trace_directory(previous_directory)
+    return sink, clock
+
+
+def replay_into_emulator(path: Path, editor: str):
+    """把轨迹尽快回放到记录输出端，再由编辑器模拟器还原文本"""
+    sink = RecordingKeySink()
+    replay_trace(path, sink, VirtualClock(), speed=0)
+    emulator = EditorEmulator(get_editor_config(editor), layout=RecordingKeySink.LAYOUTS[0])
+    return emulator.replay(sink.events), emulator.metrics, sink.events
+
+
+def record_golden(name: str, directory: Path) -> Path:
+    editor, mode, text = GOLDEN_CASES[name]
+    ide_mode, auto_switch = ENGINE_MODES[mode]
+    with tempfile.TemporaryDirectory() as scratch:
+        run_job(text, GOLDEN_SPEED_CPS, auto_switch=auto_switch, ide_mode=ide_mode, trace_directory=scratch)
+        recorded = Path(backend.engine_metrics.snapshot()['job']['trace_path'])
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{name}.ktrace"
+        shutil.copyfile(recorded, target)
+    return target
+
+
+class KeyTraceTests(CheckTally):
+    """按键轨迹测试类"""
+
+    def run_format_tests(self, scratch: Path):
+        """记录定长、可随机访问；末尾不完整的记录被忽略，其他文件被拒绝"""
+        print("=" * 60)
+        print("运行轨迹格式测试")
+        print("=" * 60)
+
+        path = scratch / "format.ktrace"
+        with TraceWriter(path) as writer:
+            writer.record(0, 1, value=ord('你'))
+            writer.record(10, 5, value=-0xF3FFFFF)
+        with TraceWriter(path) as writer:
+            writer.record(20, 4, code=0, value=0x1C, flags=0x8)
+        with TraceReader(path) as reader:
+            self.check("追加写入", len(reader) == 3, str(len(reader)))
+            self.check("随机访问", reader[-1].timestamp_ns == 20 and reader[2].name == 'key')
+            self.check("字符码位", reader.events()[0] == ('type', '你'))
+            self.check("负的输入法句柄按 64 位保存", reader[1].value == -0xF3FFFFF & 0xFFFFFFFFFFFFFFFF)
+
+        with open(path, 'ab') as handle:
+            handle.write(b'\x00' * (RECORD.size // 2))
+        with TraceReader(path) as reader:
+            self.check("忽略截断的记录", len(reader) == 3)
+
+        bad = scratch / "bad.ktrace"
+        bad.write_bytes(b'NOTATRACE' * 10)
+        try:
+            TraceReader(bad)
+            self.check("拒绝非轨迹文件", False)
+        except ValueError:
+            self.check("拒绝非轨迹文件", True)
+
+    def run_recording_tests(self, scratch: Path):
+        """轨迹中的按键与记录输出端收到的完全一致，等待按标签记录"""
+        print("=" * 60)
+        print("运行轨迹记录测试")
+        print("=" * 60)
+
+        sink, clock = run_job("ab\n  c你", speed_cps=10, countdown=1, auto_switch=True, ide_mode=True,
+                              trace_directory=scratch / "jobs")
+        job = backend.engine_metrics.snapshot()['job']
+        self.check("任务信息中有轨迹路径", Path(job.get('trace_path', '')).exists(), str(job))
+        self.check("任务结束后恢复输出端与时钟", backend.key_sink is not sink and not hasattr(backend.clock, 'writer'))
+
+        with TraceReader(job['trace_path']) as reader:
+            self.check("事件与输出端一致", reader.events() == sink.events)
+            self.check("记录数", job['trace_records'] == len(reader))
+            delays = reader.delays()
+            labels = {label for _, _, label in delays}
+            self.check("等待标签", {'countdown', 'inter_key', 'layout_switch'} <= labels, str(labels))
+            self.check("倒计时等待 1 秒", delays[0][1:] == (1_000_000_000, 'countdown'), str(delays[0]))
+            self.check("时间戳单调", all(a.timestamp_ns <= b.timestamp_ns for a, b in zip(reader, list(reader)[1:])))
+            self.check("轨迹时长等于任务时长", abs(reader.duration_ns / 1e9 - clock.now()) < 1e-6,
+                       f"{reader.duration_ns / 1e9} vs {clock.now()}")
+
+        run_job("xyz", trace_directory=None)
+        self.check("未设置目录时不记录", 'trace_path' not in backend.engine_metrics.snapshot()['job'])
+
+    def run_replay_tests(self, scratch: Path):
+        """原速回放耗时等于轨迹时长，2 倍速减半，speed=0 不等待；中途停止"""
+        print("=" * 60)
+        print("运行回放测试")
+        print("=" * 60)
+
+        sink, _ = run_job("hello world", speed_cps=20, trace_directory=scratch / "replay")
+        path = Path(backend.engine_metrics.snapshot()['job']['trace_path'])
+        with TraceReader(path) as reader:
+            last_event_ns = max(record.timestamp_ns for record in reader if record.op != OP_DELAY)
+
+        for speed in (1.0, 2.0, 0):
+            target, clock = RecordingKeySink(), VirtualClock()
+            injected = replay_trace(path, target, clock, speed=speed)
+            expected = last_event_ns / 1e9 / speed if speed else 0.0
+            self.check(f"{speed} 倍速事件一致", injected == len(sink.events) and target.events == sink.events)
+            self.check(f"{speed} 倍速耗时", abs(clock.now() - expected) < 1e-6, f"{clock.now()} vs {expected}")
+
+        target, clock = RecordingKeySink(), VirtualClock()
+        stop = threading.Event()
+        clock.call_at(0.2, stop.set)
+        injected = replay_trace(path, target, clock, speed=1.0, stop_event=stop)
+        self.check("停止后不再注入", 0 < injected < len(sink.events), str(injected))
+
+    def run_golden_tests(self):
+        """当前引擎在模拟编辑器中的输出、按键数和输入法切换次数与黄金轨迹回放的结果一致"""
+        print("=" * 60)
+        print("运行黄金轨迹测试")
+        print("=" * 60)
+
+        for name, (editor, mode, text) in GOLDEN_CASES.items():
+            path = GOLDEN_DIRECTORY / f"{name}.ktrace"
+            if not path.exists():
+                self.check(f"{name} 黄金轨迹存在", False, "（运行 --update-golden 生成）")
+                continue
+            golden_output, golden_metrics, golden_events = replay_into_emulator(path, editor)
+            typist = EngineTypist(editor, mode, speed_cps=GOLDEN_SPEED_CPS)
+            output = typist(text)
+            metrics = typist.last_metrics
+            self.check(f"{name} 输出", output == golden_output, f"{output!r} vs {golden_output!r}")
+            for key in ('keystrokes', 'layout_switches'):
+                self.check(f"{name} {key}", metrics[key] == golden_metrics[key],
+                           f"{metrics[key]} vs {golden_metrics[key]}")
+            self.check(f"{name} 事件数", metrics['events'] == len(golden_events),
+                       f"{metrics['events']} vs {len(golden_events)}")
+
+    def run_all_tests(self) -> bool:
+        with tempfile.TemporaryDirectory() as scratch:
+            self.run_format_tests(Path(scratch))
+            self.run_recording_tests(Path(scratch))
+            self.run_replay_tests(Path(scratch))
+        self.run_golden_tests()
+        print("=" * 60)
+        return self.finish("按键轨迹测试")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按键轨迹测试")
+    parser.add_argument("--update-golden", action="store_true", help="用当前引擎重新生成黄金轨迹")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        for name in GOLDEN_CASES:
+            print(f"已生成 {record_golden(name, GOLDEN_DIRECTORY)}")
+        return 0
+
+    tests = KeyTraceTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
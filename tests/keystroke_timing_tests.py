@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按键节奏统计测试脚本
+检查环形缓冲区的覆盖顺序，以及在虚拟时钟上模拟发送耗时时的间隔误差、漂移和达到的速度
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from clocks import VirtualClock
+from editor_emulator import engine_harness
+from key_sinks import RecordingKeySink
+from keystroke_timing import KeystrokeTimeline
+from test_framework import CheckTally
+
+
+class SlowKeySink(RecordingKeySink):
+    """每发送 every 个字符，模拟一次耗时 seconds 秒的发送"""
+
+    def __init__(self, clock: VirtualClock, seconds: float, every: int = 1):
+        super().__init__()
+        self.clock = clock
+        self.seconds = seconds
+        self.every = every
+
+    def type_character(self, character: str):
+        super().type_character(character)
+        if len(self.events) % self.every == 0:
+            self.clock.advance(self.seconds)
+
+
+def run_job(text: str, speed_cps: int, send_seconds: float = 0.0, every: int = 1):
+    clock = VirtualClock()
+    with engine_harness(SlowKeySink(clock, send_seconds, every), clock):
+        backend.execute_typing(text, speed_cps, 0, 0, False, False, False)
+    return backend.keystroke_timeline.summary()
+
+
+class KeystrokeTimingTests(CheckTally):
+    """按键节奏统计测试类"""
+
+    def run_ring_buffer_tests(self):
+        """超出容量后保留最近的记录并按时间顺序返回"""
+        print("=" * 60)
+        print("运行环形缓冲区测试")
+        print("=" * 60)
+
+        timeline = KeystrokeTimeline(capacity=8)
+        for index in range(20):
+            timeline.record(index * 1000, index * 1000 + 7)
+        scheduled, actual = timeline.samples()
+        self.check("保留最近的记录", scheduled == [index * 1000 for index in range(12, 20)], str(scheduled))
+        summary = timeline.summary()
+        self.check("丢弃数", summary['events'] == 20 and summary['dropped'] == 12)
+        self.check("固定延后没有间隔误差", summary['interval_error_ms']['max'] == 0.0)
+        self.check("延后量", abs(summary['lateness_ms']['p50'] - 7e-6) < 1e-12, str(summary['lateness_ms']))
+
+        timeline.reset()
+        self.check("重置后为空", timeline.summary()['retained'] == 0)
+
+    def run_accuracy_tests(self):
+        """发送不占时间时完全按计划；偶发慢发送只影响个别间隔，不会累积漂移"""
+        print("=" * 60)
+        print("运行节奏精度测试")
+        print("=" * 60)
+
+        summary = run_job("a" * 1000, speed_cps=50)
+        self.check("达到设定速度", abs(summary['achieved_cps'] - 50) < 1e-6, str(summary['achieved_cps']))
+        self.check("间隔误差为零", summary['interval_error_ms']['mean_abs'] < 1e-6)
+        center = [bucket['count'] for bucket in summary['error_histogram'] if bucket['lower_ms'] == -0.2][0]
+        self.check("误差都在中间桶", center == 999, str(center))
+        interval_bucket = [bucket for bucket in summary['interval_histogram'] if bucket['scheduled']][0]
+        self.check("实际与计划间隔同桶", interval_bucket['actual'] == interval_bucket['scheduled'] == 999)
+
+        # 每 10 个字符有一次 5 毫秒的慢发送（间隔 20 毫秒）
+        summary = run_job("b" * 1000, speed_cps=50, send_seconds=0.005, every=10)
+        errors = summary['interval_error_ms']
+        self.check("慢发送拉长个别间隔", abs(errors['max'] - 5.0) < 1e-3, str(errors))
+        self.check("多数间隔不受影响", abs(errors['p50']) < 1e-3)
+        # 只有慢发送的那个字符晚 5 毫秒，之后的字符仍按原计划发送
+        lateness = summary['lateness_ms']
+        self.check("截止时间吸收慢发送，没有累积漂移", abs(lateness['mean'] - 0.5) < 1e-3
+                   and abs(lateness['p50']) < 1e-3 and lateness['max'] <= 5.0 + 1e-3, str(lateness))
+        self.check("整体速度不变", abs(summary['achieved_cps'] - 50) < 0.5, str(summary['achieved_cps']))
+
+        # 每次发送 30 毫秒，超过 20 毫秒的计划间隔
+        summary = run_job("c" * 500, speed_cps=50, send_seconds=0.03)
+        self.check("发送过慢时达不到设定速度", summary['achieved_cps'] < 35, str(summary['achieved_cps']))
+        self.check("每个字符都晚于计划", summary['lateness_ms']['p50'] >= 29.9, str(summary['lateness_ms']))
+        self.check("落后时不补发", summary['actual_interval_ms']['min'] >= 30.0 - 1e-6)
+
+    def run_endpoint_tests(self):
+        print("=" * 60)
+        print("运行接口测试")
+        print("=" * 60)
+
+        run_job("hello", speed_cps=10)
+        response = backend.app.test_client().get('/api/metrics/timing')
+        body = response.get_json()
+        self.check("接口返回统计", response.status_code == 200 and body['events'] == 5 and body['scheduled_cps'] == 10)
+
+    def run_all_tests(self) -> bool:
+        self.run_ring_buffer_tests()
+        self.run_accuracy_tests()
+        self.run_endpoint_tests()
+        print("=" * 60)
+        return self.finish("节奏统计测试")
+
+
+def main():
+    tests = KeystrokeTimingTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存统计测试脚本
+检查开启内存统计后每个任务按阶段（解析请求、倒计时、生成计划、发送按键）记录的 Python 堆与 RSS 峰值、
+/api/metrics 的 JSON 与 Prometheus 输出、开关接口，
+并确认一个任务的堆峰值不超过输入文本大小的固定倍数（防止流式处理与紧凑计划带来的内存节省被回退）
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from clocks import VirtualClock
+from editor_emulator import CountingKeySink, engine_harness
+from test_framework import CheckTally
+
+# 堆峰值上限：输入文本对象大小（sys.getsizeof）的倍数，另加请求处理等固定开销
+MAX_HEAP_PER_INPUT_BYTE = 6
+HEAP_ALLOWANCE_BYTES = 64 * 1024
+# RSS 受分配器与页缓存影响，只检查增长没有超出同一倍数太多
+RSS_ALLOWANCE_BYTES = 4 * 1024 * 1024
+STAGES = ['request', 'countdown', 'plan', 'typing']
+
+# tracemalloc 会使打字引擎慢十倍以上，语料保持在十几 KB
+CODE_TEXT = "def scale(x):\n    return x * 2  # comment\n" * 360
+CJK_TEXT = "中文混排 text 第二行\n" * 1000
+
+
+def start_job(client, text: str, ide_mode: bool):
+    """
+    通过 /api/start 运行一次任务并等待结束，返回 /api/metrics 中最近一个任务的内存统计；
+    输出端只计数不保存事件，避免事件列表本身的内存计入任务
+    """
+    with engine_harness(CountingKeySink(), VirtualClock(record_schedule=False)):
+        response = client.post('/api/start', json={'text': text, 'speed': 1000, 'countdown': 0, 'jitter': 0,
+                                                   'sendEnter': False, 'autoSwitch': False, 'ideMode': ide_mode})
+        thread = backend.typing_thread
+        if thread is not None:
+            thread.join(60)
+    return response, client.get('/api/metrics').get_json()['memory']['last_job']
+
+
+def run_job(text: str):
+    """直接调用打字引擎（不经过 /api/start）"""
+    with engine_harness(CountingKeySink()):
+        backend.execute_typing(text, 1000, 0, 0, False, False, False)
+
+
+class MemoryAccountingTests(CheckTally):
+    """内存统计测试类"""
+
+    def run_stage_tests(self, client):
+        """各阶段依次记录；IDE 模式的计划（按行拆分）计入 plan 阶段"""
+        print("=" * 60)
+        print("运行分阶段统计测试")
+        print("=" * 60)
+
+        state = client.post('/api/debug/memory', json={'enabled': True}).get_json()
+        self.check("开启内存统计", state['enabled'] and state['tracing'])
+
+        response, job = start_job(client, CODE_TEXT + "# stages\n", ide_mode=True)
+        self.check("开始任务", response.status_code == 200)
+        self.check("记录任务", job is not None and job['outcome'] == 'COMPLETED'
+                   and job['total_characters'] == len(CODE_TEXT) + 9, str(job)[:200])
+        stages = {stage['stage']: stage for stage in job['stages']}
+        self.check("阶段顺序", [stage['stage'] for stage in job['stages']] == STAGES, str(list(stages)))
+        self.check("每个阶段都有堆统计", all(stage['heap_peak_bytes'] >= 0 and 'heap_bytes' in stage
+                                            for stage in job['stages']))
+        self.check("请求阶段包含请求体与解析出的文本", stages['request']['heap_peak_bytes'] >= job['text_bytes'],
+                   f"{stages['request']['heap_peak_bytes']} vs {job['text_bytes']}")
+        self.check("计划阶段包含按行拆分的结果",
+                   stages['plan']['heap_bytes'] - stages['countdown']['heap_bytes'] >= job['text_bytes'],
+                   f"{stages['plan']['heap_bytes'] - stages['countdown']['heap_bytes']}")
+        self.check("峰值取各阶段最大值",
+                   job['peak_heap_bytes'] == max(stage['heap_peak_bytes'] for stage in job['stages']))
+        if state['rss_available']:
+            self.check("RSS 统计", job['peak_rss_bytes'] > 0 and job['rss_growth_bytes'] is not None
+                       and all(stage['rss_peak_bytes'] >= stage['rss_bytes'] > 0 for stage in job['stages']))
+
+        text = client.get('/api/metrics?format=prometheus').get_data(as_text=True)
+        self.check("Prometheus 阶段峰值", 'keyboard_typer_memory_stage_heap_peak_bytes{stage="plan"}' in text)
+        self.check("Prometheus 任务峰值", 'keyboard_typer_memory_peak_heap_bytes ' in text)
+
+        response, _ = start_job(client, "   ", ide_mode=False)
+        run_job("abc")
+        first_stage = backend.memory_accountant.last_job['stages'][0]['stage']
+        self.check("被拒绝的请求不留下阶段", response.status_code == 400 and first_stage == 'countdown', first_stage)
+
+        response, job = start_job(client, "ab\ud83d cd", ide_mode=False)
+        self.check("含孤立代理项的文本", response.status_code == 200 and job['outcome'] == 'COMPLETED',
+                   response.get_data(as_text=True)[:200])
+        for digest in (['a'], {'a': 1}, 'abc', 'A' * 64):
+            response = client.post('/api/start', json={'textHash': digest})
+            run_job("abc")
+            first_stage = backend.memory_accountant.last_job['stages'][0]['stage']
+            self.check(f"拒绝格式错误的 textHash {digest!r}",
+                       response.status_code == 400 and first_stage == 'countdown',
+                       f"{response.status_code} {first_stage}")
+
+    def run_budget_tests(self, client):
+        """堆峰值不超过输入文本大小的固定倍数"""
+        print("=" * 60)
+        print("运行内存预算测试")
+        print("=" * 60)
+
+        for name, text, ide_mode in (('代码 IDE 模式', CODE_TEXT, True), ('代码普通模式', CODE_TEXT + "\n", False),
+                                     ('中英混排', CJK_TEXT, False)):
+            _, job = start_job(client, text, ide_mode)
+            limit = MAX_HEAP_PER_INPUT_BYTE * job['text_bytes'] + HEAP_ALLOWANCE_BYTES
+            self.check(f"{name} 堆峰值", job['peak_heap_bytes'] <= limit,
+                       f"{job['peak_heap_bytes']} > {limit}（{job['heap_peak_per_input_byte']:.2f} 倍输入）")
+            if job['rss_growth_bytes'] is not None:
+                limit = MAX_HEAP_PER_INPUT_BYTE * job['text_bytes'] + RSS_ALLOWANCE_BYTES
+                self.check(f"{name} RSS 增长", job['rss_growth_bytes'] <= limit,
+                           f"{job['rss_growth_bytes']} > {limit}")
+
+    def run_shared_tracing_tests(self, client):
+        """与 /api/debug/allocations 同时开启时共用 tracemalloc：任一方关闭不影响另一方，也不重置对方的峰值"""
+        print("=" * 60)
+        print("运行 tracemalloc 共用测试")
+        print("=" * 60)
+
+        client.post('/api/debug/allocations', json={'enabled': True})
+        blob = bytearray(8 * 1024 * 1024)
+        del blob
+        start_job(client, "shared tracing", ide_mode=False)
+        peak = backend.allocation_tracker.last_job['traced_peak_bytes']
+        self.check("分阶段统计不重置快照对比的峰值", peak >= 8 * 1024 * 1024, str(peak))
+
+        client.post('/api/debug/memory', json={'enabled': False})
+        state = client.get('/api/debug/allocations').get_json()
+        self.check("关闭内存统计后快照对比仍在追踪", state['enabled'] and state['tracing'])
+        backend.allocation_tracker.last_job = None
+        start_job(client, "allocations only", ide_mode=False)
+        self.check("关闭内存统计后快照对比仍记录任务", backend.allocation_tracker.last_job is not None)
+
+        client.post('/api/debug/memory', json={'enabled': True})
+        client.post('/api/debug/allocations', json={'enabled': False})
+        state = client.get('/api/debug/memory').get_json()
+        self.check("关闭快照对比后内存统计仍在追踪", state['enabled'] and state['tracing'])
+
+    def run_toggle_tests(self, client):
+        """关闭后停止 tracemalloc 与采样线程，不再记录任务"""
+        print("=" * 60)
+        print("运行开关测试")
+        print("=" * 60)
+
+        state = client.post('/api/debug/memory', json={'enabled': False}).get_json()
+        self.check("关闭内存统计", not state['enabled'] and not state['tracing'])
+        self.check("采样线程已停止", all(thread.name != 'memory-sampler' for thread in threading.enumerate()))
+        backend.memory_accountant.last_job = None
+        start_job(client, "after disable", ide_mode=False)
+        self.check("关闭后不记录", backend.memory_accountant.last_job is None)
+        self.check("关闭后 metrics 中没有任务", client.get('/api/metrics').get_json()['memory']['last_job'] is None)
+
+    def run_all_tests(self) -> bool:
+        client = backend.app.test_client()
+        try:
+            self.run_stage_tests(client)
+            self.run_budget_tests(client)
+            self.run_shared_tracing_tests(client)
+        finally:
+            self.run_toggle_tests(client)
+        print("=" * 60)
+        return self.finish("内存统计测试")
+
+
+def main():
+    tests = MemoryAccountingTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,20 +10,31 @@ import os
 from pathlib import Path
 import time
 import random
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
 # 添加当前目录和backend目录到路径，以便导入测试框架和backend模块
 sys.path.append(str(Path(__file__).parent))
 sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
 
-from test_framework import KeyboardTyperTestFramework, TestResult
+from test_framework import KeyboardTyperTestFramework, TestResult, run_test_group
+from fault_injector import FaultInjector
 
 
 class NewlineTests:
     """换行符测试类"""
     
-    def __init__(self):
-        self.framework = KeyboardTyperTestFramework()
+    # run_all_tests 依次执行的用例组；并行运行时以组为单位分配到各工作进程
+    TEST_GROUPS = [
+        'run_pattern_analysis_tests',
+        'run_basic_newline_tests',
+        'run_newline_format_tests',
+        'run_code_format_tests',
+        'run_error_simulation_tests'
+    ]
+    
+    def __init__(self, keep_results: bool = True):
+        """keep_results 为 False 时结果只写入附加的 JSONL 报告，不在内存中保留（主测试运行器使用）"""
+        self.framework = KeyboardTyperTestFramework(keep_results=keep_results)
         self.test_cases = []
         self._prepare_test_cases()
     
@@ -148,46 +159,8 @@ class NewlineTests:
         if error_rate == 0.0:
             return text  # 无错误，直接返回原文本
         
-        result = []
-        i = 0
-        while i < len(text):
-            char = text[i]
-            
-            if char == '\n' and random.random() < error_rate:
-                # 随机选择换行符错误类型
-                error_type = random.choice(['missing', 'wrong_type', 'extra'])
-                
-                if error_type == 'missing':
-                    # 缺少换行符：跳过换行符，用空格替代
-                    result.append(' ')
-                elif error_type == 'wrong_type':
-                    # 错误的换行符类型
-                    wrong_newlines = ['\r\n', '\r', '\n\n']
-                    result.append(random.choice(wrong_newlines))
-                elif error_type == 'extra':
-                    # 额外的换行符
-                    result.append('\n\n')
-                i += 1
-            elif char == '\r' and i + 1 < len(text) and text[i + 1] == '\n':
-                # 处理 \r\n 组合
-                if random.random() < error_rate:
-                    error_type = random.choice(['split', 'wrong_order', 'missing_part'])
-                    if error_type == 'split':
-                        result.append('\r')
-                        result.append(' ')  # 在中间插入空格
-                        result.append('\n')
-                    elif error_type == 'wrong_order':
-                        result.append('\n\r')  # 颠倒顺序
-                    elif error_type == 'missing_part':
-                        result.append(random.choice(['\r', '\n']))  # 只保留一部分
-                else:
-                    result.append('\r\n')
-                i += 2
-            else:
-                result.append(char)
-                i += 1
-        
-        return ''.join(result)
+        # 批量注入错误，种子取自 random 模块，随用例组种子复现
+        return FaultInjector(random.getrandbits(32)).inject(text, newline_rate=error_rate).text
     
     def run_basic_newline_tests(self):
         """运行基础换行符测试"""
@@ -351,8 +324,8 @@ class NewlineTests:
             print(f"  末尾有换行符: {patterns['trailing_newline']}")
             print()
     
-    def run_all_tests(self):
-        """运行所有换行符测试"""
+    def run_all_tests(self, seed: Optional[int] = None):
+        """运行所有换行符测试（seed 为 None 时不固定随机数种子）"""
         print("开始换行符检测测试")
         print("测试目标：检测输入与输出在换行符方面的正确性")
         print()
@@ -360,33 +333,33 @@ class NewlineTests:
         start_time = time.time()
         
         # 运行各类测试
-        self.run_pattern_analysis_tests()
-        self.run_basic_newline_tests()
-        self.run_newline_format_tests()
-        self.run_code_format_tests()
-        self.run_error_simulation_tests()
+        for group in self.TEST_GROUPS:
+            run_test_group(self, group, seed)
         
         # 生成报告
         total_time = time.time() - start_time
         print("=" * 60)
         print("测试完成，生成报告...")
         print(f"总执行时间: {total_time:.3f}秒")
+        self.save_reports()
         
+        return self.framework.test_results
+    
+    def save_reports(self):
+        """将测试框架中的结果保存为文本和JSON报告"""
         # 创建带日期的报告文件夹
         dated_folder = self.framework.create_dated_report_folder()
         
         # 保存详细报告
         report_file = dated_folder / "newline_test_report.txt"
-        report_content = self.framework.generate_report(str(report_file))
+        self.framework.generate_report(str(report_file))
         
         # 保存JSON报告
-        json_report_file = dated_folder / "newline_test_report.json"
+        json_report_file = dated_folder / "newline_test_report.jsonl"
         self.framework.export_json_report(str(json_report_file))
         
         print(f"详细报告已保存到: {report_file}")
         print(f"JSON报告已保存到: {json_report_file}")
-        
-        return self.framework.test_results
 
 
 def main():
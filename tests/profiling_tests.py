@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行时剖析测试脚本
+检查采样剖析器能采到目标线程的热点、折叠栈与 speedscope 输出格式、采样对目标线程的开销，
+/api/debug/profile 对运行中打字任务的剖析，以及每个任务的 tracemalloc 快照对比
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from clocks import RealClock
+from editor_emulator import engine_harness
+from profiling import SamplingProfiler
+from test_framework import CheckTally
+
+
+def spin(seconds: float) -> int:
+    """纯计算的忙循环，返回迭代次数"""
+    end = time.perf_counter() + seconds
+    iterations = 0
+    while time.perf_counter() < end:
+        iterations += sum(range(50)) and 1
+    return iterations
+
+
+def run_job(text: str, speed_cps: int = 1000, ide_mode: bool = False):
+    with engine_harness():
+        backend.execute_typing(text, speed_cps, 0, 0, False, False, ide_mode)
+
+
+class ProfilingTests(CheckTally):
+    """运行时剖析测试类"""
+
+    def run_sampler_tests(self):
+        """忙线程的热点出现在采样结果中，输出格式可被 flamegraph/speedscope 读取"""
+        print("=" * 60)
+        print("运行采样器测试")
+        print("=" * 60)
+
+        worker = threading.Thread(target=spin, args=(0.6,), name='spinner')
+        worker.start()
+        profile = SamplingProfiler(hz=200).run(0.4, lambda: [(worker.name, worker.ident)])
+        worker.join()
+        self.check("采到样本", profile.samples > 20, str(profile.summary()))
+        self.check("采样次数符合频率", 40 <= profile.ticks <= 81, str(profile.ticks))
+
+        collapsed = profile.to_collapsed()
+        lines = collapsed.strip().split('\n')
+        self.check("折叠栈格式", all(line.rsplit(' ', 1)[1].isdigit() for line in lines), lines[0])
+        self.check("热点函数", sum(int(line.rsplit(' ', 1)[1]) for line in lines if 'spin (' in line)
+                   >= 0.9 * profile.samples)
+
+        document = profile.to_speedscope()
+        sampled = document['profiles'][0]
+        frame_count = len(document['shared']['frames'])
+        self.check("speedscope 帧编号有效",
+                   all(0 <= index < frame_count for stack in sampled['samples'] for index in stack))
+        self.check("speedscope 权重", abs(sum(sampled['weights']) - profile.samples * profile.interval) < 1e-9
+                   and len(sampled['weights']) == len(sampled['samples']))
+
+        idle = SamplingProfiler(hz=100).run(0.05, lambda: [])
+        self.check("没有目标线程时为空", idle.samples == 0 and idle.ticks >= 1 and idle.to_collapsed() == '')
+
+    def run_overhead_tests(self):
+        """100 Hz 采样不会明显拖慢被采样的线程"""
+        print("=" * 60)
+        print("运行采样开销测试")
+        print("=" * 60)
+
+        baseline = spin(0.5)
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault('iterations', spin(0.5)), name='spinner')
+        worker.start()
+        SamplingProfiler(hz=100).run(0.5, lambda: [(worker.name, worker.ident)])
+        worker.join()
+        ratio = result['iterations'] / baseline
+        self.check("采样时吞吐量不低于 80%", ratio > 0.8, f"{ratio:.2f}")
+
+    def run_endpoint_tests(self):
+        """对运行中的打字任务剖析；参数校验"""
+        print("=" * 60)
+        print("运行剖析接口测试")
+        print("=" * 60)
+
+        client = backend.app.test_client()
+        with engine_harness(clock=RealClock()):
+            try:
+                response = client.post('/api/start', json={'text': 'x' * 400, 'speed': 500, 'countdown': 0,
+                                                           'jitter': 0, 'sendEnter': False, 'autoSwitch': False})
+                self.check("开始任务", response.status_code == 200)
+                response = client.get('/api/debug/profile?seconds=0.3&hz=200')
+                body = response.get_data(as_text=True)
+                self.check("折叠栈中有打字引擎", response.status_code == 200 and 'execute_typing (backend.py' in body,
+                           body[:200])
+                self.check("采样信息响应头", int(response.headers['X-Profile-Samples']) > 0)
+
+                response = client.get('/api/debug/profile?seconds=0.1&format=speedscope&thread=all')
+                document = response.get_json()
+                names = {frame['name'] for frame in document['shared']['frames']}
+                self.check("speedscope 以线程名为根", 'thread typing' in names, str(sorted(names)[:10]))
+            finally:
+                backend.stop_event.set()
+                thread = backend.typing_thread
+                if thread is not None:
+                    thread.join(5)
+
+        self.check("拒绝过长的剖析", client.get('/api/debug/profile?seconds=600').status_code == 400)
+        self.check("拒绝未知格式", client.get('/api/debug/profile?seconds=1&format=pstats').status_code == 400)
+
+    def run_allocation_tests(self):
+        """开启后每个任务记录快照对比，关闭后不再记录"""
+        print("=" * 60)
+        print("运行内存分配对比测试")
+        print("=" * 60)
+
+        client = backend.app.test_client()
+        state = client.post('/api/debug/allocations', json={'enabled': True, 'limit': 5}).get_json()
+        self.check("开启 tracemalloc", state['enabled'] and state['tracing'] and state['limit'] == 5)
+        try:
+            run_job("def f():\n    return 1\n" * 200, ide_mode=True)
+            last_job = client.get('/api/debug/allocations').get_json()['last_job']
+            self.check("记录任务的快照对比", last_job is not None and last_job['total_characters'] == 4400
+                       and last_job['outcome'] == 'COMPLETED', str(last_job)[:200])
+            self.check("保留前 limit 个位置", 0 < len(last_job['top']) <= 5
+                       and all(':' in entry['location'] for entry in last_job['top']))
+        finally:
+            state = client.post('/api/debug/allocations', json={'enabled': False}).get_json()
+        self.check("关闭 tracemalloc", not state['enabled'] and not state['tracing'])
+
+        backend.allocation_tracker.last_job = None
+        run_job("abc")
+        self.check("关闭后不记录", backend.allocation_tracker.last_job is None)
+
+    def run_all_tests(self) -> bool:
+        self.run_sampler_tests()
+        self.run_overhead_tests()
+        self.run_endpoint_tests()
+        self.run_allocation_tests()
+        print("=" * 60)
+        return self.finish("剖析测试")
+
+
+def main():
+    tests = ProfilingTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
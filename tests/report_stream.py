@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 JSONL 测试报告
+每个测试结果完成后立即追加一行 JSON，结束时写入索引与统计尾部：
+    {"record": "header", ...}    报告元数据
+    {"record": "result", ...}    每个测试结果一行
+    {"record": "index", ...}     各结果行的字节偏移与失败用例序号
+    {"record": "summary", ...}   统计汇总（最后一行）
+运行中断时已写入的结果行仍然可读；读取端逐行解析，按需筛选和汇总，不把整个报告载入内存
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+REPORT_FORMAT = "keyboard-typer-report"
+REPORT_VERSION = 1
+
+
+def difference_record(diff) -> dict:
+    """TestDifference 的可序列化形式"""
+    return {
+        "type": diff.type.value,
+        "position": diff.position,
+        "line_number": diff.line_number,
+        "column": diff.column,
+        "expected": diff.expected,
+        "actual": diff.actual,
+        "description": diff.description
+    }
+
+
+def result_record(result, suite: Optional[str] = None) -> dict:
+    """TestResult 的可序列化形式"""
+    return {
+        "record": "result",
+        "suite": suite,
+        "test_name": result.test_name,
+        "passed": result.passed,
+        "execution_time": result.execution_time,
+        "input_length": len(result.input_text),
+        "output_length": len(result.output_text),
+        "difference_count": result.difference_count,
+        "summary": result.summary,
+        "metrics": result.metrics,
+        "differences": [difference_record(diff) for diff in result.differences]
+    }
+
+
+class ReportTotals:
+    """按结果逐条累加的统计，写入端与读取端共用"""
+
+    def __init__(self):
+        self.total = 0
+        self.passed = 0
+        self.difference_count = 0
+        self.execution_time = 0.0
+        self.by_type: Dict[str, int] = {}
+        self.by_suite: Dict[str, Dict[str, int]] = {}
+
+    def add(self, record: dict):
+        self.total += 1
+        self.passed += record["passed"]
+        self.difference_count += record["difference_count"]
+        self.execution_time += record["execution_time"]
+        for type_name, count in record["summary"].items():
+            self.by_type[type_name] = self.by_type.get(type_name, 0) + count
+        suite = record.get("suite")
+        if suite is not None:
+            stats = self.by_suite.setdefault(suite, {"total": 0, "passed": 0, "failed": 0})
+            stats["total"] += 1
+            stats["passed" if record["passed"] else "failed"] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "total_tests": self.total,
+            "passed_tests": self.passed,
+            "failed_tests": self.total - self.passed,
+            "difference_count": self.difference_count,
+            "test_execution_time": self.execution_time,
+            "by_type": self.by_type,
+            "by_suite": self.by_suite
+        }
+
+
+class JsonlReportWriter:
+    """逐条追加测试结果的报告写入器；只在内存中保留每个结果的偏移和统计"""
+
+    def __init__(self, path, metadata: Optional[dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self._offsets = array('q')
+        self._failed = array('q')
+        self.totals = ReportTotals()
+        header = {"record": "header", "format": REPORT_FORMAT, "version": REPORT_VERSION,
+                  "generated_at": time.strftime('%Y-%m-%d %H:%M:%S')}
+        header.update(metadata or {})
+        self._write(header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _write(self, record: dict) -> int:
+        offset = self._file.tell()
+        self._file.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        self._file.write(b'\n')
+        return offset
+
+    def write_result(self, result, suite: Optional[str] = None):
+        """追加一个测试结果并立即刷新到磁盘，中途中断时报告仍包含已完成的结果"""
+        self.write_record(result_record(result, suite))
+
+    def write_record(self, record: dict):
+        """追加一条已序列化的结果记录（如从另一份报告中读出的记录）"""
+        if not record["passed"]:
+            self._failed.append(len(self._offsets))
+        self._offsets.append(self._write(record))
+        self.totals.add(record)
+        self._file.flush()
+
+    def close(self, **extra):
+        """写入索引与统计尾部并关闭文件；extra 中的字段附加到统计中"""
+        if self._file.closed:
+            return
+        index_offset = self._write({"record": "index", "offsets": self._offsets.tolist(),
+                                    "failed": self._failed.tolist()})
+        summary = {"record": "summary", "index_offset": index_offset}
+        summary.update(self.totals.as_dict())
+        summary.update(extra)
+        self._write(summary)
+        self._file.close()
+
+
+def _read_last_line(f) -> bytes:
+    """从文件末尾向前读取最后一行"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    position = end
+    tail = b''
+    while position > 0:
+        step = min(4096, position)
+        position -= step
+        f.seek(position)
+        tail = f.read(step) + tail
+        newline = tail.rfind(b'\n', 0, len(tail) - 1)
+        if newline >= 0:
+            return tail[newline + 1:]
+    return tail
+
+
+class JsonlReportReader:
+    """惰性读取 JSONL 报告：逐行解析，支持筛选、汇总和按序号随机访问"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._footer = None
+        self._index = None
+
+    def records(self) -> Iterator[dict]:
+        """依次产生所有记录；未写完的最后一行（运行仍在进行或被中断）被跳过"""
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                yield json.loads(line)
+
+    def header(self) -> dict:
+        return next(self.records())
+
+    def footer(self) -> Optional[dict]:
+        """报告完整时返回统计尾部，否则返回 None"""
+        if self._footer is None:
+            with open(self.path, 'rb') as f:
+                line = _read_last_line(f)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return None
+            if record.get("record") == "summary":
+                self._footer = record
+        return self._footer
+
+    @property
+    def complete(self) -> bool:
+        return self.footer() is not None
+
+    def results(self, passed: Optional[bool] = None, suite: Optional[str] = None,
+                diff_type: Optional[str] = None, name: Optional[str] = None) -> Iterator[dict]:
+        """按条件筛选测试结果：是否通过、所属测试类型、包含的差异类型（如 '缺字'）、名称子串"""
+        for record in self.records():
+            if record.get("record") != "result":
+                continue
+            if passed is not None and record["passed"] != passed:
+                continue
+            if suite is not None and record.get("suite") != suite:
+                continue
+            if diff_type is not None and not record["summary"].get(diff_type):
+                continue
+            if name is not None and name not in record["test_name"]:
+                continue
+            yield record
+
+    def aggregate(self, **filters) -> dict:
+        """逐条汇总（可带与 results() 相同的筛选条件）"""
+        totals = ReportTotals()
+        for record in self.results(**filters):
+            totals.add(record)
+        return totals.as_dict()
+
+    def summary(self) -> dict:
+        """完整报告直接返回尾部统计；不完整的报告逐条汇总已写入的结果"""
+        footer = self.footer()
+        if footer is not None:
+            return footer
+        summary = self.aggregate()
+        summary["partial"] = True
+        return summary
+
+    def _load_index(self) -> dict:
+        footer = self.footer()
+        if footer is None:
+            raise ValueError(f"报告不完整，没有索引: {self.path}")
+        if self._index is None:
+            with open(self.path, 'rb') as f:
+                f.seek(footer["index_offset"])
+                self._index = json.loads(f.readline())
+        return self._index
+
+    def result_at(self, index: int) -> dict:
+        """按序号读取第 index 个测试结果（需要完整报告中的索引）"""
+        offset = self._load_index()["offsets"][index]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def failed_results(self) -> Iterator[dict]:
+        """完整报告通过索引直接定位失败的结果，不解析通过的结果行"""
+        if not self.complete:
+            yield from self.results(passed=False)
+            return
+        for index in self._load_index()["failed"]:
+            yield self.result_at(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取、筛选和汇总 JSONL 测试报告")
+    parser.add_argument("report", help="报告文件路径（.jsonl）")
+    parser.add_argument("--failed", action="store_true", help="只列出失败的测试")
+    parser.add_argument("--suite", help="只看某类测试，如 content_diff / newline / indentation")
+    parser.add_argument("--type", dest="diff_type", help="只看包含某种差异的测试，如 缺字、换行错误")
+    parser.add_argument("--name", help="测试名称包含的文字")
+    args = parser.parse_args()
+
+    reader = JsonlReportReader(args.report)
+    filters = {"passed": False if args.failed else None, "suite": args.suite,
+               "diff_type": args.diff_type, "name": args.name}
+    for record in reader.results(**filters):
+        status = "通过" if record["passed"] else "失败"
+        print(f"[{status}] {record['test_name']}  差异 {record['difference_count']}  {record['summary']}")
+
+    summary = reader.aggregate(**filters) if any(v is not None for v in filters.values()) else reader.summary()
+    print("-" * 60)
+    if summary.get("partial"):
+        print("报告不完整（运行未结束或被中断），以下为已写入结果的统计")
+    print(f"测试数: {summary['total_tests']}  通过: {summary['passed_tests']}  失败: {summary['failed_tests']}  "
+          f"差异总数: {summary['difference_count']}")
+    if summary["by_type"]:
+        print(f"差异统计: {summary['by_type']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
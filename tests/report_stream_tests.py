@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式报告测试脚本
+检查 JSONL 报告逐条写入、中途读取、索引定位以及筛选汇总的结果与完整结果一致
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from report_stream import JsonlReportReader, JsonlReportWriter
+from test_framework import CheckTally, KeyboardTyperTestFramework
+
+
+class ReportStreamTests(CheckTally):
+    """流式报告测试类"""
+
+    def _run_cases(self, framework: KeyboardTyperTestFramework, count: int):
+        for i in range(count):
+            text = f"第 {i} 行\n    缩进 {i}"
+            framework.run_test(f"用例{i}", text, lambda t, i=i: t if i % 3 else t.replace('缩进', '缩'))
+
+    def run_streaming_tests(self, count: int = 30):
+        """边运行边读取：未关闭的报告可读取已完成的结果，关闭后尾部统计与逐条汇总一致"""
+        print("=" * 60)
+        print("运行流式报告测试")
+        print("=" * 60)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "report.jsonl"
+            framework = KeyboardTyperTestFramework(keep_results=False)
+            writer = JsonlReportWriter(path, metadata={'seed': 1})
+            framework.attach_report_writer(writer, 'content_diff')
+            self._run_cases(framework, count)
+            self.check("关闭结果保留后不占用内存", framework.test_results == [])
+
+            reader = JsonlReportReader(path)
+            partial = reader.summary()
+            self.check("未关闭的报告标记为不完整", partial.get("partial") is True and not reader.complete)
+            self.check("未关闭的报告包含已完成的结果", partial["total_tests"] == count,
+                       f"{partial['total_tests']} != {count}")
+
+            writer.close(execution_time=1.5)
+            reader = JsonlReportReader(path)
+            footer = reader.summary()
+            aggregated = reader.aggregate()
+            self.check("报告完整", reader.complete)
+            self.check("尾部统计与逐条汇总一致",
+                       all(footer[key] == aggregated[key] for key in aggregated), f"{footer} != {aggregated}")
+            self.check("附加统计字段写入尾部", footer.get("execution_time") == 1.5)
+            self.check("报告头包含元数据", reader.header().get("seed") == 1)
+
+            failed_names = [record["test_name"] for record in reader.results(passed=False)]
+            indexed_names = [record["test_name"] for record in reader.failed_results()]
+            self.check("索引定位的失败结果与逐条筛选一致", failed_names == indexed_names)
+            self.check("失败结果数量正确", len(failed_names) == (count + 2) // 3, str(len(failed_names)))
+            self.check("按序号读取结果", reader.result_at(4)["test_name"] == "用例4")
+            self.check("按差异类型筛选",
+                       sum(1 for _ in reader.results(diff_type='缺字')) == len(failed_names))
+            self.check("按测试类型统计", footer["by_suite"]["content_diff"]["total"] == count)
+
+    def run_export_tests(self):
+        """export_json_report 与逐条写入得到相同的结果记录"""
+        print("=" * 60)
+        print("运行报告导出测试")
+        print("=" * 60)
+
+        with tempfile.TemporaryDirectory() as directory:
+            streamed_path = Path(directory) / "streamed.jsonl"
+            exported_path = Path(directory) / "exported.jsonl"
+            framework = KeyboardTyperTestFramework()
+            with JsonlReportWriter(streamed_path) as writer:
+                framework.attach_report_writer(writer)
+                self._run_cases(framework, 10)
+            framework.attach_report_writer(None)
+            framework.export_json_report(str(exported_path))
+
+            streamed = list(JsonlReportReader(streamed_path).results())
+            exported = list(JsonlReportReader(exported_path).results())
+            self.check("导出的结果与逐条写入一致", streamed == exported)
+            self.check("导出的结果数量", len(exported) == len(framework.test_results))
+
+    def run_all_tests(self) -> bool:
+        self.run_streaming_tests()
+        self.run_export_tests()
+        print("=" * 60)
+        return self.finish("流式报告测试")
+
+
+def main():
+    tests = ReportStreamTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试结果历史库
+把每次运行的 JSONL 测试报告（每个用例的耗时与差异数）和基准测试的 JSON 结果（吞吐量、准确率等指标）
+存入本地 SQLite，提供按指标查看趋势、比较两次运行、超过阈值即失败的回归检查
+
+    python results_store.py ingest reports/<时间戳>/comprehensive_test_report.jsonl --label 优化前
+    python results_store.py ingest ../benchmarks/comparison_accuracy.json
+    python results_store.py runs
+    python results_store.py trend execution_time
+    python results_store.py compare previous latest
+    python results_store.py check --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from report_stream import JsonlReportReader
+
+DEFAULT_DB_PATH = Path(__file__).parent / "results.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT,
+    source TEXT,
+    git_commit TEXT
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    suite TEXT,
+    test_name TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    execution_time REAL NOT NULL,
+    difference_count INTEGER NOT NULL,
+    input_length INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS test_results_name ON test_results(test_name, run_id);
+CREATE INDEX IF NOT EXISTS metrics_name ON metrics(name, run_id);
+"""
+
+# 名称以这些结尾的指标越大越好，其余（耗时、内存、差异数、失败数）越小越好
+HIGHER_IS_BETTER = ('mb_per_second', 'precision', 'recall', 'passed_tests', 'throughput_rps')
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(HIGHER_IS_BETTER)
+
+
+def current_git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def report_metrics(summary: dict) -> Dict[str, float]:
+    """从 JSONL 报告的统计尾部提取运行级指标"""
+    metrics = {}
+    for key in ('total_tests', 'passed_tests', 'failed_tests', 'difference_count',
+                'test_execution_time', 'execution_time'):
+        if isinstance(summary.get(key), (int, float)):
+            metrics[key] = summary[key]
+    for type_name, count in summary.get('by_type', {}).items():
+        metrics[f"differences/{type_name}"] = count
+    for suite, stats in summary.get('by_suite', {}).items():
+        metrics[f"{suite}/failed_tests"] = stats['failed']
+    return metrics
+
+
+def benchmark_metrics(data) -> Dict[str, float]:
+    """从基准测试 JSON 提取指标：comparison_accuracy_bench / engine_bench 的报告或 diff_engines_bench --json 的列表"""
+    rows = data['results'] if isinstance(data, dict) else data
+    metrics = {}
+    for row in rows:
+        prefix = '/'.join(str(row[key]) for key in ('engine', 'corpus', 'size', 'error_rate', 'mode', 'stage')
+                          if key in row)
+        for key in ('seconds', 'mb_per_second', 'peak_memory_bytes', 'edit_cost', 'ns_per_char', 'peak_bytes_per_char',
+                    'net_blocks_per_char'):
+            if isinstance(row.get(key), (int, float)) and not isinstance(row.get(key), bool):
+                metrics[f"{prefix}/{key}"] = row[key]
+        for type_name, metric in row.get('metrics', {}).items():
+            for key in ('precision', 'recall'):
+                if metric.get(key) is not None:
+                    metrics[f"{prefix}/{type_name}/{key}"] = metric[key]
+    return metrics
+
+
+class ResultsStore:
+    """SQLite 测试结果库"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get('KEYBOARD_TYPER_RESULTS_DB', DEFAULT_DB_PATH))
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _add_run(self, kind: str, label: Optional[str], source: Optional[str], metrics: Dict[str, float]) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO runs (created_at, kind, label, source, git_commit) VALUES (?, ?, ?, ?, ?)",
+            (time.strftime('%Y-%m-%d %H:%M:%S'), kind, label, source, current_git_commit())
+        )
+        run_id = cursor.lastrowid
+        self.connection.executemany("INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                                    [(run_id, name, float(value)) for name, value in metrics.items()])
+        return run_id
+
+    def ingest_report(self, path, label: Optional[str] = None) -> int:
+        """导入 JSONL 测试报告，逐条读取结果，不把整个报告载入内存"""
+        reader = JsonlReportReader(path)
+        with self.connection:
+            run_id = self._add_run('tests', label, str(path), report_metrics(reader.summary()))
+            self.connection.executemany(
+                "INSERT INTO test_results (run_id, suite, test_name, passed, execution_time, difference_count, "
+                "input_length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((run_id, record.get('suite'), record['test_name'], int(record['passed']),
+                  record['execution_time'], record['difference_count'], record.get('input_length'))
+                 for record in reader.results())
+            )
+        return run_id
+
+    def ingest_benchmark(self, path, label: Optional[str] = None) -> int:
+        """导入基准测试的 JSON 结果"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        with self.connection:
+            return self._add_run('benchmark', label, str(path), benchmark_metrics(data))
+
+    def ingest(self, path, label: Optional[str] = None) -> int:
+        """按文件类型导入：.jsonl 为测试报告，其他为基准测试 JSON；目录则导入其中的综合报告"""
+        path = Path(path)
+        if path.is_dir():
+            path = path / "comprehensive_test_report.jsonl"
+        if path.suffix == '.jsonl':
+            return self.ingest_report(path, label)
+        return self.ingest_benchmark(path, label)
+
+    def runs(self, limit: int = 20, kind: Optional[str] = None) -> List[tuple]:
+        query = "SELECT id, created_at, kind, label, git_commit, source FROM runs"
+        params: tuple = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " ORDER BY id DESC LIMIT ?"
+        return self.connection.execute(query, params + (limit,)).fetchall()
+
+    def resolve_run(self, reference: str, kind: Optional[str] = None) -> int:
+        """解析运行编号：数字、'latest'（最近一次）或 'previous'（倒数第二次），可限定运行类型"""
+        if reference.isdigit():
+            return int(reference)
+        offsets = {'latest': 0, 'previous': 1}
+        if reference not in offsets:
+            raise ValueError(f"无效的运行编号: {reference}（可用数字、latest、previous）")
+        query = "SELECT id FROM runs"
+        params: tuple = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " ORDER BY id DESC LIMIT 1 OFFSET ?"
+        row = self.connection.execute(query, params + (offsets[reference],)).fetchone()
+        if row is None:
+            raise ValueError(f"没有找到运行: {reference}")
+        return row[0]
+
+    def run_kind(self, run_id: int) -> str:
+        row = self.connection.execute("SELECT kind FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"没有找到运行: #{run_id}")
+        return row[0]
+
+    def metrics(self, run_id: int, pattern: str = '%') -> Dict[str, float]:
+        rows = self.connection.execute("SELECT name, value FROM metrics WHERE run_id = ? AND name LIKE ?",
+                                       (run_id, pattern))
+        return dict(rows)
+
+    def test_times(self, run_id: int) -> Dict[Tuple[Optional[str], str], float]:
+        rows = self.connection.execute(
+            "SELECT suite, test_name, execution_time FROM test_results WHERE run_id = ?", (run_id,))
+        return {(suite, name): seconds for suite, name, seconds in rows}
+
+    def trend(self, metric: str, limit: int = 20) -> List[tuple]:
+        """某个指标在最近若干次运行中的取值（按时间顺序）"""
+        rows = self.connection.execute(
+            "SELECT runs.id, runs.created_at, runs.label, runs.git_commit, metrics.value "
+            "FROM metrics JOIN runs ON runs.id = metrics.run_id WHERE metrics.name = ? "
+            "ORDER BY runs.id DESC LIMIT ?", (metric, limit)).fetchall()
+        return rows[::-1]
+
+    def test_trend(self, test_name: str, limit: int = 20) -> List[tuple]:
+        """某个用例的耗时与差异数在最近若干次运行中的取值"""
+        rows = self.connection.execute(
+            "SELECT runs.id, runs.created_at, runs.label, runs.git_commit, test_results.execution_time, "
+            "test_results.difference_count FROM test_results JOIN runs ON runs.id = test_results.run_id "
+            "WHERE test_results.test_name = ? ORDER BY runs.id DESC LIMIT ?", (test_name, limit)).fetchall()
+        return rows[::-1]
+
+    def compare(self, baseline: int, candidate: int, pattern: str = '%') -> Iterator[Tuple[str, float, float, float]]:
+        """两次运行共有指标的对比：(指标, 基线值, 新值, 相对变化；正数表示变差)"""
+        before = self.metrics(baseline, pattern)
+        after = self.metrics(candidate, pattern)
+        for name in sorted(before.keys() & after.keys()):
+            yield name, before[name], after[name], relative_regression(name, before[name], after[name])
+
+    def regressions(self, baseline: int, candidate: int, threshold: float, pattern: str = '%',
+                    include_tests: bool = False, min_seconds: float = 0.01) -> List[Tuple[str, float, float, float]]:
+        """变差幅度超过 threshold 的指标；include_tests 时还检查基线耗时不少于 min_seconds 的用例"""
+        found = [row for row in self.compare(baseline, candidate, pattern) if row[3] > threshold]
+        if include_tests:
+            before = self.test_times(baseline)
+            after = self.test_times(candidate)
+            for key in sorted(before.keys() & after.keys(), key=lambda k: (k[0] or '', k[1])):
+                if before[key] < min_seconds:
+                    continue
+                change = relative_regression('execution_time', before[key], after[key])
+                if change > threshold:
+                    suite, name = key
+                    found.append((f"test/{suite or '-'}/{name}/execution_time", before[key], after[key], change))
+        return found
+
+
+def relative_regression(metric: str, before: float, after: float) -> float:
+    """相对变化，按指标方向换算为“变差”的比例（负数表示改进）"""
+    if before == after:
+        return 0.0
+    if before == 0:
+        return float('inf') if (after < before) == higher_is_better(metric) else float('-inf')
+    change = (after - before) / abs(before)
+    return -change if higher_is_better(metric) else change
+
+
+def _format_change(change: float) -> str:
+    return f"{change:+.1%}" if abs(change) != float('inf') else ('+inf' if change > 0 else '-inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试结果历史库：导入报告、查看趋势、比较运行、回归检查")
+    parser.add_argument("--db", help="数据库路径（默认 tests/results.sqlite3 或 KEYBOARD_TYPER_RESULTS_DB）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="导入 JSONL 测试报告（或其所在目录）与基准测试 JSON")
+    ingest_parser.add_argument("paths", nargs="+")
+    ingest_parser.add_argument("--label", help="运行标签，如分支名或优化说明")
+
+    runs_parser = commands.add_parser("runs", help="列出最近的运行")
+    runs_parser.add_argument("--limit", type=int, default=20)
+    runs_parser.add_argument("--kind", choices=['tests', 'benchmark'])
+
+    trend_parser = commands.add_parser("trend", help="查看指标或用例耗时的变化趋势")
+    trend_parser.add_argument("metric", help="指标名；使用 --test 时为用例名称")
+    trend_parser.add_argument("--test", action="store_true", help="查看某个用例的耗时与差异数")
+    trend_parser.add_argument("--limit", type=int, default=20)
+
+    compare_parser = commands.add_parser("compare", help="比较两次运行")
+    compare_parser.add_argument("baseline", help="基线运行：编号、latest 或 previous")
+    compare_parser.add_argument("candidate", help="对比运行：编号、latest 或 previous")
+    compare_parser.add_argument("--metric", default='%', help="指标名过滤（SQL LIKE 模式）")
+    compare_parser.add_argument("--kind", choices=['tests', 'benchmark'], help="latest/previous 只在该类型的运行中查找")
+
+    check_parser = commands.add_parser("check", help="有指标变差超过阈值时返回非零退出码")
+    check_parser.add_argument("--baseline", default="previous")
+    check_parser.add_argument("--candidate", default="latest")
+    check_parser.add_argument("--threshold", type=float, default=0.1, help="允许变差的比例（默认0.1即10%%）")
+    check_parser.add_argument("--metric", default='%', help="只检查匹配的指标（SQL LIKE 模式）")
+    check_parser.add_argument("--kind", choices=['tests', 'benchmark'], help="latest/previous 只在该类型的运行中查找")
+    check_parser.add_argument("--tests", action="store_true", help="同时检查每个用例的耗时")
+    check_parser.add_argument("--min-seconds", type=float, default=0.01, help="只检查基线耗时不少于该值的用例")
+
+    args = parser.parse_args()
+    with ResultsStore(args.db) as store:
+        try:
+            return run_command(store, args)
+        except ValueError as e:
+            print(f"错误: {e}")
+            return 2
+
+
+def run_command(store: ResultsStore, args) -> int:
+    if args.command == "ingest":
+        for path in args.paths:
+            run_id = store.ingest(path, args.label)
+            print(f"已导入运行 #{run_id}: {path}")
+        return 0
+
+    if args.command == "runs":
+        print(f"{'编号':>6}  {'时间':<20}{'类型':<11}{'提交':<10}{'标签':<16}来源")
+        for run_id, created_at, kind, label, commit, source in store.runs(args.limit, args.kind):
+            print(f"{run_id:>6}  {created_at:<20}{kind:<11}{commit or '-':<10}{label or '-':<16}{source or '-'}")
+        return 0
+
+    if args.command == "trend":
+        if args.test:
+            for run_id, created_at, label, commit, seconds, differences in store.test_trend(args.metric, args.limit):
+                print(f"#{run_id:<5} {created_at}  {commit or '-':<9} {seconds:>10.4f}秒  差异 {differences:<6} {label or ''}")
+        else:
+            for run_id, created_at, label, commit, value in store.trend(args.metric, args.limit):
+                print(f"#{run_id:<5} {created_at}  {commit or '-':<9} {value:>14.4f}  {label or ''}")
+        return 0
+
+    # 基线默认取与对比运行同类型的运行，测试报告与基准测试结果互不比较
+    candidate = store.resolve_run(args.candidate, args.kind)
+    baseline = store.resolve_run(args.baseline, args.kind or store.run_kind(candidate))
+
+    if args.command == "compare":
+        print(f"比较运行 #{baseline} -> #{candidate}（变化为正表示变差）")
+        for name, before, after, change in store.compare(baseline, candidate, args.metric):
+            print(f"  {name:<60}{before:>14.4f}{after:>14.4f}  {_format_change(change)}")
+        return 0
+
+    regressions = store.regressions(baseline, candidate, args.threshold, args.metric, args.tests, args.min_seconds)
+    if not regressions:
+        print(f"运行 #{candidate} 相对 #{baseline} 没有超过 {args.threshold:.0%} 的回归")
+        return 0
+    print(f"运行 #{candidate} 相对 #{baseline} 有 {len(regressions)} 项回归超过 {args.threshold:.0%}:")
+    for name, before, after, change in regressions:
+        print(f"  {name:<60}{before:>14.4f}{after:>14.4f}  {_format_change(change)}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试结果历史库测试脚本
+检查报告与基准测试结果的导入、趋势查询、运行比较以及回归判定的方向
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from report_stream import JsonlReportWriter
+from results_store import ResultsStore, benchmark_metrics, relative_regression
+from test_framework import CheckTally, KeyboardTyperTestFramework
+
+
+class ResultsStoreTests(CheckTally):
+    """测试结果历史库测试类"""
+
+    def _write_report(self, path: Path, broken: int):
+        framework = KeyboardTyperTestFramework(keep_results=False)
+        with JsonlReportWriter(path) as writer:
+            framework.attach_report_writer(writer, 'content_diff')
+            for i in range(6):
+                framework.run_test(f"用例{i}", f"文本 {i}", lambda t, i=i: t + 'x' if i < broken else t)
+
+    def _write_benchmark(self, path: Path, mb_per_second: float, recall: float):
+        row = {'engine': 'hierarchical', 'corpus': 'mixed_cjk', 'size': 16384, 'error_rate': 0.01,
+               'seconds': 1.0 / mb_per_second, 'mb_per_second': mb_per_second, 'peak_memory_bytes': 1000,
+               'metrics': {'MISSING_CHAR': {'precision': 0.9, 'recall': recall}}}
+        path.write_text(json.dumps({'metadata': {}, 'results': [row]}), encoding='utf-8')
+
+    def run_direction_tests(self):
+        """越大越好与越小越好的指标按各自方向计算变差比例"""
+        print("=" * 60)
+        print("运行回归方向测试")
+        print("=" * 60)
+        self.check("耗时增加为变差", relative_regression('execution_time', 1.0, 1.5) == 0.5)
+        self.check("吞吐量下降为变差", relative_regression('a/mb_per_second', 2.0, 1.0) == 0.5)
+        self.check("查全率提高为改进", relative_regression('a/recall', 0.5, 1.0) < 0)
+        self.check("失败数从零增加为变差", relative_regression('failed_tests', 0, 2) == float('inf'))
+
+        engine_row = {'corpus': 'mixed_cjk', 'size': 1024, 'mode': 'ide_switch', 'stage': 'engine', 'seconds': 0.01,
+                      'ns_per_char': 9000.0, 'peak_bytes_per_char': 4.0, 'events': 2000}
+        metrics = benchmark_metrics({'results': [engine_row]})
+        self.check("引擎基准按模式和阶段区分", metrics.get('mixed_cjk/1024/ide_switch/engine/ns_per_char') == 9000.0
+                   and 'mixed_cjk/1024/ide_switch/engine/events' not in metrics, str(metrics))
+        self.check("每字符耗时增加为变差", relative_regression('a/ns_per_char', 100.0, 150.0) == 0.5)
+
+    def run_store_tests(self):
+        """导入两次测试报告和两次基准结果，按类型比较相邻运行"""
+        print("=" * 60)
+        print("运行历史库测试")
+        print("=" * 60)
+
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+            self._write_report(directory / "a.jsonl", broken=1)
+            self._write_report(directory / "b.jsonl", broken=3)
+            self._write_benchmark(directory / "a.json", 10.0, 0.9)
+            self._write_benchmark(directory / "b.json", 8.0, 0.9)
+
+            with ResultsStore(directory / "results.sqlite3") as store:
+                first = store.ingest(directory / "a.jsonl", label='基线')
+                store.ingest(directory / "a.json")
+                second = store.ingest(directory / "b.jsonl")
+                latest_benchmark = store.ingest(directory / "b.json")
+
+                self.check("导入每个用例", len(store.test_times(first)) == 6)
+                trend = [row[-1] for row in store.trend('failed_tests')]
+                self.check("失败数趋势", trend == [1.0, 3.0], str(trend))
+                self.check("用例趋势", len(store.test_trend('用例0')) == 2)
+
+                self.check("latest 为最近一次运行", store.resolve_run('latest') == latest_benchmark)
+                self.check("previous 按类型查找", store.resolve_run('previous', 'tests') == first)
+
+                regressions = dict((row[0], row[3]) for row in store.regressions(first, second, 0.1))
+                self.check("失败数回归被发现", 'failed_tests' in regressions, str(regressions))
+                self.check("通过数回归被发现", 'passed_tests' in regressions)
+                self.check("总数未变不算回归", 'total_tests' not in regressions)
+
+                baseline = store.resolve_run('previous', 'benchmark')
+                found = [row[0] for row in store.regressions(baseline, latest_benchmark, 0.1)]
+                self.check("吞吐量下降超过阈值", any(name.endswith('mb_per_second') for name in found), str(found))
+                self.check("查全率未变不算回归", not any(name.endswith('recall') for name in found))
+                self.check("阈值之内不算回归", store.regressions(baseline, latest_benchmark, 0.5) == [])
+
+    def run_all_tests(self) -> bool:
+        self.run_direction_tests()
+        self.run_store_tests()
+        print("=" * 60)
+        return self.finish("历史库测试")
+
+
+def main():
+    tests = ResultsStoreTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
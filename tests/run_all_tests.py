@@ -2,15 +2,18 @@
 # -*- coding: utf-8 -*-
 """
 主测试运行器
-统一执行所有测试脚本：内容差异检测、换行检测、空格缩进检测
+统一执行所有测试脚本：内容差异检测、换行检测、空格缩进检测、编辑器模拟
 """
 
 import sys
 import os
+import io
+import collections
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import time
-import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import argparse
 from datetime import datetime
 
@@ -23,26 +26,54 @@ try:
     from content_diff_tests import ContentDifferenceTests
     from newline_tests import NewlineTests
     from indentation_tests import IndentationTests
-    from test_framework import TestResult
+    from editor_emulation_tests import EditorEmulationTests
+    from test_framework import TestResult, run_test_group
+    from report_stream import JsonlReportReader, JsonlReportWriter
+    from results_store import ResultsStore
 except ImportError as e:
     print(f"导入测试模块失败: {e}")
     print("请确保所有测试脚本都在同一目录下")
     sys.exit(1)
 
 
+# 测试类型 -> (test_summary 中的键, 测试类, TestSuite 中的属性名)
+SUITE_TYPES = {
+    'content': ('content_diff', ContentDifferenceTests, 'content_tests'),
+    'newline': ('newline', NewlineTests, 'newline_tests'),
+    'indentation': ('indentation', IndentationTests, 'indentation_tests'),
+    'editor': ('editor_emulation', EditorEmulationTests, 'editor_tests'),
+}
+
+
+def run_test_shard(test_type: str, group: str, seed: Optional[int]) -> Tuple[List[TestResult], str]:
+    """工作进程中运行一个用例组，返回测试结果和捕获的输出
+    每个用例组使用独立的测试类实例（及其 KeyboardTyperTestFramework）"""
+    suite = SUITE_TYPES[test_type][1]()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        run_test_group(suite, group, seed)
+    return suite.framework.test_results, output.getvalue()
+
+
 class TestSuite:
     """测试套件主类"""
     
-    def __init__(self):
-        self.content_tests = ContentDifferenceTests()
-        self.newline_tests = NewlineTests()
-        self.indentation_tests = IndentationTests()
+    def __init__(self, seed: Optional[int] = 0, jobs: int = 1):
+        """seed: 用例随机数的基础种子（None 表示不固定）；jobs: 并行运行用例组的进程数"""
+        self.seed = seed
+        self.jobs = jobs
+        # 结果只写入综合 JSONL 报告，统计和失败详情都从报告中读取，内存占用不随用例数增长
+        self.content_tests = ContentDifferenceTests(keep_results=False)
+        self.newline_tests = NewlineTests(keep_results=False)
+        self.indentation_tests = IndentationTests(keep_results=False)
+        self.editor_tests = EditorEmulationTests(keep_results=False)
         
-        self.all_results = []
+        self.report_writer: Optional[JsonlReportWriter] = None
         self.test_summary = {
             'content_diff': {'total': 0, 'passed': 0, 'failed': 0},
             'newline': {'total': 0, 'passed': 0, 'failed': 0},
-            'indentation': {'total': 0, 'passed': 0, 'failed': 0}
+            'indentation': {'total': 0, 'passed': 0, 'failed': 0},
+            'editor_emulation': {'total': 0, 'passed': 0, 'failed': 0}
         }
     
     def create_dated_report_folder(self, base_path: str = "reports") -> Path:
@@ -67,13 +98,8 @@ class TestSuite:
             print("=" * 80)
         
         try:
-            results = self.content_tests.run_all_tests()
-            self.all_results.extend(results)
-            
-            # 统计结果
-            self.test_summary['content_diff']['total'] = len(results)
-            self.test_summary['content_diff']['passed'] = sum(1 for r in results if r.passed)
-            self.test_summary['content_diff']['failed'] = len(results) - self.test_summary['content_diff']['passed']
+            self.content_tests.run_all_tests(self.seed)
+            self._record_results('content_diff')
             
             if verbose:
                 print(f"内容差异测试完成: {self.test_summary['content_diff']['passed']}/{self.test_summary['content_diff']['total']} 通过")
@@ -91,13 +117,8 @@ class TestSuite:
             print("=" * 80)
         
         try:
-            results = self.newline_tests.run_all_tests()
-            self.all_results.extend(results)
-            
-            # 统计结果
-            self.test_summary['newline']['total'] = len(results)
-            self.test_summary['newline']['passed'] = sum(1 for r in results if r.passed)
-            self.test_summary['newline']['failed'] = len(results) - self.test_summary['newline']['passed']
+            self.newline_tests.run_all_tests(self.seed)
+            self._record_results('newline')
             
             if verbose:
                 print(f"换行测试完成: {self.test_summary['newline']['passed']}/{self.test_summary['newline']['total']} 通过")
@@ -115,13 +136,8 @@ class TestSuite:
             print("=" * 80)
         
         try:
-            results = self.indentation_tests.run_all_tests()
-            self.all_results.extend(results)
-            
-            # 统计结果
-            self.test_summary['indentation']['total'] = len(results)
-            self.test_summary['indentation']['passed'] = sum(1 for r in results if r.passed)
-            self.test_summary['indentation']['failed'] = len(results) - self.test_summary['indentation']['passed']
+            self.indentation_tests.run_all_tests(self.seed)
+            self._record_results('indentation')
             
             if verbose:
                 print(f"缩进测试完成: {self.test_summary['indentation']['passed']}/{self.test_summary['indentation']['total']} 通过")
@@ -131,15 +147,81 @@ class TestSuite:
             print(f"缩进测试执行失败: {e}")
             return False
     
+    def run_editor_tests(self, verbose: bool = True):
+        """运行编辑器模拟测试"""
+        if verbose:
+            print("\n" + "=" * 80)
+            print("4. 编辑器模拟测试")
+            print("=" * 80)
+        
+        try:
+            self.editor_tests.run_all_tests(self.seed)
+            self._record_results('editor_emulation')
+            
+            if verbose:
+                print(f"编辑器模拟测试完成: {self.test_summary['editor_emulation']['passed']}/{self.test_summary['editor_emulation']['total']} 通过")
+            
+            return True
+        except Exception as e:
+            print(f"编辑器模拟测试执行失败: {e}")
+            return False
+    
+    def _record_results(self, summary_key: str):
+        """从综合报告写入端逐条累加的统计中取出一类测试的结果数"""
+        stats = self.report_writer.totals.by_suite.get(summary_key, {'total': 0, 'passed': 0, 'failed': 0})
+        self.test_summary[summary_key].update(stats)
+    
+    def run_parallel_tests(self, test_types: List[str], verbose: bool = True) -> int:
+        """将各类测试的用例组分配到进程池并行运行，按原顺序合并结果和输出，返回成功的测试类型数"""
+        shards = [
+            (test_type, group)
+            for test_type in test_types
+            for group in SUITE_TYPES[test_type][1].TEST_GROUPS
+        ]
+        if verbose:
+            print(f"并行运行 {len(shards)} 个用例组（{self.jobs} 个进程，种子 {self.seed}）")
+        
+        failed_types = set()
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            pending = collections.deque(
+                (test_type, group, executor.submit(run_test_shard, test_type, group, self.seed))
+                for test_type, group in shards
+            )
+            while pending:
+                # 取出后不再引用该 Future，用例组的结果写入综合报告后即可释放
+                test_type, group, future = pending.popleft()
+                try:
+                    results, output = future.result()
+                except Exception as e:
+                    print(f"用例组 {test_type}/{group} 执行失败: {e}")
+                    failed_types.add(test_type)
+                    continue
+                print(output, end='')
+                for result in results:
+                    self.report_writer.write_result(result, SUITE_TYPES[test_type][0])
+        
+        success_count = 0
+        for test_type in test_types:
+            summary_key, _, attr = SUITE_TYPES[test_type]
+            self._record_results(summary_key)
+            
+            # 各类测试的报告从综合报告中按类型读取结果生成
+            getattr(self, attr).save_reports()
+            
+            if test_type not in failed_types:
+                success_count += 1
+        return success_count
+    
     def run_all_tests(self, test_types: List[str] = None, verbose: bool = True):
         """
         运行所有测试或指定类型的测试
-        test_types: 要运行的测试类型列表 ['content', 'newline', 'indentation']
+        test_types: 要运行的测试类型列表 ['content', 'newline', 'indentation', 'editor']
         """
         if test_types is None:
-            test_types = ['content', 'newline', 'indentation']
+            test_types = ['content', 'newline', 'indentation', 'editor']
         
         start_time = time.time()
+        self.open_report_stream(test_types)
         
         if verbose:
             print("键盘输入测试套件")
@@ -148,24 +230,33 @@ class TestSuite:
             print("1. 检测输入与输出在内容上的差异（缺字/多字/错字等）")
             print("2. 检测换行是否正确")
             print("3. 检测空格缩进是否正确")
+            print("4. 检测各输入模式在模拟编辑器中的还原度与按键开销")
             print("=" * 80)
         
         success_count = 0
         
-        # 运行指定的测试
-        if 'content' in test_types:
-            if self.run_content_diff_tests(verbose):
-                success_count += 1
-        
-        if 'newline' in test_types:
-            if self.run_newline_tests(verbose):
-                success_count += 1
-        
-        if 'indentation' in test_types:
-            if self.run_indentation_tests(verbose):
-                success_count += 1
+        if self.jobs > 1:
+            success_count = self.run_parallel_tests(test_types, verbose)
+        else:
+            # 运行指定的测试
+            if 'content' in test_types:
+                if self.run_content_diff_tests(verbose):
+                    success_count += 1
+            
+            if 'newline' in test_types:
+                if self.run_newline_tests(verbose):
+                    success_count += 1
+            
+            if 'indentation' in test_types:
+                if self.run_indentation_tests(verbose):
+                    success_count += 1
+            
+            if 'editor' in test_types:
+                if self.run_editor_tests(verbose):
+                    success_count += 1
         
         total_time = time.time() - start_time
+        self.close_report_stream(total_time)
         
         # 生成综合报告
         if verbose:
@@ -188,7 +279,8 @@ class TestSuite:
                 test_name = {
                     'content_diff': '内容差异检测',
                     'newline': '换行检测',
-                    'indentation': '空格缩进检测'
+                    'indentation': '空格缩进检测',
+                    'editor_emulation': '编辑器模拟'
                 }[test_type]
                 
                 pass_rate = stats['passed'] / stats['total'] * 100
@@ -211,31 +303,47 @@ class TestSuite:
             print(f"  总失败数: {total_failed}")
             print(f"  执行时间: {total_time:.3f}秒")
         
-        # 失败测试详情
-        failed_results = [r for r in self.all_results if not r.passed]
-        if failed_results:
-            print("\n失败测试详情:")
-            print("-" * 60)
-            for result in failed_results:
-                print(f"测试: {result.test_name}")
-                print(f"  差异数量: {len(result.differences)}")
-                print(f"  主要问题: {result.summary}")
-                
-                # 显示前3个差异
-                for i, diff in enumerate(result.differences[:3]):
-                    print(f"    {i+1}. {diff.description}")
-                
-                if len(result.differences) > 3:
-                    print(f"    ... 还有 {len(result.differences) - 3} 个差异")
-                print()
+        # 失败测试详情：通过综合报告的索引逐条读取
+        for index, result in enumerate(JsonlReportReader(self.report_writer.path).failed_results()):
+            if index == 0:
+                print("\n失败测试详情:")
+                print("-" * 60)
+            print(f"测试: {result['test_name']}")
+            print(f"  差异数量: {result['difference_count']}")
+            print(f"  主要问题: {result['summary']}")
+            
+            # 显示前3个差异
+            for i, diff in enumerate(result['differences'][:3]):
+                print(f"    {i+1}. {diff['description']}")
+            
+            if result['difference_count'] > 3:
+                print(f"    ... 还有 {result['difference_count'] - 3} 个差异")
+            print()
     
-    def save_comprehensive_report(self, total_time: float):
-        """保存综合报告"""
-        # 创建带日期的报告文件夹
+    def open_report_stream(self, test_types: List[str]):
+        """在带日期的报告文件夹中创建综合JSONL报告，串行运行时各类测试的结果完成即写入"""
         dated_folder = self.create_dated_report_folder()
+        self.report_writer = JsonlReportWriter(
+            dated_folder / "comprehensive_test_report.jsonl",
+            metadata={'test_types': test_types, 'seed': self.seed, 'jobs': self.jobs}
+        )
+        for test_type in test_types:
+            summary_key, _, attr = SUITE_TYPES[test_type]
+            getattr(self, attr).framework.attach_report_writer(self.report_writer, summary_key)
+    
+    def close_report_stream(self, total_time: float):
+        """写入JSONL报告的索引与统计尾部"""
+        for _, _, attr in SUITE_TYPES.values():
+            getattr(self, attr).framework.attach_report_writer(None)
+        self.report_writer.close(execution_time=total_time, test_summary=self.test_summary)
+    
+    def save_comprehensive_report(self, total_time: float):
+        """从JSONL报告逐条读取结果生成文本报告"""
+        json_report_file = self.report_writer.path
+        reader = JsonlReportReader(json_report_file)
         
         # 文本报告
-        text_report_file = dated_folder / "comprehensive_test_report.txt"
+        text_report_file = json_report_file.with_name("comprehensive_test_report.txt")
         with open(text_report_file, 'w', encoding='utf-8') as f:
             f.write("键盘输入测试套件 - 综合报告\n")
             f.write("=" * 80 + "\n")
@@ -250,7 +358,8 @@ class TestSuite:
                     test_name = {
                         'content_diff': '内容差异检测',
                         'newline': '换行检测',
-                        'indentation': '空格缩进检测'
+                        'indentation': '空格缩进检测',
+                        'editor_emulation': '编辑器模拟'
                     }[test_type]
                     
                     pass_rate = stats['passed'] / stats['total'] * 100
@@ -259,56 +368,19 @@ class TestSuite:
             # 详细结果
             f.write("\n详细测试结果:\n")
             f.write("-" * 40 + "\n")
-            for result in self.all_results:
-                status = "通过" if result.passed else "失败"
-                f.write(f"[{status}] {result.test_name}\n")
-                if not result.passed:
-                    f.write(f"  差异数量: {len(result.differences)}\n")
-                    f.write(f"  执行时间: {result.execution_time:.3f}秒\n")
-                    for diff in result.differences[:5]:  # 只显示前5个差异
-                        f.write(f"    - {diff.description}\n")
-                    if len(result.differences) > 5:
-                        f.write(f"    ... 还有 {len(result.differences) - 5} 个差异\n")
+            for result in reader.results():
+                status = "通过" if result['passed'] else "失败"
+                f.write(f"[{status}] {result['test_name']}\n")
+                if not result['passed']:
+                    differences = result['differences']
+                    f.write(f"  差异数量: {result['difference_count']}\n")
+                    f.write(f"  执行时间: {result['execution_time']:.3f}秒\n")
+                    for diff in differences[:5]:  # 只显示前5个差异
+                        f.write(f"    - {diff['description']}\n")
+                    if result['difference_count'] > 5:
+                        f.write(f"    ... 还有 {result['difference_count'] - 5} 个差异\n")
                 f.write("\n")
         
-        # JSON报告
-        json_report_file = dated_folder / "comprehensive_test_report.json"
-        report_data = {
-            'metadata': {
-                'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-                'execution_time': total_time,
-                'total_tests': len(self.all_results)
-            },
-            'summary': self.test_summary,
-            'results': []
-        }
-        
-        for result in self.all_results:
-            result_data = {
-                'test_name': result.test_name,
-                'passed': result.passed,
-                'execution_time': result.execution_time,
-                'input_length': len(result.input_text),
-                'output_length': len(result.output_text),
-                'difference_count': len(result.differences),
-                'summary': result.summary,
-                'differences': [
-                    {
-                        'type': diff.type.value,
-                        'line_number': diff.line_number,
-                        'position': diff.position,
-                        'expected': diff.expected,
-                        'actual': diff.actual,
-                        'description': diff.description
-                    }
-                    for diff in result.differences
-                ]
-            }
-            report_data['results'].append(result_data)
-        
-        with open(json_report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
-        
         print(f"\n报告已保存:")
         print(f"  文本报告: {text_report_file}")
         print(f"  JSON报告: {json_report_file}")
@@ -368,7 +440,7 @@ def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='键盘输入测试套件')
     parser.add_argument('--type', '-t', 
-                       choices=['content', 'newline', 'indentation', 'all'],
+                       choices=['content', 'newline', 'indentation', 'editor', 'all'],
                        default='all',
                        help='要运行的测试类型')
     parser.add_argument('--quick', '-q', 
@@ -381,6 +453,21 @@ def main():
     parser.add_argument('--quiet', 
                        action='store_true',
                        help='静默模式')
+    parser.add_argument('--jobs', '-j',
+                       type=int,
+                       default=1,
+                       help='并行运行用例组的进程数（默认1，串行）')
+    parser.add_argument('--seed',
+                       type=int,
+                       default=0,
+                       help='用例随机数的基础种子，相同种子的结果与 --jobs 无关')
+    parser.add_argument('--store',
+                       nargs='?',
+                       const='',
+                       default=None,
+                       help='将本次运行的报告导入测试结果历史库（可指定数据库路径，默认 tests/results.sqlite3）')
+    parser.add_argument('--label',
+                       help='导入历史库时的运行标签')
     
     args = parser.parse_args()
     
@@ -388,7 +475,7 @@ def main():
         args.verbose = False
     
     # 创建测试套件
-    test_suite = TestSuite()
+    test_suite = TestSuite(seed=args.seed, jobs=max(1, args.jobs))
     
     try:
         if args.quick:
@@ -397,12 +484,17 @@ def main():
         else:
             # 完整测试
             if args.type == 'all':
-                test_types = ['content', 'newline', 'indentation']
+                test_types = ['content', 'newline', 'indentation', 'editor']
             else:
                 test_types = [args.type]
             
             success = test_suite.run_all_tests(test_types, args.verbose)
             
+            if args.store is not None:
+                with ResultsStore(args.store or None) as store:
+                    run_id = store.ingest_report(test_suite.report_writer.path, args.label)
+                print(f"已导入测试结果历史库: 运行 #{run_id} ({store.path})")
+            
             if success:
                 print("\n所有测试执行完成！")
                 return 0
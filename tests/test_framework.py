@@ -6,16 +6,23 @@
 """
 
 import unittest
-import difflib
 import re
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+import sys
+from bisect import bisect_left
+from typing import Iterator, List, Dict, Tuple, Optional
+from dataclasses import dataclass, field
 from enum import Enum
-import json
+import random
 import time
+import zlib
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append(str(Path(__file__).parent))
+
+from diff_engines import get_diff_engine
+from report_stream import JsonlReportReader, JsonlReportWriter, result_record
+
 
 class DifferenceType(Enum):
     """差异类型枚举"""
@@ -27,9 +34,14 @@ class DifferenceType(Enum):
     WHITESPACE_ERROR = "空格错误"
 
 
+# str.splitlines() 识别的全部行结束符
+LINE_BREAKS = '\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029'
+
+
 @dataclass
 class TestDifference:
-    """测试差异数据类"""
+    """测试差异数据类（使用 __slots__，大量差异时占用更少内存）"""
+    __slots__ = ('type', 'position', 'line_number', 'column', 'expected', 'actual', 'description')
     type: DifferenceType
     position: int
     line_number: int
@@ -49,40 +61,125 @@ class TestResult:
     output_text: str
     execution_time: float
     summary: Dict[str, int]
+    difference_count: int = 0
+    # 模拟函数提供的附加指标（如 EngineTypist 的按键开销），没有时为空
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+
+class LineIndex:
+    """文本的换行位置索引，一次构建后按位置二分查找行号和列号"""
+    
+    def __init__(self, text: str):
+        self.newline_positions = [match.start() for match in re.finditer('\n', text)]
+    
+    def position_info(self, position: int) -> Tuple[int, int]:
+        """返回位置所在的行号（从1开始）和列号"""
+        preceding_newlines = bisect_left(self.newline_positions, position)
+        if preceding_newlines == 0:
+            return 1, position
+        return preceding_newlines + 1, position - self.newline_positions[preceding_newlines - 1] - 1
+
+
+# 差异明细的输出顺序：字符差异在前，其次换行，最后缩进
+_CATEGORY_ORDER = {
+    DifferenceType.MISSING_CHAR: 0,
+    DifferenceType.EXTRA_CHAR: 0,
+    DifferenceType.WRONG_CHAR: 0,
+    DifferenceType.WHITESPACE_ERROR: 0,
+    DifferenceType.NEWLINE_ERROR: 1,
+    DifferenceType.INDENTATION_ERROR: 2,
+}
+
+
+class DifferenceCollector:
+    """按类别统计差异数量，只保留每个类别的前 detail_limit 条明细
+    
+    detail_limit 为 None 时保留全部明细，为 0 时只计数（摘要模式）
+    """
+    
+    __slots__ = ('detail_limit', 'counts', 'differences', '_detail_counts')
+    
+    def __init__(self, detail_limit: Optional[int] = None):
+        self.detail_limit = detail_limit
+        self.counts: Dict[DifferenceType, int] = {}
+        self.differences: List[TestDifference] = []
+        self._detail_counts: Dict[DifferenceType, int] = {}
+    
+    def accept(self, diff_type: DifferenceType) -> bool:
+        """计入一个差异，返回是否还需要保存它的明细"""
+        self.counts[diff_type] = self.counts.get(diff_type, 0) + 1
+        if self.detail_limit is None:
+            return True
+        return self._detail_counts.get(diff_type, 0) < self.detail_limit
+    
+    def add(self, difference: TestDifference):
+        self._detail_counts[difference.type] = self._detail_counts.get(difference.type, 0) + 1
+        self.differences.append(difference)
+    
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+    
+    def summary(self) -> Dict[str, int]:
+        """按差异类型名称汇总数量"""
+        return {diff_type.value: self.counts[diff_type] for diff_type in DifferenceType if diff_type in self.counts}
+    
+    def finish(self):
+        """按类别整理明细顺序（同类别内保持发现顺序）"""
+        self.differences.sort(key=lambda difference: _CATEGORY_ORDER[difference.type])
+
+
+_OPCODE_TYPES = {
+    'delete': DifferenceType.MISSING_CHAR,
+    'insert': DifferenceType.EXTRA_CHAR,
+    'replace': DifferenceType.WRONG_CHAR,
+}
 
 
 class TextComparisonEngine:
     """文本比较引擎"""
     
-    def __init__(self):
+    def __init__(self, diff_engine: str = 'hierarchical'):
+        """diff_engine: 字符级差异算法，'hierarchical'（默认，先行后字符）、'myers' 或参考实现 'difflib'"""
         self.differences = []
+        self.diff_engine = get_diff_engine(diff_engine)
+        self._line_indexes = {}
     
     def compare_texts(self, expected: str, actual: str) -> List[TestDifference]:
         """比较两个文本，返回差异列表"""
-        self.differences = []
+        return self.compare(expected, actual).differences
+    
+    def compare(self, expected: str, actual: str, detail_limit: Optional[int] = None) -> DifferenceCollector:
+        """比较两个文本，返回按类别计数、明细数量受 detail_limit 限制的结果"""
+        collector = DifferenceCollector(detail_limit)
+        # 行偏移索引在首次需要行号列号时构建，每个文本只构建一次
+        self._line_indexes = {}
         
         # 1. 基础字符差异检测
-        self._detect_character_differences(expected, actual)
+        self._detect_character_differences(expected, actual, collector)
         
-        # 2. 换行符检测
-        self._detect_newline_differences(expected, actual)
+        # 2. 换行符与缩进检测（同一次逐行遍历）
+        self._detect_line_differences(expected, actual, collector)
         
-        # 3. 缩进和空格检测
-        self._detect_indentation_differences(expected, actual)
-        
-        return self.differences
+        collector.finish()
+        self.differences = collector.differences
+        return collector
     
-    def _detect_character_differences(self, expected: str, actual: str):
+    def _detect_character_differences(self, expected: str, actual: str, collector: DifferenceCollector):
         """检测字符级别的差异"""
-        matcher = difflib.SequenceMatcher(None, expected, actual)
-        
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for tag, i1, i2, j1, j2 in self.diff_engine.get_opcodes(expected, actual):
+            if tag == 'equal':
+                continue
+            diff_type = _OPCODE_TYPES[tag]
+            if not collector.accept(diff_type):
+                continue
+            
             if tag == 'delete':
                 # 缺字
                 missing_text = expected[i1:i2]
                 line_num, col = self._get_position_info(expected, i1)
-                self.differences.append(TestDifference(
-                    type=DifferenceType.MISSING_CHAR,
+                collector.add(TestDifference(
+                    type=diff_type,
                     position=i1,
                     line_number=line_num,
                     column=col,
@@ -95,8 +192,8 @@ class TextComparisonEngine:
                 # 多字
                 extra_text = actual[j1:j2]
                 line_num, col = self._get_position_info(actual, j1)
-                self.differences.append(TestDifference(
-                    type=DifferenceType.EXTRA_CHAR,
+                collector.add(TestDifference(
+                    type=diff_type,
                     position=j1,
                     line_number=line_num,
                     column=col,
@@ -105,13 +202,13 @@ class TextComparisonEngine:
                     description=f"位置 {j1} 多出字符: '{extra_text}'"
                 ))
             
-            elif tag == 'replace':
+            else:
                 # 错字
                 expected_text = expected[i1:i2]
                 actual_text = actual[j1:j2]
                 line_num, col = self._get_position_info(expected, i1)
-                self.differences.append(TestDifference(
-                    type=DifferenceType.WRONG_CHAR,
+                collector.add(TestDifference(
+                    type=diff_type,
                     position=i1,
                     line_number=line_num,
                     column=col,
@@ -120,14 +217,14 @@ class TextComparisonEngine:
                     description=f"位置 {i1} 字符错误: 期望 '{expected_text}', 实际 '{actual_text}'"
                 ))
     
-    def _detect_newline_differences(self, expected: str, actual: str):
-        """检测换行符差异"""
+    def _detect_line_differences(self, expected: str, actual: str, collector: DifferenceCollector):
+        """逐行检测换行符差异和缩进差异"""
         expected_lines = expected.splitlines(keepends=True)
         actual_lines = actual.splitlines(keepends=True)
         
         # 检查行数差异
-        if len(expected_lines) != len(actual_lines):
-            self.differences.append(TestDifference(
+        if len(expected_lines) != len(actual_lines) and collector.accept(DifferenceType.NEWLINE_ERROR):
+            collector.add(TestDifference(
                 type=DifferenceType.NEWLINE_ERROR,
                 position=0,
                 line_number=0,
@@ -137,48 +234,60 @@ class TextComparisonEngine:
                 description=f"行数不匹配: 期望 {len(expected_lines)} 行, 实际 {len(actual_lines)} 行"
             ))
         
-        # 检查每行的换行符
+        # line_offset: 第 i 行在原文中的起始位置
+        # content_offset: 第 i 行在去掉行结束符后以 '\n' 连接的文本中的起始位置
+        line_offset = 0
+        content_offset = 0
         for i, (exp_line, act_line) in enumerate(zip(expected_lines, actual_lines)):
-            exp_ending = self._get_line_ending(exp_line)
-            act_ending = self._get_line_ending(act_line)
-            
-            if exp_ending != act_ending:
-                self.differences.append(TestDifference(
-                    type=DifferenceType.NEWLINE_ERROR,
-                    position=len(''.join(expected_lines[:i])) + len(exp_line.rstrip()),
-                    line_number=i + 1,
-                    column=len(exp_line.rstrip()),
-                    expected=repr(exp_ending),
-                    actual=repr(act_ending),
-                    description=f"第 {i+1} 行换行符不匹配: 期望 {repr(exp_ending)}, 实际 {repr(act_ending)}"
-                ))
-    
-    def _detect_indentation_differences(self, expected: str, actual: str):
-        """检测缩进差异"""
-        expected_lines = expected.splitlines()
-        actual_lines = actual.splitlines()
-        
-        for i, (exp_line, act_line) in enumerate(zip(expected_lines, actual_lines)):
-            exp_indent = self._get_indentation(exp_line)
-            act_indent = self._get_indentation(act_line)
-            
-            if exp_indent != act_indent:
-                self.differences.append(TestDifference(
-                    type=DifferenceType.INDENTATION_ERROR,
-                    position=len('\n'.join(expected_lines[:i])) + (1 if i > 0 else 0),
-                    line_number=i + 1,
-                    column=0,
-                    expected=repr(exp_indent),
-                    actual=repr(act_indent),
-                    description=f"第 {i+1} 行缩进不匹配: 期望 {repr(exp_indent)}, 实际 {repr(act_indent)}"
-                ))
+            exp_content = self._strip_line_break(exp_line)
+            if exp_line != act_line:
+                # 检查每行的换行符
+                exp_ending = self._get_line_ending(exp_line)
+                act_ending = self._get_line_ending(act_line)
+                if exp_ending != act_ending and collector.accept(DifferenceType.NEWLINE_ERROR):
+                    content_length = len(exp_line.rstrip())
+                    collector.add(TestDifference(
+                        type=DifferenceType.NEWLINE_ERROR,
+                        position=line_offset + content_length,
+                        line_number=i + 1,
+                        column=content_length,
+                        expected=repr(exp_ending),
+                        actual=repr(act_ending),
+                        description=f"第 {i+1} 行换行符不匹配: 期望 {repr(exp_ending)}, 实际 {repr(act_ending)}"
+                    ))
+                
+                # 检查每行的缩进
+                act_content = self._strip_line_break(act_line)
+                if exp_content != act_content:
+                    exp_indent = self._get_indentation(exp_content)
+                    act_indent = self._get_indentation(act_content)
+                    if exp_indent != act_indent and collector.accept(DifferenceType.INDENTATION_ERROR):
+                        collector.add(TestDifference(
+                            type=DifferenceType.INDENTATION_ERROR,
+                            position=content_offset,
+                            line_number=i + 1,
+                            column=0,
+                            expected=repr(exp_indent),
+                            actual=repr(act_indent),
+                            description=f"第 {i+1} 行缩进不匹配: 期望 {repr(exp_indent)}, 实际 {repr(act_indent)}"
+                        ))
+            line_offset += len(exp_line)
+            content_offset += len(exp_content) + 1
     
     def _get_position_info(self, text: str, position: int) -> Tuple[int, int]:
         """获取位置的行号和列号"""
-        lines = text[:position].split('\n')
-        line_number = len(lines)
-        column = len(lines[-1]) if lines else 0
-        return line_number, column
+        line_index = self._line_indexes.get(id(text))
+        if line_index is None:
+            line_index = self._line_indexes[id(text)] = LineIndex(text)
+        return line_index.position_info(position)
+    
+    def _strip_line_break(self, line: str) -> str:
+        """去掉 splitlines(keepends=True) 得到的行末尾的行结束符"""
+        if line.endswith('\r\n'):
+            return line[:-2]
+        if line and line[-1] in LINE_BREAKS:
+            return line[:-1]
+        return line
     
     def _get_line_ending(self, line: str) -> str:
         """获取行的结束符"""
@@ -195,12 +304,65 @@ class TextComparisonEngine:
         return line[:len(line) - len(line.lstrip())]
 
 
+class CheckTally:
+    """脚本式测试的检查计数：逐项记录通过与失败，失败时打印检查名与细节"""
+
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def check(self, name: str, condition: bool, detail: str = "") -> bool:
+        if condition:
+            self.passed += 1
+        else:
+            self.failed += 1
+            print(f"  ✗ {name} {detail}")
+        return bool(condition)
+
+    def finish(self, title: str) -> bool:
+        """打印汇总行，返回是否全部通过"""
+        print(f"{title}完成: {self.passed} 通过, {self.failed} 失败")
+        return self.failed == 0
+
+
+def derive_seed(base_seed: int, *names: str) -> int:
+    """由基础种子和名称派生子种子，结果与执行顺序、所在进程和 PYTHONHASHSEED 无关"""
+    return zlib.crc32(':'.join((str(base_seed),) + names).encode('utf-8'))
+
+
+def run_test_group(suite, group: str, seed: Optional[int] = None):
+    """运行测试类中的一个用例组；给定种子时先按 (测试类, 用例组) 重置随机数种子"""
+    if seed is not None:
+        random.seed(derive_seed(seed, type(suite).__name__, group))
+    getattr(suite, group)()
+
+
 class KeyboardTyperTestFramework:
     """键盘输入测试框架主类"""
     
-    def __init__(self):
-        self.comparison_engine = TextComparisonEngine()
+    def __init__(self, diff_engine: str = 'hierarchical', detail_limit: Optional[int] = None,
+                 keep_texts: bool = True, keep_results: bool = True):
+        """detail_limit: 每类差异最多保留的明细条数（None 全部保留，0 只统计数量）
+        keep_texts: 是否在测试结果中保留输入输出文本，大语料压力测试时可关闭
+        keep_results: 是否在 test_results 中保留结果；关闭后结果只写入 JSONL 报告，内存占用不随用例数增长"""
+        self.comparison_engine = TextComparisonEngine(diff_engine)
+        self.detail_limit = detail_limit
+        self.keep_texts = keep_texts
+        self.keep_results = keep_results
         self.test_results = []
+        self.report_writer: Optional[JsonlReportWriter] = None
+        self.report_suite: Optional[str] = None
+    
+    def attach_report_writer(self, writer: Optional[JsonlReportWriter], suite: Optional[str] = None):
+        """之后每个测试结果完成时立即追加到 JSONL 报告（writer 为 None 时停止）"""
+        self.report_writer = writer
+        self.report_suite = suite
+    
+    def _record_result(self, result: TestResult):
+        if self.keep_results:
+            self.test_results.append(result)
+        if self.report_writer is not None:
+            self.report_writer.write_result(result, self.report_suite)
     
     def create_dated_report_folder(self, base_path: str = "reports") -> Path:
         """创建带日期时间戳的报告文件夹"""
@@ -223,31 +385,28 @@ class KeyboardTyperTestFramework:
         try:
             # 模拟键盘输入过程
             output_text = simulate_typing_func(input_text, **kwargs)
+            metrics = getattr(simulate_typing_func, 'last_metrics', None) or {}
             
-            # 比较输入输出
-            differences = self.comparison_engine.compare_texts(input_text, output_text)
+            # 比较输入输出（同时统计差异类型）
+            comparison = self.comparison_engine.compare(input_text, output_text, self.detail_limit)
             
             # 生成测试结果
-            passed = len(differences) == 0
+            passed = comparison.total == 0
             execution_time = time.time() - start_time
             
-            # 统计差异类型
-            summary = {}
-            for diff in differences:
-                diff_type = diff.type.value
-                summary[diff_type] = summary.get(diff_type, 0) + 1
-            
             result = TestResult(
                 test_name=test_name,
                 passed=passed,
-                differences=differences,
-                input_text=input_text,
-                output_text=output_text,
+                differences=comparison.differences,
+                input_text=input_text if self.keep_texts else "",
+                output_text=output_text if self.keep_texts else "",
                 execution_time=execution_time,
-                summary=summary
+                summary=comparison.summary(),
+                difference_count=comparison.total,
+                metrics=dict(metrics)
             )
             
-            self.test_results.append(result)
+            self._record_result(result)
             return result
             
         except Exception as e:
@@ -264,86 +423,78 @@ class KeyboardTyperTestFramework:
                     actual=f"ERROR: {str(e)}",
                     description=f"测试执行异常: {str(e)}"
                 )],
-                input_text=input_text,
+                input_text=input_text if self.keep_texts else "",
                 output_text="",
                 execution_time=time.time() - start_time,
-                summary={"执行异常": 1}
+                summary={"执行异常": 1},
+                difference_count=1
             )
             
-            self.test_results.append(result)
+            self._record_result(result)
             return result
     
-    def generate_report(self, output_file: Optional[str] = None) -> str:
-        """生成测试报告"""
-        report_lines = []
-        report_lines.append("=" * 80)
-        report_lines.append("键盘输入测试报告")
-        report_lines.append("=" * 80)
-        report_lines.append(f"测试时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append(f"总测试数: {len(self.test_results)}")
+    def result_records(self) -> Iterator[dict]:
+        """
+        生成报告用的结果记录（格式见 report_stream）：保留结果时由 test_results 转换，
+        否则从已附加的 JSONL 报告中逐条读取本测试类型的结果，不把结果载入内存
+        """
+        if self.keep_results:
+            for result in self.test_results:
+                yield result_record(result, self.report_suite)
+        elif self.report_writer is not None:
+            yield from JsonlReportReader(self.report_writer.path).results(suite=self.report_suite)
+    
+    def _report_lines(self) -> Iterator[str]:
+        total_count = passed_count = 0
+        for record in self.result_records():
+            total_count += 1
+            passed_count += record['passed']
         
-        passed_count = sum(1 for result in self.test_results if result.passed)
-        report_lines.append(f"通过测试: {passed_count}")
-        report_lines.append(f"失败测试: {len(self.test_results) - passed_count}")
-        report_lines.append("")
+        yield "=" * 80
+        yield "键盘输入测试报告"
+        yield "=" * 80
+        yield f"测试时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"
+        yield f"总测试数: {total_count}"
+        yield f"通过测试: {passed_count}"
+        yield f"失败测试: {total_count - passed_count}"
+        yield ""
         
         # 详细测试结果
-        for i, result in enumerate(self.test_results, 1):
-            report_lines.append(f"{i}. 测试: {result.test_name}")
-            report_lines.append(f"   状态: {'✓ 通过' if result.passed else '✗ 失败'}")
-            report_lines.append(f"   执行时间: {result.execution_time:.3f}秒")
+        for i, record in enumerate(self.result_records(), 1):
+            yield f"{i}. 测试: {record['test_name']}"
+            yield f"   状态: {'✓ 通过' if record['passed'] else '✗ 失败'}"
+            yield f"   执行时间: {record['execution_time']:.3f}秒"
             
-            if result.differences:
-                report_lines.append(f"   发现 {len(result.differences)} 个差异:")
-                for diff in result.differences:
-                    report_lines.append(f"     - {diff.description}")
+            if record['difference_count']:
+                yield f"   发现 {record['difference_count']} 个差异:"
+                for diff in record['differences']:
+                    yield f"     - {diff['description']}"
+                omitted = record['difference_count'] - len(record['differences'])
+                if omitted > 0:
+                    yield f"     ... 另有 {omitted} 个差异只计入统计"
             
-            if result.summary:
-                report_lines.append(f"   差异统计: {result.summary}")
+            if record['summary']:
+                yield f"   差异统计: {record['summary']}"
             
-            report_lines.append("")
-        
-        report_content = "\n".join(report_lines)
-        
-        if output_file:
-            Path(output_file).write_text(report_content, encoding='utf-8')
-        
-        return report_content
+            if record['metrics']:
+                yield f"   附加指标: {record['metrics']}"
+            
+            yield ""
     
-    def export_json_report(self, output_file: str):
-        """导出JSON格式的测试报告"""
-        report_data = {
-            "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
-            "total_tests": len(self.test_results),
-            "passed_tests": sum(1 for result in self.test_results if result.passed),
-            "failed_tests": sum(1 for result in self.test_results if not result.passed),
-            "results": []
-        }
-        
-        for result in self.test_results:
-            result_data = {
-                "test_name": result.test_name,
-                "passed": result.passed,
-                "execution_time": result.execution_time,
-                "summary": result.summary,
-                "differences": [
-                    {
-                        "type": diff.type.value,
-                        "position": diff.position,
-                        "line_number": diff.line_number,
-                        "column": diff.column,
-                        "expected": diff.expected,
-                        "actual": diff.actual,
-                        "description": diff.description
-                    }
-                    for diff in result.differences
-                ]
-            }
-            report_data["results"].append(result_data)
-        
+    def generate_report(self, output_file: Optional[str] = None) -> str:
+        """生成测试报告；指定 output_file 时逐行写入该文件并返回其路径，否则返回报告文本"""
+        if not output_file:
+            return "\n".join(self._report_lines())
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
-
+            for index, line in enumerate(self._report_lines()):
+                f.write(line if index == 0 else "\n" + line)
+        return output_file
+    
+    def export_json_report(self, output_file: str):
+        """导出JSONL格式的测试报告（逐条写入，格式见 report_stream）"""
+        with JsonlReportWriter(output_file) as writer:
+            for record in self.result_records():
+                writer.write_record(record)
 
 if __name__ == "__main__":
     # 测试框架示例
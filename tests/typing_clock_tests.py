@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打字引擎时钟测试脚本
+在虚拟时钟上运行 execute_typing，检查吞吐量、节奏漂移、抖动分布、倒计时与停止的打断，以及真实时钟的可打断等待
+"""
+
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "backend"))
+
+import backend
+from clocks import RealClock, VirtualClock
+from editor_emulator import engine_harness
+from test_framework import CheckTally
+
+
+def run_engine(text: str, speed_cps: int, countdown: int = 0, jitter: int = 0, auto_switch: bool = False,
+               ide_mode: bool = False, stop_at: float = None):
+    """在记录输出端与虚拟时钟上运行一次打字任务，返回 (输出端, 时钟)"""
+    with engine_harness() as (sink, clock):
+        if stop_at is not None:
+            clock.call_at(stop_at, backend.stop_event.set)
+        backend.status['current_status'] = 'PREPARING'
+        backend.execute_typing(text, speed_cps, countdown, jitter, False, auto_switch, ide_mode)
+    return sink, clock
+
+
+class TypingClockTests(CheckTally):
+    """打字引擎时钟测试类"""
+
+    def run_throughput_tests(self):
+        """10000 字符、每秒 5 字符的任务在虚拟时钟上立即完成，模拟耗时与速度一致且没有漂移"""
+        print("=" * 60)
+        print("运行吞吐量与漂移测试")
+        print("=" * 60)
+
+        text = "abcdefghij" * 1000
+        start = time.perf_counter()
+        sink, clock = run_engine(text, speed_cps=5)
+        elapsed = time.perf_counter() - start
+
+        self.check("任务完成", backend.status['current_status'] == 'COMPLETED', backend.status['current_status'])
+        self.check("实际耗时很短", elapsed < 5.0, f"{elapsed:.2f}s")
+        self.check("全部字符已发送", len(sink.events) == len(text))
+        self.check("模拟耗时等于字符数/速度", abs(clock.now() - len(text) / 5) < 1e-6, f"{clock.now():.6f}")
+
+        deadlines = [wait.deadline for wait in clock.waits('inter_key')]
+        drift = max(abs(deadline - (index + 1) * 0.2) for index, deadline in enumerate(deadlines))
+        self.check("截止时间没有累积漂移", drift < 1e-6, f"{drift:.3e}")
+
+    def run_jitter_tests(self):
+        """5% 抖动下按键间隔落在 ±0.05 秒以内，均值接近标称间隔"""
+        print("=" * 60)
+        print("运行抖动分布测试")
+        print("=" * 60)
+
+        random.seed(41)
+        _, clock = run_engine("x" * 5000, speed_cps=5, jitter=5)
+        intervals = clock.intervals('inter_key')
+        self.check("间隔数量", len(intervals) == 4999)
+        self.check("间隔不小于下限", min(intervals) >= 0.15 - 1e-9, f"{min(intervals):.4f}")
+        self.check("间隔不大于上限", max(intervals) <= 0.25 + 1e-9, f"{max(intervals):.4f}")
+        mean = statistics.mean(intervals)
+        self.check("间隔均值接近标称值", abs(mean - 0.2) < 0.002, f"{mean:.4f}")
+        # 均匀分布 U(-0.05, 0.05) 的标准差为 0.05/√3
+        deviation = statistics.pstdev(intervals)
+        self.check("间隔标准差符合均匀抖动", abs(deviation - 0.05 / 3 ** 0.5) < 0.003, f"{deviation:.4f}")
+
+    def run_preemption_tests(self):
+        """停止信号在倒计时和打字过程中都能立即打断等待"""
+        print("=" * 60)
+        print("运行打断测试")
+        print("=" * 60)
+
+        sink, clock = run_engine("hello", speed_cps=5, countdown=3, stop_at=1.5)
+        self.check("倒计时中停止", clock.now() == 1.5 and not sink.events, f"{clock.now()} {len(sink.events)}")
+
+        # 第 0、0.2、…、10.0 秒各发送一个字符，10.1 秒时停止
+        sink, clock = run_engine("y" * 1000, speed_cps=5, stop_at=10.1)
+        self.check("打字中停止", backend.status['current_status'] == 'ABORTED', backend.status['current_status'])
+        self.check("停止前发送的字符数", len(sink.events) == 51, str(len(sink.events)))
+        self.check("停止于回调时刻", clock.now() == 10.1, str(clock.now()))
+
+        event = threading.Event()
+        threading.Timer(0.05, event.set).start()
+        start = time.perf_counter()
+        interrupted = RealClock().sleep(5.0, event)
+        self.check("真实时钟的等待可被打断", interrupted and time.perf_counter() - start < 2.0)
+
+    def run_schedule_tests(self):
+        """IDE 模式和输入法切换的等待都记录在计划中"""
+        print("=" * 60)
+        print("运行等待计划测试")
+        print("=" * 60)
+
+        text = "def f():\n    return 1\n"
+        _, clock = run_engine(text, speed_cps=1000, ide_mode=True)
+        labels = {wait.label for wait in clock.schedule}
+        self.check("IDE模式的等待类别", {'inter_key', 'key_hold', 'key_settle', 'line_break'} <= labels, str(labels))
+        self.check("IDE模式耗时主要在特殊键", clock.total_wait('inter_key') < clock.now() / 2)
+        self.check("等待首尾相接", all(
+            abs(earlier.end - later.start) < 1e-9 for earlier, later in zip(clock.schedule, clock.schedule[1:])
+        ))
+
+        sink, clock = run_engine("Hello你好World", speed_cps=100, auto_switch=True)
+        layouts = [event for event in sink.events if event[0] == 'layout']
+        self.check("每次切换输入法都有等待", len(clock.waits('layout_switch')) == len(layouts),
+                   f"{len(clock.waits('layout_switch'))} != {len(layouts)}")
+
+        # 切换输入法和清除自动缩进使进度落后时从当前时刻重新计时，不连发补齐
+        for ide_mode in (True, False):
+            run_engine("abc你好def\nghi世界\njkl", speed_cps=50, auto_switch=True, ide_mode=ide_mode)
+            _, actual = backend.keystroke_timeline.samples()
+            shortest = min(later - earlier for earlier, later in zip(actual, actual[1:])) / 1e9
+            self.check(f"落后后不连发补齐（IDE模式={ide_mode}）", shortest >= 0.02 - 1e-6, f"{shortest:.4f}")
+
+        quiet = VirtualClock(record_schedule=False)
+        quiet.sleep(1.5, label='inter_key')
+        self.check("关闭记录时只推进时间", quiet.now() == 1.5 and quiet.schedule == [])
+
+    def run_all_tests(self) -> bool:
+        self.run_throughput_tests()
+        self.run_jitter_tests()
+        self.run_preemption_tests()
+        self.run_schedule_tests()
+        print("=" * 60)
+        return self.finish("时钟测试")
+
+
+def main():
+    tests = TypingClockTests()
+    return 0 if tests.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())